@@ -0,0 +1,76 @@
+"""Per-request allocations of fresh, compiled and reused stacks.
+
+Reports the objects constructed per request, the peak traced bytes
+allocated while serving a request and the time per request.
+"""
+from flask_compose import Component, Route
+
+import tracemalloc
+
+from harness import measure, table, usec
+
+
+class Handler:
+    constructed = 0
+
+    def __init__(self):
+        Handler.constructed += 1
+
+    def hook(self):
+        return None
+
+
+def controller(handler, **uri_args):
+    handler.hook()
+    handler.hook()
+
+
+def make_components(depth):
+    def __init__(self, parent):
+        Handler.constructed += 1
+        Component.__init__(self, parent)
+
+    return [
+        type('Component{}'.format(i), (Component,), {'__init__': __init__})
+        for i in range(depth)]
+
+
+def peak_bytes(action, number=100):
+    action(id='1')
+    tracemalloc.start()
+    peak = 0
+    for _ in range(number):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        action(id='1')
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return peak
+
+
+def constructed(action, number=100):
+    Handler.constructed = 0
+    for _ in range(number):
+        action(id='1')
+    return Handler.constructed / number
+
+
+def main():
+    rows = []
+    for depth in (1, 2, 5, 10, 20):
+        route = Route(
+            '/<id>', controller, Handler, components=make_components(depth))
+        for mode, options in (
+                ('fresh', {}),
+                ('compiled', {'compiled': True}),
+                ('reused', {'reused': True}),
+                ('compiled+reused', {'compiled': True, 'reused': True})):
+            action = route.make_url_rule([], **options).action
+            rows.append((
+                depth, mode, constructed(action), peak_bytes(action),
+                usec(measure(lambda: action(id='1')))))
+    table(('depth', 'mode', 'objects', 'peak bytes', 'time (us)'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Read requests with and without the response cache.
+
+Serves the example application's GET routes in process, as shipped
+and again beneath a "/cached" include whose "ResponseCache" middleware
+wraps the application's renderer.  The cache is measured with the
+in-process "MemoryCache" and with "SharedCache" over its local stand-in
+client.  Reports mean microseconds per request when every request
+reads and when one request in ten is a write invalidating the cache.
+"""
+from flask_compose import Include
+from flask_compose.cache import MemoryCache, ResponseCache, SharedCache
+
+import json
+import os
+import sys
+import time
+
+from harness import table
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'examples', 'app'))
+
+from app.common import api, app, db  # noqa: E402
+from app.models import UserModel  # noqa: E402
+from app.routes import routes  # noqa: E402
+
+
+USERS = 50
+PATHS = ('/v1/users', '/v1/users/1', '/v2/users', '/v2/users/1')
+
+
+def seed():
+    db.drop_all()
+    db.create_all()
+    for index in range(USERS):
+        db.session.add(UserModel(username='user{}'.format(index)))
+    db.session.commit()
+
+
+def mean_time(client, prefix, path, writes, number=500):
+    write = json.dumps({'username': 'user'})
+    start = time.perf_counter()
+    for index in range(number):
+        if writes and index % 10 == 9:
+            client.patch(prefix + '/v1/users/2', data=write)
+        else:
+            response = client.get(prefix + path)
+            assert response.status_code == 200, response.status
+            response.get_data()  # Write streamed collections.
+    return (time.perf_counter() - start) / number
+
+
+def main():
+    backends = (('memory', MemoryCache()), ('shared', SharedCache()))
+    for name, backend in backends:
+        api.add_routes([Include('/' + name, routes=routes, middleware=[
+            ResponseCache(backend, ttl=30, tags=['users'])])])
+
+    rows = []
+    with app.app_context():
+        seed()
+        client = app.test_client()
+        for path in PATHS:
+            for writes in (False, True):
+                row = [path, '10%' if writes else '0%']
+                for prefix in ('', '/memory', '/shared'):
+                    mean_time(client, prefix, path, writes, number=10)
+                    row.append('{:.1f}'.format(
+                        mean_time(client, prefix, path, writes) * 1e6))
+                rows.append(row)
+    table(('route', 'writes', 'uncached (us)', 'memory', 'shared'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Backend concurrency of sync and async controllers.
+
+Each request reads four resources from a stand-in backend which takes
+20ms per call, "time.sleep" for the sync handler and "asyncio.sleep"
+for the async one.  A single-threaded server (one worker, one thread)
+is loaded by eight concurrent clients.  Reports requests per second,
+mean latency and the peak number of backend calls in flight within
+the worker.
+
+Each async controller is run on its own event loop, so requests are
+still served one at a time per thread; the async controller overlaps
+the backend calls of a request.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+import asyncio
+import threading
+import time
+
+from flask import Flask
+from flask_compose import Component, Route, Router, maybe_await
+
+from harness import table
+
+
+LATENCY = 0.02
+CALLS = 4
+
+
+class Backend:
+    """Counts the calls in flight."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def enter(self):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def exit(self):
+        with self.lock:
+            self.active -= 1
+
+
+backend = Backend()
+
+
+class SyncHandler:
+
+    def fetch(self, key):
+        backend.enter()
+        time.sleep(LATENCY)
+        backend.exit()
+        return key
+
+
+class AsyncHandler:
+
+    async def fetch(self, key):
+        backend.enter()
+        await asyncio.sleep(LATENCY)
+        backend.exit()
+        return key
+
+
+class AuditComponent(Component):
+    """An async component above a handler whose hooks may be sync."""
+
+    async def fetch(self, key):
+        return await maybe_await(self.parent.fetch(key))
+
+
+def sync_controller(handler, **uri_args):
+    return ','.join(str(handler.fetch(key)) for key in range(CALLS)), 200
+
+
+async def async_controller(handler, **uri_args):
+    results = await asyncio.gather(*(
+        handler.fetch(key) for key in range(CALLS)))
+    return ','.join(str(result) for result in results), 200
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def load(controller, handler, components, clients=8, requests=80):
+    app = Flask('bench')
+    Router(app).add_routes([
+        Route('/<id>', controller, handler, components=components)])
+    server = make_server(
+        '127.0.0.1', 0, app, threaded=False, request_handler=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    url = 'http://127.0.0.1:{}/1'.format(server.server_port)
+    backend.peak = 0
+
+    def get(_):
+        start = time.perf_counter()
+        with urlopen(url) as response:
+            response.read()
+        return time.perf_counter() - start
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            latencies = list(executor.map(get, range(requests)))
+        total = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        thread.join()
+    return requests / total, sum(latencies) / len(latencies), backend.peak
+
+
+def main():
+    rows = []
+    for name, controller, handler, components in (
+            ('sync', sync_controller, SyncHandler, []),
+            ('async', async_controller, AsyncHandler, [AuditComponent])):
+        throughput, latency, peak = load(controller, handler, components)
+        rows.append((
+            name, '{:.1f}'.format(throughput), '{:.1f}'.format(latency * 1e3),
+            peak))
+    table(('controller', 'requests/s', 'latency (ms)', 'in flight'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Latency of "/v2/users" by "meta.total" count strategy.
+
+Fills a local SQLite table with a million users (see "--rows"),
+analyzes it and requests the first page of the example application's
+"/v2/users" collection with each count strategy mounted on its browse
+route:
+
+- "query.count()", the count every collection response used to run.
+- exact, "PlatformHandler.make_count", a "SELECT count(*)" without a
+  subquery.
+- concurrent, "ConcurrentCountComponent", counting on a second
+  connection while the page is fetched.
+- cached, "CachedCountComponent", as served after its first request.
+- estimated, "EstimatedCountComponent", from "sqlite_stat1".
+- omitted, "OmittedCountComponent".
+
+Reports the mean milliseconds per request and the total reported.
+"""
+from flask_compose import Component, Include
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from harness import table
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'examples', 'app'))
+
+
+class QueryCountComponent(Component):
+    """The count as it was, for comparison."""
+
+    def make_count(self, query):
+        return query.count
+
+
+def mean_time(client, path, number=20):
+    total = client.get(path).json['meta'].get('total')
+    start = time.perf_counter()
+    for _ in range(number):
+        # Read the body, which a streamed collection counts as it ends.
+        client.get(path).get_data()
+    return (time.perf_counter() - start) / number, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    directory = tempfile.TemporaryDirectory()
+    filename = os.path.join(directory.name, 'users.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + filename
+
+    from app.common import api, app, db
+    from app import components
+    from app.controllers import BrowseRoute
+    from app.middleware import render_response
+
+    strategies = [
+        ('query.count()', [QueryCountComponent]),
+        ('exact', []),
+        ('concurrent', [components.ConcurrentCountComponent]),
+        ('cached', [components.CachedCountComponent]),
+        ('estimated', [components.EstimatedCountComponent]),
+        ('omitted', [components.OmittedCountComponent]),
+    ]
+    api.add_routes([
+        Include('/' + name, routes=[BrowseRoute(
+            name=name, components=[components.UserComponent, *strategy])],
+            components=[
+                components.JSONAPIComponent, components.PaginationComponent,
+                components.ActiveUserComponent, components.StreamComponent],
+            middleware=[render_response])
+        for name, strategy in strategies])
+
+    with app.app_context():
+        db.create_all()
+    with sqlite3.connect(filename) as connection:
+        connection.executemany(
+            'INSERT INTO user (username, is_active) VALUES (?, 1)',
+            (('user{}'.format(index),) for index in range(args.rows)))
+        connection.execute('ANALYZE')
+
+    client = app.test_client()
+    rows = []
+    for name, _ in strategies:
+        seconds, total = mean_time(client, '/' + name)
+        rows.append((name, '{:.2f}'.format(seconds * 1e3), total))
+    table(('count', 'ms/request', 'meta.total'), rows)
+    directory.cleanup()
+
+
+if __name__ == '__main__':
+    main()
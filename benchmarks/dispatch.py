@@ -0,0 +1,47 @@
+"""Per-request dispatch overhead of compiled and uncompiled stacks.
+
+Each request constructs the component stack and calls four hooks which
+are only implemented by the handler.
+"""
+from flask_compose import Component, Route
+
+from harness import measure, table, usec
+
+
+class Handler:
+
+    def hook(self):
+        return None
+
+
+def controller(handler, **uri_args):
+    handler.hook()
+    handler.hook()
+    handler.hook()
+    handler.hook()
+
+
+def make_components(depth):
+    return [
+        type('Component{}'.format(index), (Component,), {})
+        for index in range(depth)]
+
+
+def main():
+    rows = []
+    for depth in range(1, 21):
+        route = Route(
+            '/<id>', controller, Handler, components=make_components(depth))
+        plain = route.make_url_rule([]).action
+        compiled = route.make_url_rule([], compiled=True).action
+
+        plain_time = measure(lambda: plain(id='1'))
+        compiled_time = measure(lambda: compiled(id='1'))
+        rows.append((
+            depth, usec(plain_time), usec(compiled_time),
+            '{:.2f}x'.format(plain_time / compiled_time)))
+    table(('depth', 'getattr (us)', 'compiled (us)', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Bytes read and latency of sparse fieldsets on a wide table.
+
+Fills a local SQLite table of fifty text columns with ten thousand rows
+(see "--rows" and "--width") and requests pages of a hundred resources
+from a JSON:API collection of them, asking for one column with
+"fields[wide]=column_0":
+
+- dump only, the fieldset applied to the dumped fields alone, as the
+  "only" dump option approximated it: every column is still selected.
+- selected, as "SparseFieldsetComponent" does, loading only the
+  column the fieldset needs.
+
+Reports the bytes of the selected values, the bytes the process read
+from the database file (Linux's "/proc/self/io") and the mean
+milliseconds per request.
+"""
+from flask_compose import Include
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from harness import table
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'examples', 'app'))
+
+SIZE = 100
+
+
+def read_bytes():
+    """Return the bytes the process has read, or None."""
+    try:
+        with open('/proc/self/io') as io:
+            for line in io:
+                if line.startswith('rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--width', type=int, default=50)
+    args = parser.parse_args()
+
+    directory = tempfile.TemporaryDirectory()
+    filename = os.path.join(directory.name, 'wide.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + filename
+
+    from app.common import api, app, db
+    from app import components
+    from app.controllers import BrowseRoute
+    from app.middleware import render_response
+
+    import marshmallow as ma
+    import sqlalchemy
+
+    columns = ['column_{}'.format(index) for index in range(args.width)]
+    WideModel = type('WideModel', (db.Model,), dict(
+        __tablename__='wide', id=db.Column(db.Integer, primary_key=True),
+        **{name: db.Column(db.Text) for name in columns}))
+    WideSchema = type('WideSchema', (ma.Schema,), dict(
+        id=ma.fields.Integer(),
+        **{name: ma.fields.String() for name in columns}))
+
+    class WideComponent(components.TypeComponent):
+        model = WideModel
+        schema = WideSchema
+        jsonapi_type = 'wide'
+
+    class DumpOnlyFieldsetComponent(components.SparseFieldsetComponent):
+        """Sparse fieldsets dumped from whole rows, for comparison."""
+
+        def make_query(self, query, **uri_args):
+            return self.parent.make_query(query, **uri_args)
+
+    strategies = [
+        ('dump only', DumpOnlyFieldsetComponent),
+        ('selected', components.SparseFieldsetComponent),
+    ]
+    api.add_routes([
+        Include('/' + name.replace(' ', '-'), routes=[
+            BrowseRoute(name=name, components=[WideComponent])],
+            components=[
+                components.JSONAPIComponent, fieldset,
+                components.PaginationComponent,
+                components.OmittedCountComponent,
+                components.StreamComponent],
+            middleware=[render_response])
+        for name, fieldset in strategies])
+
+    with app.app_context():
+        db.create_all()
+    with sqlite3.connect(filename) as connection:
+        connection.executemany(
+            'INSERT INTO wide ({}) VALUES ({})'.format(
+                ', '.join(columns), ', '.join('?' * len(columns))),
+            ([str(row) * (100 // len(str(row))) for _ in columns]
+             for row in range(args.rows)))
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    @sqlalchemy.event.listens_for(engine, 'before_cursor_execute')
+    def record(connection, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    def selected_bytes():
+        """Return the bytes of the values the statements select."""
+        total = 0
+        with sqlite3.connect(filename) as connection:
+            for statement, parameters in statements:
+                for row in connection.execute(statement, parameters):
+                    total += sum(
+                        len(value) if isinstance(value, str) else 8
+                        for value in row)
+        return total
+
+    client = app.test_client()
+    pages = max(args.rows // SIZE, 1)
+    rows = []
+    for name, _ in strategies:
+        path = '/{}?page[size]={}&fields[wide]=column_0'.format(
+            name.replace(' ', '-'), SIZE)
+        client.get(path).get_data()
+
+        del statements[:]
+        client.get(path).get_data()
+        selected = selected_bytes()
+
+        # Walk the collection so the file is read, not SQLite's cache.
+        before = read_bytes()
+        start = time.perf_counter()
+        url = path
+        for _ in range(pages):
+            data = client.get(url).json
+            assert set(data['data'][0]['attributes']) == {'column_0'}
+            url = data['links'].get('next')
+            if url is None:
+                break
+        seconds = (time.perf_counter() - start) / pages
+        after = read_bytes()
+        read = '-' if before is None else '{:.0f}'.format(
+            (after - before) / pages / 1024)
+        rows.append((
+            name, '{:.0f}'.format(selected / 1024), read,
+            '{:.2f}'.format(seconds * 1e3)))
+    table((
+        'fieldset', 'selected (KiB/page)', 'file read (KiB/page)',
+        'ms/page'), rows)
+    directory.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Steady-state cost of reading a handler attribute through a stack.
+
+Compares the original uncached "__getattr__" walk with the resolution
+cache and with compiled chains.  The stack is built once; only the
+attribute access is timed.  The cache and compiled chains both still
+follow "parent" once per layer, in C, so their cost grows slowly with
+depth.  A single component skips the cache and forwards directly.
+"""
+from flask_compose import Component, compile_chain
+
+from harness import measure, table, usec
+
+
+class Handler:
+
+    def hook(self):
+        return None
+
+
+class Walking:
+    """The original forwarding component."""
+
+    def __init__(self, parent):
+        self.parent = parent
+
+    def __getattr__(self, name):
+        return getattr(self.parent, name)
+
+
+def build(components):
+    handler = Handler()
+    for component in components:
+        handler = component(handler)
+    return handler
+
+
+def main():
+    rows = []
+    for depth in range(1, 21):
+        walking = build([
+            type('Walking{}'.format(i), (Walking,), {}) for i in range(depth)])
+        components = [
+            type('Component{}'.format(i), (Component,), {})
+            for i in range(depth)]
+        cached = build(components)
+        compiled = compile_chain(Handler, tuple(components))()
+
+        rows.append((
+            depth,
+            usec(measure(lambda: walking.hook, number=100000)),
+            usec(measure(lambda: cached.hook, number=100000)),
+            usec(measure(lambda: compiled.hook, number=100000))))
+    table(('depth', 'walk (us)', 'cached (us)', 'compiled (us)'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Shared benchmark helpers.
+
+Benchmarks are plain scripts.  Run them from the repository root with
+flask_compose installed, e.g. `$ python benchmarks/dispatch.py`.
+"""
+from typing import Callable, List, Sequence
+
+import timeit
+
+
+def measure(fn: Callable[[], object], number: int = 10000, repeat: int = 5) -> float:
+    """Return the best observed seconds per call."""
+    timer = timeit.Timer(fn)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def usec(seconds: float) -> str:
+    return '{:.2f}'.format(seconds * 1e6)
+
+
+def table(headers: Sequence[str], rows: List[Sequence[object]]) -> None:
+    """Print a right-aligned text table."""
+    rows = [[str(column) for column in row] for row in rows]
+    widths = [
+        max(len(str(header)), *(len(row[index]) for row in rows))
+        for index, header in enumerate(headers)]
+    print('  '.join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print('  '.join(c.rjust(w) for c, w in zip(row, widths)))
+
+
+def synthetic_routes(count: int) -> list:
+    """Return a route tree with roughly "count" CRUD routes.
+
+    Resources of five routes are grouped a hundred to an include and
+    every group is mounted beneath a single "/api" include.
+    """
+    from flask_compose import Component, Include, Route
+
+    class Handler:
+        pass
+
+    class ApiComponent(Component):
+        pass
+
+    class GroupComponent(Component):
+        pass
+
+    class ResourceComponent(Component):
+        pass
+
+    def controller(handler, **uri_args):
+        return '', 200
+
+    def middleware(fn):
+        return fn
+
+    def resource(index):
+        return Include('/r{}'.format(index), name='r{}_'.format(index), routes=[
+            Route('', controller, Handler, 'GET', name='browse'),
+            Route('', controller, Handler, 'POST', name='create'),
+            Route('/<id>', controller, Handler, 'GET', name='get'),
+            Route('/<id>', controller, Handler, 'PATCH', name='update'),
+            Route('/<id>', controller, Handler, 'DELETE', name='delete'),
+        ], components=[ResourceComponent])
+
+    resources = [resource(index) for index in range(max(count // 5, 1))]
+    groups = [
+        Include(
+            '/g{}'.format(index // 100), name='g{}_'.format(index // 100),
+            routes=resources[index:index + 100], components=[GroupComponent])
+        for index in range(0, len(resources), 100)]
+    return [Include(
+        '/api', name='api_', routes=groups, components=[ApiComponent],
+        middleware=[middleware])]
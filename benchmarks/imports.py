@@ -0,0 +1,72 @@
+"""Cold start of the example application with eager and lazy routes.
+
+Imports "examples/app" in a fresh interpreter under "python -X
+importtime", once with its routes module importing every controller
+and component ("app.routes") and once with the routes named by import
+string ("app.lazy_routes").  Reports the cumulative import time of the
+application, the number of modules loaded and the wall time of the
+interpreter.  A last column reports the time "Router.warmup" takes to
+resolve the lazy routes afterwards.
+"""
+import os
+import re
+import subprocess
+import sys
+import time
+
+from harness import table
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, 'examples', 'app')
+
+SCRIPT = '''
+import sys, time
+import app.common
+modules = len(sys.modules)
+start = time.perf_counter()
+app.common.api.warmup()
+print(modules, time.perf_counter() - start)
+'''
+
+
+def run(lazy):
+    """Return import microseconds, modules, wall seconds and warmup
+    seconds of one interpreter."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, APP]))
+    env.pop('LAZY_ROUTES', None)
+    if lazy:
+        env['LAZY_ROUTES'] = '1'
+
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT], cwd=APP, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True,
+        universal_newlines=True)
+    wall = time.perf_counter() - start
+
+    # "import time: self [us] | cumulative | imported package"
+    cumulative = next(
+        int(match.group(1)) for match in re.finditer(
+            r'^import time:\s+\d+ \|\s+(\d+) \|\s+app\.common$',
+            process.stderr, re.MULTILINE))
+    modules, warmup = process.stdout.split()
+    return cumulative, int(modules), wall, float(warmup)
+
+
+def main(repeat=5):
+    rows = []
+    for lazy in (False, True):
+        results = [run(lazy) for _ in range(repeat)]
+        cumulative, modules, wall, warmup = min(results)
+        rows.append((
+            'lazy' if lazy else 'eager', '{:.1f}'.format(cumulative / 1e3),
+            modules, '{:.1f}'.format(min(r[2] for r in results) * 1e3),
+            '{:.1f}'.format(warmup * 1e3)))
+    table((
+        'routes', 'import app (ms)', 'modules', 'interpreter (ms)',
+        'warmup (ms)'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Rule lookups by object and path prefix.
+
+Compares the router's indexes with a linear scan of every rule for
+synthetic route tables of 10k and 50k routes.  Looks up the rules of
+one resource's component (5 rules), the rules of a group's component
+(500 rules), a controller shared by every rule and the rules beneath
+one resource's path.  Rules are not registered with flask.
+"""
+from flask_compose import Component, Include, Route, Router
+
+from harness import measure, table, usec
+
+
+class Unregistered(Router):
+    """Router which indexes rules without registering them."""
+
+    def add_url_rule(self, *args, **kwargs):
+        pass
+
+
+class Handler:
+    pass
+
+
+def controller(handler, **uri_args):
+    return '', 200
+
+
+def routes(count):
+    """Return a tree where every resource and every group of a hundred
+    resources has its own component."""
+    def resource(index):
+        return Include('/r{}'.format(index), name='r{}_'.format(index), routes=[
+            Route('', controller, Handler, 'GET', name='browse'),
+            Route('', controller, Handler, 'POST', name='create'),
+            Route('/<id>', controller, Handler, 'GET', name='get'),
+            Route('/<id>', controller, Handler, 'PATCH', name='update'),
+            Route('/<id>', controller, Handler, 'DELETE', name='delete'),
+        ], components=[type('R{}'.format(index), (Component,), {})])
+
+    resources = [resource(index) for index in range(count // 5)]
+    return [Include('/api', name='api_', routes=[
+        Include(
+            '/g{}'.format(index // 100), name='g{}_'.format(index // 100),
+            routes=resources[index:index + 100],
+            components=[type('G{}'.format(index), (Component,), {})])
+        for index in range(0, len(resources), 100)])]
+
+
+def scan(router, field, key):
+    return [
+        rule for rule in router.rules.values()
+        if key in rule.components or key is getattr(rule, field, None)]
+
+
+def scan_prefix(router, prefix):
+    return [
+        rule for rule in router.rules.values()
+        if rule.path == prefix or rule.path.startswith(prefix + '/')]
+
+
+def main():
+    rows = []
+    for count in (10000, 50000):
+        router = Unregistered(None)
+        router.add_routes(routes(count))
+        rule = router['api_g1_r150_get']
+        group, resource = rule.components
+        prefix = '/api/g1/r150'
+
+        lookups = (
+            ('component (5)', lambda: router.with_component(resource),
+             lambda: scan(router, 'components', resource)),
+            ('component (500)', lambda: router.with_component(group),
+             lambda: scan(router, 'components', group)),
+            ('controller (all)', lambda: router.with_controller(
+                rule.controller), lambda: scan(
+                    router, 'controller', rule.controller)),
+            ('path prefix (5)', lambda: router.under(prefix),
+             lambda: scan_prefix(router, prefix)),
+        )
+        for name, indexed, scanned in lookups:
+            assert len(indexed()) == len(scanned())
+            rows.append((
+                count, name, usec(measure(indexed, number=20, repeat=3)),
+                usec(measure(scanned, number=20, repeat=3))))
+    table(('routes', 'lookup', 'index (us)', 'scan (us)'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""URL matching latency for large route tables.
+
+Compares one URL rule per route with consolidated rules (one URL rule
+per path dispatching on the method).  Matching is timed through
+werkzeug's "MapAdapter.match" for a spread of paths and methods.
+"""
+from flask import Flask
+from flask_compose import Router
+
+import random
+
+from harness import measure, synthetic_routes, table, usec
+
+
+def requests(count, number=200):
+    random.seed(count)
+    resources = max(count // 5, 1)
+    paths = []
+    for _ in range(number):
+        index = random.randrange(resources)
+        prefix = '/api/g{}/r{}'.format(index // 100, index)
+        paths.append(random.choice((
+            (prefix, 'GET'), (prefix, 'POST'), (prefix + '/1', 'GET'),
+            (prefix + '/1', 'PATCH'), (prefix + '/1', 'DELETE'))))
+    return paths
+
+
+def main():
+    rows = []
+    for count in (1000, 10000, 50000):
+        routes = synthetic_routes(count)
+        paths = requests(count)
+        for consolidated in (False, True):
+            app = Flask('bench')
+            Router(app, consolidated=consolidated).add_routes(routes)
+            adapter = app.url_map.bind('localhost')
+
+            def match():
+                for path, method in paths:
+                    adapter.match(path, method)
+
+            size = sum(1 for r in app.url_map.iter_rules() if not r.build_only)
+            rows.append((
+                count, 'consolidated' if consolidated else 'per route', size,
+                usec(measure(match, number=20, repeat=3) / len(paths))))
+    table(('routes', 'mode', 'url rules', 'match (us)'), rows)
+
+
+if __name__ == '__main__':
+    main()
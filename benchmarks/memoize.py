@@ -0,0 +1,175 @@
+"""Hook calls per request with and without "memoize".
+
+Serves the example application's CRUD routes in process and counts,
+per request, the component and handler hooks executed while the
+controller walks the chain: every frame of a method defined in
+"app.components" or on "app.controllers.PlatformHandler".  The routes
+run once with the example's "@memoize" decorators stripped and once as
+shipped.  Reports the hook calls and mean microseconds per request.
+
+A final row serves a browse route whose controller consults the dump
+options once per serialized model, as field-level hooks often are, to
+show memoization where a hook is called repeatedly within a request.
+"""
+from flask_compose import Route
+
+import json
+import os
+import sys
+import time
+
+from harness import table
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'examples', 'app'))
+
+from app.common import api, app, db  # noqa: E402
+from app import components, controllers  # noqa: E402
+from app.models import UserModel, UserEmailModel  # noqa: E402
+
+
+USERS = 50
+
+
+def per_model_browse(handler, **uri_args):
+    """Browse controller serializing one model at a time."""
+    query = handler.make_query(handler.query, **uri_args)
+    result = []
+    for model in handler.fetch_all(query):
+        schema = handler.schema(**handler.schema_dump_options())
+        result.append(handler.serialize(schema, model))
+    return result, 200
+
+
+def hook_classes():
+    yield controllers.PlatformHandler
+    for value in vars(components).values():
+        if isinstance(value, type) and value.__module__ == components.__name__:
+            yield value
+
+
+def strip_memoize():
+    """Replace every memoized hook with the function it wraps."""
+    for cls in hook_classes():
+        for name, value in list(vars(cls).items()):
+            if isinstance(value, property) and hasattr(value.fget, '__wrapped__'):
+                setattr(cls, name, property(value.fget.__wrapped__))
+            elif hasattr(value, '__wrapped__'):
+                setattr(cls, name, value.__wrapped__)
+
+
+def hook_codes():
+    """Return the code of every hook, without "memoize" wrappers."""
+    codes = set()
+    for cls in hook_classes():
+        for value in vars(cls).values():
+            if isinstance(value, property):
+                value = value.fget
+            while hasattr(value, '__wrapped__'):
+                value = value.__wrapped__
+            if hasattr(value, '__code__'):
+                codes.add(value.__code__)
+    return codes
+
+
+def count_hooks(request):
+    """Return the hook calls executed by one request."""
+    codes = hook_codes()
+    count = 0
+
+    def profile(frame, event, arg):
+        nonlocal count
+        if event == 'call' and frame.f_code in codes:
+            count += 1
+
+    sys.setprofile(profile)
+    try:
+        request()
+    finally:
+        sys.setprofile(None)
+    return count
+
+
+def seed():
+    db.drop_all()
+    db.create_all()
+    for index in range(USERS):
+        user = UserModel(username='user{}'.format(index), is_active=True)
+        db.session.add(user)
+        db.session.add(UserEmailModel(user=user))
+    db.session.commit()
+
+
+def requests(client):
+    def request(method, path, body=None):
+        data = json.dumps(body) if body is not None else None
+
+        def send():
+            response = client.open(path, method=method, data=data)
+            assert response.status_code < 300, (path, response.status)
+            response.get_data()  # Write streamed collections.
+        return send
+
+    new_id = iter(range(10 ** 6, 10 ** 7))
+    return [
+        ('GET /v1/users', request('GET', '/v1/users')),
+        ('GET /v1/users/1', request('GET', '/v1/users/1')),
+        ('PATCH /v1/users/1', request(
+            'PATCH', '/v1/users/1', {'is_active': True})),
+        ('POST /v1/users', lambda: request(
+            'POST', '/v1/users', {'username': 'new'})()),
+        ('GET /v2/users', request('GET', '/v2/users')),
+        ('GET /v2/users/1', request('GET', '/v2/users/1')),
+        ('PATCH /v2/users/1', request('PATCH', '/v2/users/1', {'data': {
+            'id': '1', 'type': 'users', 'attributes': {'is_active': True}}})),
+        ('POST /v2/users', lambda: request('POST', '/v2/users', {'data': {
+            'id': str(next(new_id)), 'type': 'users',
+            'attributes': {'username': 'new'}}})()),
+        ('GET /v2/users/1/emails', request('GET', '/v2/users/1/emails')),
+        ('GET /v2/users (per model)', request('GET', '/v2/users-per-model')),
+    ]
+
+
+def mean_time(request, number=200):
+    start = time.perf_counter()
+    for _ in range(number):
+        request()
+    return (time.perf_counter() - start) / number
+
+
+def run():
+    """Return the hook calls and seconds per request of each route."""
+    with app.app_context():
+        seed()
+        client = app.test_client()
+        results = []
+        for name, request in requests(client):
+            request()  # Warm the route up.
+            results.append((name, count_hooks(request), mean_time(request)))
+        return results
+
+
+def main():
+    api.add_routes([Route(
+        '/v2/users-per-model', per_model_browse, controllers.PlatformHandler,
+        'GET', name='per_model', components=[
+            components.JSONAPIComponent, components.ActiveUserComponent,
+            components.UserComponent])])
+
+    after = run()
+    strip_memoize()
+    before = run()
+
+    rows = []
+    for (name, calls, seconds), (_, memo_calls, memo_seconds) in zip(
+            before, after):
+        rows.append((
+            name, calls, memo_calls, '{:.1f}'.format(seconds * 1e6),
+            '{:.1f}'.format(memo_seconds * 1e6)))
+    table((
+        'route', 'hooks', 'memoized', 'us/request', 'memoized'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Memory held per registered route.
+
+Uses tracemalloc to report the bytes retained by route definitions,
+by the compiled rules alone and by a flask application with the rules
+registered.
+"""
+from flask import Flask
+from flask_compose import Router
+
+import gc
+import tracemalloc
+
+from harness import synthetic_routes, table
+
+
+class CompileOnly(Router):
+    """Router which compiles rules without registering them."""
+
+    def add_rule(self, rule):
+        self.rules[rule.name] = rule
+
+
+def retained(fn):
+    """Return the result of fn and the bytes it retained."""
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def register(routes, router):
+    router.add_routes(routes)
+    return router
+
+
+def main():
+    rows = []
+    for count in (1000, 10000):
+        routes, definitions = retained(lambda: synthetic_routes(count))
+        _, rules = retained(lambda: register(routes, CompileOnly(None)))
+        _, app = retained(lambda: register(routes, Router(Flask('bench'))))
+        rows.append((
+            count, definitions // count, rules // count, app // count))
+    table((
+        'routes', 'definition (B/route)', 'rules (B/route)',
+        'flask app (B/route)'), rows)
+
+
+if __name__ == '__main__':
+    main()
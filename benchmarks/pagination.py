@@ -0,0 +1,98 @@
+"""Page latency by page depth with keyset and offset pagination.
+
+Fills a local SQLite table with a million users (see "--rows") and
+requests pages of the example application's "/v2/users" collection at
+increasing depths: as shipped, seeking to a "page[after]" cursor with
+"PaginationComponent", and with an offset pagination component in its
+place which skips the rows of the pages before.  Reports the mean
+milliseconds per request.  Every response also counts the collection
+for "meta.total", which costs the same at any depth.
+"""
+from flask import request
+from flask_compose import Component, Include
+
+import argparse
+import base64
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from harness import table
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'examples', 'app'))
+
+SIZE = 20
+
+
+class OffsetPaginationComponent(Component):
+    """Offset pagination, for comparison."""
+
+    def fetch_all(self, query):
+        number = request.args.get('page[number]', 1, type=int)
+        query = query.order_by(self.model.id)
+        return list(self.parent.fetch_all(
+            query.offset((number - 1) * SIZE).limit(SIZE)))
+
+
+def cursor(number):
+    """Return the cursor after the last row of the previous page."""
+    data = json.dumps([(number - 1) * SIZE]).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii')
+
+
+def mean_time(client, path, number=20):
+    client.get(path).get_data()
+    start = time.perf_counter()
+    for _ in range(number):
+        response = client.get(path)
+        assert len(response.json['data']) == SIZE, path
+    return (time.perf_counter() - start) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    directory = tempfile.TemporaryDirectory()
+    filename = os.path.join(directory.name, 'users.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + filename
+
+    from app.common import api, app, db
+    from app.components import PaginationComponent
+    from app.routes import routes
+
+    api.add_routes([Include(
+        '/offset', routes=routes, components=[OffsetPaginationComponent],
+        ignored_components=[PaginationComponent])])
+    with app.app_context():
+        db.create_all()
+    with sqlite3.connect(filename) as connection:
+        connection.executemany(
+            'INSERT INTO user (username, is_active) VALUES (?, 1)',
+            (('user{}'.format(index),) for index in range(args.rows)))
+
+    client = app.test_client()
+    rows = []
+    pages = args.rows // SIZE
+    for number in (1, 10, 100, 1000, 10000, pages):
+        if number > pages:
+            continue
+        keyset = '/v2/users?page[size]={}'.format(SIZE)
+        if number > 1:
+            keyset += '&page[after]={}'.format(cursor(number))
+        offset = '/offset/v2/users?page[number]={}'.format(number)
+        rows.append((
+            number, '{:.2f}'.format(mean_time(client, keyset) * 1e3),
+            '{:.2f}'.format(mean_time(client, offset) * 1e3)))
+    table(('page', 'keyset (ms)', 'offset (ms)'), rows)
+    directory.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Cost of swapping one include in a running application.
+
+A synthetic 10k route application has one of its 20 resource groups
+(500 routes) swapped for a version with a different controller, the
+way a feature flag would.  The swap is timed through
+"Router.replace_routes" and "Router.sync" against rebuilding the
+application from scratch.  A final row swaps the group for an
+identical copy, where no rule changes and nothing is re-registered.
+"""
+from flask import Flask
+from flask_compose import Include, Route, Router, Scope
+
+import time
+
+from harness import synthetic_routes, table
+
+
+def flagged(group):
+    """Return a copy of a group whose routes use another controller."""
+    def controller(handler, **uri_args):
+        return 'flagged', 200
+
+    return Include(group.path, name=group.name, components=group.components, routes=[
+        Include(resource.path, name=resource.name, components=resource.components, routes=[
+            Route(route.path, controller, route.handler, route.method, name=route.name)
+            for route in resource.routes])
+        for resource in group.routes])
+
+
+def copied(group):
+    return Include(
+        group.path, name=group.name, components=group.components,
+        routes=group.routes)
+
+
+def elapsed(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    routes = synthetic_routes(10000)
+    api = routes[0]
+    scope = Scope.of([api])
+    groups = api.routes
+    swapped = flagged(groups[10])
+
+    app = Flask('bench')
+    router = Router(app)
+    router.add_routes(routes)
+    app.test_client().get('/api/g0/r0')
+
+    def rebuild():
+        Router(Flask('bench')).add_routes(routes)
+
+    state = [groups[10], swapped]
+
+    def replace():
+        state.reverse()
+        router.replace_routes(state[0], scope)
+
+    def sync():
+        state.reverse()
+        router.sync(groups[:10] + [state[0]] + groups[11:], scope)
+
+    def replace_identical():
+        router.replace_routes(copied(state[0]), scope)
+
+    rows = [
+        ('rebuild application', '{:.1f}'.format(elapsed(rebuild) * 1e3)),
+        ('replace_routes', '{:.1f}'.format(elapsed(replace) * 1e3)),
+        ('sync', '{:.1f}'.format(elapsed(sync) * 1e3)),
+        ('replace_routes (unchanged)', '{:.1f}'.format(
+            elapsed(replace_identical) * 1e3)),
+    ]
+    assert app.test_client().get('/api/g5/r500').status_code == 200
+    table(('10k routes, swap 500', 'time (ms)'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Requests per second of the example's GET routes with and without
+schema reuse.
+
+Serves the example application's GET routes in process, as shipped
+("SchemaCacheComponent" reusing schema instances) and beneath an
+"/uncached" include ignoring it, so every request constructs its
+schema.  Also reports the cost of constructing a schema against
+fetching it from the cache.
+"""
+from flask_compose import Include
+
+import os
+import sys
+import timeit
+
+from harness import measure, table, usec
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'examples', 'app'))
+
+from app.common import api, app, db  # noqa: E402
+from app.components import SchemaCacheComponent  # noqa: E402
+from app.controllers import PlatformHandler  # noqa: E402
+from app.models import UserModel, UserEmailModel  # noqa: E402
+from app.routes import routes  # noqa: E402
+from app.schemas import UserSchema  # noqa: E402
+
+
+USERS = 20
+PATHS = (
+    '/v1/users', '/v1/users/1', '/v2/users', '/v2/users/1',
+    '/v2/users/1/emails')
+
+
+def seed():
+    db.create_all()
+    for index in range(USERS):
+        user = UserModel(username='user{}'.format(index))
+        db.session.add(user)
+        db.session.add(UserEmailModel(user=user))
+    db.session.commit()
+
+
+def requests_per_second(client, path, number=500, repeat=5):
+    def request():
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status)
+        response.get_data()
+    best = min(timeit.repeat(request, number=number, repeat=repeat))
+    return number / best
+
+
+def main():
+    api.add_routes([Include(
+        '/uncached', routes=routes,
+        ignored_components=[SchemaCacheComponent])])
+
+    with app.app_context():
+        seed()
+        client = app.test_client()
+        rows = []
+        for path in PATHS:
+            uncached = requests_per_second(client, '/uncached' + path)
+            cached = requests_per_second(client, path)
+            rows.append((
+                path, '{:.0f}'.format(uncached), '{:.0f}'.format(cached),
+                '{:+.1f}%'.format((cached / uncached - 1) * 100)))
+        table(('route', 'uncached (req/s)', 'cached (req/s)', 'change'), rows)
+
+    print()
+    handler = SchemaCacheComponent(PlatformHandler())
+    only = ('id', 'username')
+    table(('schema', 'us/call'), [
+        ('construct', usec(measure(lambda: UserSchema(only=only)))),
+        ('cached', usec(measure(
+            lambda: handler.make_schema(UserSchema, only=only)))),
+    ])
+
+
+if __name__ == '__main__':
+    main()
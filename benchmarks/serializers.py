@@ -0,0 +1,118 @@
+"""Serialization with and without compiled serializers.
+
+Dumps a collection of the example application's users and emails with
+marshmallow (restructured for JSON:API as "JSONAPIComponent" does) and
+with the functions "compile_serializer" generates, reporting
+microseconds per item.  Then serves the example's GET routes in
+process, as shipped ("CompiledSerializerComponent" mounted) and beneath
+an "/interpreted" include ignoring it, reporting requests per second.
+"""
+from flask_compose import Include
+
+import collections
+import os
+import sys
+import timeit
+
+from harness import measure, table, usec
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'examples', 'app'))
+
+from app.common import api, app, db  # noqa: E402
+from app.components import CompiledSerializerComponent  # noqa: E402
+from app.models import UserModel, UserEmailModel  # noqa: E402
+from app.routes import routes  # noqa: E402
+from app.schemas import UserSchema, UserEmailSchema  # noqa: E402
+from app.serializers import compile_serializer  # noqa: E402
+
+
+USERS = 500
+ITEMS = 100
+PATHS = (
+    '/v1/users', '/v1/users/1', '/v2/users?page[size]=100', '/v2/users/1',
+    '/v2/users/1/emails')
+
+
+def structure(item, jsonapi_type):
+    data = collections.defaultdict(dict)
+    data['id'] = item.pop('id')
+    data['type'] = jsonapi_type
+    for key, value in item.items():
+        data['attributes'][key] = value
+    return data
+
+
+def seed():
+    db.create_all()
+    for index in range(USERS):
+        user = UserModel(username='user{}'.format(index))
+        db.session.add(user)
+        db.session.add(UserEmailModel(
+            user=user, email_address='user{}@example.com'.format(index)))
+    db.session.commit()
+
+
+def requests_per_second(client, path, number=200, repeat=5):
+    def request():
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status)
+        response.get_data()
+    best = min(timeit.repeat(request, number=number, repeat=repeat))
+    return number / best
+
+
+def dump_times(name, schema, rows, jsonapi_type=None):
+    serializer = compile_serializer(schema, jsonapi_type=jsonapi_type)
+
+    def interpreted():
+        items = schema.dump(rows, many=True).data
+        if jsonapi_type is not None:
+            items = [structure(item, jsonapi_type) for item in items]
+        return items
+
+    def compiled():
+        return serializer.dump(rows, many=True).data
+
+    assert interpreted() == compiled()
+    before = measure(interpreted, number=100) / len(rows)
+    after = measure(compiled, number=100) / len(rows)
+    return name, usec(before), usec(after), '{:.1f}x'.format(before / after)
+
+
+def main():
+    api.add_routes([Include(
+        '/interpreted', routes=routes,
+        ignored_components=[CompiledSerializerComponent])])
+
+    with app.app_context():
+        seed()
+        users = UserModel.query.limit(ITEMS).all()
+        emails = UserEmailModel.query.limit(ITEMS).all()
+        only = ('id', 'username')
+        table(('items', 'marshmallow (us/item)', 'compiled', 'speedup'), [
+            dump_times('users', UserSchema(only=only), users),
+            dump_times('users (JSON:API)', UserSchema(only=only), users,
+                       'users'),
+            dump_times('emails (JSON:API)', UserEmailSchema(), emails,
+                       'users-emails'),
+        ])
+
+        print()
+        client = app.test_client()
+        rows = []
+        for path in PATHS:
+            interpreted = requests_per_second(client, '/interpreted' + path)
+            compiled = requests_per_second(client, path)
+            rows.append((
+                path, '{:.0f}'.format(interpreted),
+                '{:.0f}'.format(compiled),
+                '{:+.1f}%'.format((compiled / interpreted - 1) * 100)))
+        table(
+            ('route', 'interpreted (req/s)', 'compiled (req/s)', 'change'),
+            rows)
+
+
+if __name__ == '__main__':
+    main()
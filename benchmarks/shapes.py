@@ -0,0 +1,60 @@
+"""Per-request overhead by route shape.
+
+Compares the generic view, "functools.partial(dispatch_request, ...)"
+which loops over the component stack, with the view specialized for
+the route's shape at compile time.  The controller does nothing so the
+time is the dispatch overhead alone.
+"""
+from flask_compose import Component, Route, dispatch_request
+
+import functools
+
+from harness import measure, table, usec
+
+
+class Handler:
+    pass
+
+
+def controller(handler, **uri_args):
+    return None
+
+
+def middleware(fn):
+    def decorator(*args, **kwargs):
+        return fn(*args, **kwargs)
+    return decorator
+
+
+def make_components(depth):
+    return [
+        type('Component{}'.format(index), (Component,), {})
+        for index in range(depth)]
+
+
+def main():
+    rows = []
+    shapes = (
+        ('bare', 0, 0), ('1 component', 1, 0), ('4 components', 4, 0),
+        ('1 middleware', 0, 1), ('4 components, 1 middleware', 4, 1))
+    for name, depth, middlewares in shapes:
+        components = make_components(depth)
+        route = Route(
+            '/<id>', controller, Handler, components=components,
+            middleware=[middleware] * middlewares)
+        generic = functools.partial(
+            dispatch_request, controller, Handler, tuple(components))
+        for _ in range(middlewares):
+            generic = middleware(generic)
+        specialized = route.make_url_rule([]).action
+
+        generic_time = measure(lambda: generic(id='1'), number=100000)
+        specialized_time = measure(lambda: specialized(id='1'), number=100000)
+        rows.append((
+            name, usec(generic_time), usec(specialized_time),
+            '{:.2f}x'.format(generic_time / specialized_time)))
+    table(('shape', 'generic (us)', 'specialized (us)', 'speedup'), rows)
+
+
+if __name__ == '__main__':
+    main()
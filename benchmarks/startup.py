@@ -0,0 +1,99 @@
+"""Route compilation and registration time at startup.
+
+Registers synthetic route trees of 1k, 10k and 50k routes and reports
+the time spent compiling rules alone and the time spent in
+"Router.add_routes" (which includes registering the rules with flask).
+A second table mounts one 5k route subtree under several prefixes,
+either as the same "Include" object or as distinct copies, and
+reports compile time and memory held by the compiled rules.  A third
+table compiles a single route beneath increasingly deep include chains
+where every level adds and ignores a component.
+"""
+from flask import Flask
+from flask_compose import Component, Include, Route, Router
+
+import time
+import tracemalloc
+
+from harness import measure, synthetic_routes, table, usec
+
+
+class CompileOnly(Router):
+    """Router which compiles rules without registering them."""
+
+    def add_rule(self, rule):
+        self.rules[rule.name] = rule
+
+
+def elapsed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def nested(depth):
+    class Handler:
+        pass
+
+    route = Route('/<id>', None, Handler, name='route')
+    for index in range(depth):
+        route = Include(
+            '/n{}'.format(index), name='n{}_'.format(index), routes=[route],
+            components=[type('C{}'.format(index), (Component,), {})],
+            ignored_components=[Component])
+    return [route]
+
+
+def mounts(count, shared):
+    subtree = synthetic_routes(5000)[0]
+    return [
+        Include(
+            '/v{}'.format(index), name='v{}_'.format(index),
+            routes=[subtree if shared else synthetic_routes(5000)[0]],
+            components=[type('V{}'.format(index), (Component,), {})])
+        for index in range(count)]
+
+
+def compiled_bytes(routes):
+    tracemalloc.start()
+    router = CompileOnly(None)
+    router.add_routes(routes)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def main():
+    rows = []
+    for count in (1000, 10000, 50000):
+        routes = synthetic_routes(count)
+        compile_time = elapsed(lambda: CompileOnly(None).add_routes(routes))
+        register_time = elapsed(lambda: Router(Flask('bench')).add_routes(routes))
+        rows.append((
+            count, '{:.3f}'.format(compile_time),
+            usec(compile_time / count), '{:.3f}'.format(register_time)))
+    table(('routes', 'compile (s)', 'per route (us)', 'add_routes (s)'), rows)
+    print()
+
+    rows = []
+    for count in (2, 8):
+        for shared in (False, True):
+            routes = mounts(count, shared)
+            rows.append((
+                count, 'shared' if shared else 'copies',
+                '{:.3f}'.format(
+                    elapsed(lambda: CompileOnly(None).add_routes(routes))),
+                '{:.1f}'.format(compiled_bytes(routes) / 2 ** 20)))
+    table(('mounts', 'subtree', 'compile (s)', 'rules (MiB)'), rows)
+    print()
+
+    rows = []
+    for depth in (1, 8, 32, 128, 512):
+        routes = nested(depth)
+        rows.append((depth, usec(measure(
+            lambda: CompileOnly(None).add_routes(routes), number=20))))
+    table(('depth', 'compile (us)'), rows)
+
+
+if __name__ == '__main__':
+    main()
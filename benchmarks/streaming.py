@@ -0,0 +1,107 @@
+"""Peak memory and time to first byte of streamed collections.
+
+Fills a local SQLite table with a million users (see "--rows") and
+requests the example application's whole "/v1/users" and "/v2/users"
+collections ("PaginationComponent" ignored), as shipped (streamed
+through "StreamComponent") and with "StreamComponent" ignored so every
+row is fetched, serialized and rendered before the response starts.  Each request runs in a fresh
+interpreter.  Reports the growth of the interpreter's peak RSS during
+the request, the time to the first byte of the body and to the last.
+"""
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+from harness import table
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, 'examples', 'app')
+
+SCRIPT = '''
+import resource, sys, time
+from flask_compose import Include
+from app.common import api, app
+from app.components import PaginationComponent, StreamComponent
+from app.routes import routes
+
+api.add_routes([
+    Include('/eager', routes=routes, ignored_components=[
+        PaginationComponent, StreamComponent]),
+    Include('/full', routes=routes, ignored_components=[PaginationComponent]),
+])
+path = sys.argv[1]
+client = app.test_client()
+client.get(path + '/1')  # Warm the route up.
+
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+response = client.get(path, buffered=False)
+chunks = iter(response.response)
+size = len(next(chunks))
+first = time.perf_counter() - start
+for chunk in chunks:
+    size += len(chunk)
+last = time.perf_counter() - start
+response.close()
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(after - before, first, last, size)
+'''
+
+
+def environment(filename):
+    return dict(
+        os.environ, DATABASE_URL='sqlite:///' + filename,
+        PYTHONPATH=os.pathsep.join([ROOT, APP]))
+
+
+def seed(filename, rows):
+    subprocess.run([
+        sys.executable, '-c',
+        'from app.common import app, db\n'
+        'from app.models import UserModel\n'
+        'with app.app_context(): db.create_all()'],
+        cwd=APP, env=environment(filename), check=True)
+    with sqlite3.connect(filename) as connection:
+        connection.executemany(
+            'INSERT INTO user (username, is_active) VALUES (?, 1)',
+            (('user{}'.format(index),) for index in range(rows)))
+
+
+def request(filename, path):
+    """Return peak RSS growth in KiB, first and last byte seconds and
+    the body's size."""
+    process = subprocess.run(
+        [sys.executable, '-c', SCRIPT, path], cwd=APP,
+        env=environment(filename),
+        stdout=subprocess.PIPE, check=True, universal_newlines=True)
+    rss, first, last, size = process.stdout.split()
+    return int(rss), float(first), float(last), int(size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'users.db')
+        seed(filename, args.rows)
+        for path in ('/v1/users', '/v2/users'):
+            for name, prefix in (('materialized', '/eager'), ('streamed', '/full')):
+                rss, first, last, size = request(filename, prefix + path)
+                rows.append((
+                    path, name, '{:.1f}'.format(rss / 1024),
+                    '{:.1f}'.format(first * 1e3), '{:.1f}'.format(last * 1e3),
+                    '{:.1f}'.format(size / 2 ** 20)))
+    table((
+        'route', 'response', 'peak RSS (MiB)', 'first byte (ms)',
+        'last byte (ms)', 'body (MiB)'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""Release benchmark suite.
+
+Runs offline and writes every measurement to a JSON file so releases
+can be compared:
+
+    $ python benchmarks/suite.py --output 0.2.0.json
+    $ python benchmarks/suite.py --output head.json --compare 0.2.0.json
+
+Per-request overhead is measured against a bare "app.add_url_rule"
+view across component chain depths, middleware counts and route table
+sizes for the plain, compiled and reused dispatchers (those the
+installed flask_compose supports, see "supported_modes").  It is reported
+twice: for calling the registered view function alone, which isolates
+flask_compose and is stable from run to run, and for a whole request
+through flask's WSGI application.  Startup is the time
+"Router.add_routes" takes and memory the bytes retained per registered
+route.
+"""
+from flask import Flask
+from flask_compose import Component, Route, Router
+from werkzeug.test import EnvironBuilder
+
+import argparse
+import gc
+import importlib.metadata
+import inspect
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from harness import measure, synthetic_routes, table, usec
+
+
+MODES = {
+    'plain': {},
+    'compiled': {'compiled': True},
+    'reused': {'reused': True},
+}
+
+
+def supported_modes():
+    """Return the modes whose "Router" options the installed
+    flask_compose accepts, so older releases can be measured."""
+    parameters = inspect.signature(Router).parameters
+    return {
+        mode: options for mode, options in MODES.items()
+        if all(option in parameters for option in options)}
+
+
+class Handler:
+
+    def hook(self):
+        return None
+
+
+def controller(handler, **uri_args):
+    handler.hook()
+    return '', 200
+
+
+def bare_view(**uri_args):
+    return '', 200
+
+
+def middleware(fn):
+    def decorator(*args, **kwargs):
+        return fn(*args, **kwargs)
+    return decorator
+
+
+def components(depth):
+    return [
+        type('Component{}'.format(index), (Component,), {})
+        for index in range(depth)]
+
+
+def requester(app, path='/r/1'):
+    """Return a function making a GET request through the WSGI app."""
+    environ = EnvironBuilder(path=path).get_environ()
+    wsgi_app = app.wsgi_app
+
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    def request():
+        for _ in wsgi_app(dict(environ), start_response):
+            pass
+    return request
+
+
+def viewer(app, endpoint):
+    """Return a function calling the view registered for the endpoint."""
+    view = app.view_functions[endpoint]
+    return lambda: view(id='1')
+
+
+def best_times(*fns, number=1000, repeat=7):
+    """Return the best seconds per call of each function.
+
+    Functions are measured in alternation so drift in the machine's
+    speed affects each of them alike.
+    """
+    best = [float('inf')] * len(fns)
+    for _ in range(repeat):
+        for index, fn in enumerate(fns):
+            best[index] = min(best[index], measure(
+                fn, number=number, repeat=1))
+    return best
+
+
+def bare_app(count=1):
+    app = Flask('bench')
+    for index in range(count):
+        app.add_url_rule(
+            '/r{}/<id>'.format(index or ''), 'bare{}'.format(index),
+            bare_view)
+    return app
+
+
+def routed_app(mode, depth=0, middlewares=0, count=1):
+    app = Flask('bench')
+    Router(app, **MODES[mode]).add_routes([
+        Route('/r{}/<id>'.format(index or ''), controller, Handler,
+              name='r{}'.format(index), components=components(depth),
+              middleware=[middleware] * middlewares)
+        for index in range(count)])
+    return app
+
+
+def overhead(results, key, mode, baseline, **options):
+    app = routed_app(mode, **options)
+    view, bare_view = best_times(
+        viewer(app, 'r0'), viewer(baseline, 'bare0'), number=10000)
+    request, bare_request = best_times(requester(app), requester(baseline))
+    results.setdefault(key, []).append(dict(
+        options, mode=mode, view_us=round((view - bare_view) * 1e6, 3),
+        request_us=round((request - bare_request) * 1e6, 3)))
+
+
+def dispatch(results):
+    baseline = bare_app()
+    results['bare_request_us'] = round(
+        best_times(requester(baseline))[0] * 1e6, 3)
+    modes = supported_modes()
+    for mode in modes:
+        for depth in (0, 1, 4, 16):
+            overhead(results, 'depth', mode, baseline, depth=depth)
+        for middlewares in (1, 4, 16):
+            overhead(results, 'middleware', mode, baseline,
+                     middlewares=middlewares)
+
+    for count in (100, 1000, 10000):
+        baseline = bare_app(count)
+        for mode in modes:
+            overhead(results, 'routes', mode, baseline, count=count)
+
+
+def startup(results):
+    for count in (1000, 10000):
+        routes = synthetic_routes(count)
+        for mode in supported_modes():
+            app = Flask('bench')
+            router = Router(app, **MODES[mode])
+            gc.collect()
+            tracemalloc.start()
+            start = time.perf_counter()
+            router.add_routes(routes)
+            elapsed = time.perf_counter() - start
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            results.setdefault('startup', []).append({
+                'mode': mode, 'count': count,
+                'add_routes_s': round(elapsed, 4),
+                'bytes_per_route': size // count})
+
+
+def report(results, previous=None):
+    def change(key, row, field):
+        # Rows are matched by their options: either run may lack modes.
+        if previous is None:
+            return ''
+        options = {
+            name: value for name, value in row.items()
+            if not name.endswith(('_us', '_s')) and name != 'bytes_per_route'}
+        before = next((
+            other[field] for other in previous.get(key, ())
+            if all(other.get(name) == value
+                   for name, value in options.items())), None)
+        if not before:
+            return ''
+        return '{:+.1f}%'.format((row[field] / before - 1) * 100)
+
+    print('bare request: {} us'.format(usec(results['bare_request_us'] / 1e6)))
+    for key, option in (
+            ('depth', 'depth'), ('middleware', 'middlewares'),
+            ('routes', 'count')):
+        table((
+            option, 'mode', 'view (us)', 'change', 'request (us)',
+            'change'), [
+            (row[option], row['mode'], row['view_us'],
+             change(key, row, 'view_us'), row['request_us'],
+             change(key, row, 'request_us'))
+            for row in results[key]])
+        print()
+    table(('routes', 'mode', 'add_routes (s)', 'B/route', 'change'), [
+        (row['count'], row['mode'], row['add_routes_s'],
+         row['bytes_per_route'], change('startup', row, 'add_routes_s'))
+        for row in results['startup']])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--output', help='Write the results to a JSON file.')
+    parser.add_argument('--compare', help='Compare with a JSON results file.')
+    args = parser.parse_args()
+
+    results: dict = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'flask': importlib.metadata.version('flask'),
+        'werkzeug': importlib.metadata.version('werkzeug'),
+    }
+    dispatch(results)
+    startup(results)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    report(results, previous)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""URL matching latency of the prefix trie.
+
+Compares werkzeug's "MapAdapter.match" with the router's trie for a
+spread of paths and methods, and the time taken to build the trie.
+"""
+from flask import Flask
+from flask_compose import Router
+from flask_compose.trie import Trie, TrieAdapter
+
+import time
+
+from harness import measure, synthetic_routes, table, usec
+from matching import requests
+
+
+def main():
+    rows = []
+    for count in (1000, 10000, 50000):
+        routes = synthetic_routes(count)
+        paths = requests(count)
+        for consolidated in (False, True):
+            app = Flask('bench')
+            Router(app, consolidated=consolidated).add_routes(routes)
+            adapter = app.url_map.bind('localhost')
+            app.url_map.update()
+
+            start = time.perf_counter()
+            trie = TrieAdapter(adapter, Trie(app.url_map.iter_rules()))
+            build = time.perf_counter() - start
+
+            for matcher in (adapter, trie):
+                def match():
+                    for path, method in paths:
+                        matcher.match(path, method)
+
+                rows.append((
+                    count, 'consolidated' if consolidated else 'per route',
+                    'trie' if matcher is trie else 'werkzeug',
+                    '{:.1f}'.format(build * 1e3) if matcher is trie else '-',
+                    usec(measure(match, number=20, repeat=3) / len(paths))))
+    table(('routes', 'mode', 'matcher', 'build (ms)', 'match (us)'), rows)
+
+
+if __name__ == '__main__':
+    main()
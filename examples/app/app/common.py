@@ -2,13 +2,21 @@ from flask import Flask
 from flask_compose import Router
 from flask_sqlalchemy import SQLAlchemy
 
+import os
+
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'DATABASE_URL', 'sqlite://')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db = SQLAlchemy(app)
 
 
-from app.routes import routes
+# Set "LAZY_ROUTES" to defer importing the application's components
+# until they serve a request.
+if os.environ.get('LAZY_ROUTES'):
+    from app.lazy_routes import routes
+else:
+    from app.routes import routes
 api = Router(app)
 api.add_routes(routes)
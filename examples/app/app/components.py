@@ -3,13 +3,26 @@
 This module contains our application's composable business logic.  This
 code can be broadly applicable or highly specialized.
 """
-from flask import request
-from flask_compose import Component
-
+from concurrent.futures import ThreadPoolExecutor
+from flask import abort, request
+from flask_compose import Component, memoize
+from flask_compose.cache import MemoryCache
+from sqlalchemy.sql.util import find_tables
+
+from app.common import db
+from app.controllers import count_statement
 from app.models import UserModel, UserEmailModel, UserPhoneModel
 from app.schemas import UserSchema, UserEmailSchema, UserPhoneSchema
+from app.serializers import Serializer, compile_serializer
+from app.streaming import JSONStream
 
+import base64
 import collections
+import functools
+import json
+import sqlalchemy
+import threading
+import urllib.parse
 
 
 class ActiveUserComponent(Component):
@@ -24,8 +37,10 @@ class TypeComponent(Component):
     model = None
     schema = None
     jsonapi_type = None
+    page_key = None  # The primary key orders pages unless named.
 
     @property
+    @memoize
     def query(self):
         return self.model.query
 
@@ -37,15 +52,82 @@ class TypeComponent(Component):
         return query
 
 
+# Schemas cached by "SchemaCacheComponent", one cache per thread.
+schema_caches = threading.local()
+
+
+def freeze(value):
+    """Return a hashable copy of schema options."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(item) for item in value)
+    return value
+
+
+class SchemaCacheComponent(Component):
+    """Reuse schema instances between requests.
+
+    Instances are kept by schema class and options, the
+    "schema_cache_size" most recently used per thread.  Marshmallow
+    schemas keep state while they dump or load so an instance is only
+    used by the thread which constructed it.  Cached schemas must not
+    be modified (e.g. their "context").
+    """
+    schema_cache_size = 128
+
+    def make_schema(self, schema, **schema_options):
+        try:
+            key = (schema, freeze(schema_options))
+            hash(key)
+        except TypeError:
+            return self.parent.make_schema(schema, **schema_options)
+
+        cache = getattr(schema_caches, 'schemas', None)
+        if cache is None:
+            cache = schema_caches.schemas = collections.OrderedDict()
+        try:
+            cache.move_to_end(key)
+            return cache[key]
+        except KeyError:
+            pass
+
+        instance = cache[key] = self.parent.make_schema(
+            schema, **schema_options)
+        if len(cache) > self.schema_cache_size:
+            cache.popitem(last=False)
+        return instance
+
+
+class CompiledSerializerComponent(Component):
+    """Dump with functions compiled for each schema.
+
+    See "app.serializers".  Schemas which can not be compiled are
+    dumped by marshmallow.
+    """
+
+    def make_serializer(self, schema, **envelope):
+        return compile_serializer(schema, **envelope)
+
+    def serialize(self, schema, model, **dump_options):
+        if not isinstance(schema, Serializer):
+            schema = compile_serializer(schema) or schema
+        return self.parent.serialize(schema, model, **dump_options)
+
+
 class UserComponent(TypeComponent):
     model = UserModel
     schema = UserSchema
     jsonapi_type = 'users'
 
+    @memoize
     def schema_dump_options(self, **schema_options):
         schema_options['only'] = ('id', 'username')
         return self.parent.schema_dump_options(**schema_options)
 
+    @memoize
     def schema_load_options(self, **schema_options):
         schema_options['only'] = ('id', 'username', 'is_active')
         return self.parent.schema_load_options(**schema_options)
@@ -53,6 +135,7 @@ class UserComponent(TypeComponent):
 
 class UserUpdateComponent(Component):
 
+    @memoize
     def schema_load_options(self, **schema_options):
         schema_options['only'] = ('id', 'is_active')
         return self.parent.schema_load_options(**schema_options)
@@ -61,6 +144,7 @@ class UserUpdateComponent(Component):
 class UserChildMixin:
 
     @property
+    @memoize
     def query(self):
         return self.model.query.join(UserModel)
 
@@ -77,6 +161,324 @@ class UserPhoneComponent(UserChildMixin, TypeComponent):
     jsonapi_type = 'users-phones'
 
 
+class StreamComponent(Component):
+    """Stream collections rather than building them in memory.
+
+    Rows are fetched "batch_size" at a time and serialized as the
+    response is written.  Collections a child component materialized,
+    e.g. a page of "PaginationComponent", are serialized as usual.
+    """
+    batch_size = 1000
+
+    def fetch_all(self, query):
+        """Return an iterator of the query's rows."""
+        self.rows = query.yield_per(self.batch_size)
+        return self.rows
+
+    def serialize(self, schema, model, **dump_options):
+        """Return a stream of serialized rows for a collection."""
+        if model is not getattr(self, 'rows', None):
+            return self.parent.serialize(schema, model, **dump_options)
+        dump_options.pop('many', None)
+        return JSONStream(
+            schema.dump(row, **dump_options).data for row in model)
+
+
+class PaginationComponent(Component):
+    """Keyset (cursor) pagination of collections.
+
+    A page is requested with "page[size]" and either "page[after]" or
+    "page[before]", an opaque cursor naming the row which ends the
+    previous page or begins the next one.  Rows are ordered by the
+    type's "page_key" column, then by its primary key, and a page is
+    found by seeking to its cursor rather than skipping the rows before
+    it, so a deep page costs as much as the first.
+    """
+    page_size = 20
+    max_page_size = 100
+
+    def page_columns(self):
+        """Return the columns rows are ordered by."""
+        primary_key = sqlalchemy.inspect(self.model).primary_key[0]
+        if self.page_key is None or self.page_key == primary_key.key:
+            return [primary_key]
+        return [getattr(self.model, self.page_key), primary_key]
+
+    def fetch_all(self, query):
+        """Return a page of the query's rows."""
+        size = request.args.get('page[size]', str(self.page_size))
+        if not size.isdigit() or int(size) < 1:
+            abort(400)
+        size = min(int(size), self.max_page_size)
+
+        before = request.args.get('page[before]')
+        after = request.args.get('page[after]')
+        columns = self.page_columns()
+        if before or after:
+            values = self.decode_cursor(before or after, columns)
+            if len(columns) == 1:
+                row, values = columns[0], values[0]
+            else:
+                row = sqlalchemy.tuple_(*columns)
+                values = sqlalchemy.tuple_(*values)
+            query = query.filter(row < values if before else row > values)
+
+        order = [column.desc() if before else column for column in columns]
+        query = query.order_by(None).order_by(*order).limit(size + 1)
+        rows = list(self.parent.fetch_all(query))
+        more = len(rows) > size
+        rows = rows[:size]
+        if before:
+            rows.reverse()
+
+        # A page reached from a cursor has a neighbour on that side.
+        has_next = more if not before else True
+        has_prev = more if before else after is not None
+        self.links = {}
+        if rows and has_next:
+            self.links['next'] = self.page_url(
+                size, after=self.encode_cursor(rows[-1], columns))
+        if rows and has_prev:
+            self.links['prev'] = self.page_url(
+                size, before=self.encode_cursor(rows[0], columns))
+        return rows
+
+    def page_links(self):
+        """Return the links to the adjacent pages."""
+        return getattr(self, 'links', {})
+
+    def page_url(self, size, **cursor):
+        args = [
+            (key, value) for key, value in request.args.items(multi=True)
+            if not key.startswith('page[')]
+        args.append(('page[size]', size))
+        for key, value in cursor.items():
+            args.append(('page[{}]'.format(key), value))
+        return request.base_url + '?' + urllib.parse.urlencode(args)
+
+    def encode_cursor(self, row, columns):
+        """Return a cursor naming the row.  Values JSON can not hold
+        (e.g. dates) are written as strings."""
+        values = [getattr(row, column.key) for column in columns]
+        data = json.dumps(values, default=str).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii')
+
+    def decode_cursor(self, cursor, columns):
+        """Return the values of a cursor as the columns' types."""
+        try:
+            values = json.loads(base64.urlsafe_b64decode(
+                cursor.encode('ascii')))
+        except ValueError:
+            abort(400)
+        if not isinstance(values, list) or len(values) != len(columns):
+            abort(400)
+        try:
+            return [
+                self.decode_value(column, value)
+                for column, value in zip(columns, values)]
+        except (TypeError, ValueError, ArithmeticError):
+            abort(400)
+
+    @staticmethod
+    def decode_value(column, value):
+        """Return a cursor value as the column's Python type."""
+        python_type = column.type.python_type
+        if value is None or isinstance(value, python_type):
+            return value
+        if isinstance(value, (bool, list, dict)):
+            raise TypeError(value)
+        # Dates and times are written by "str", which is ISO 8601.
+        parse = getattr(python_type, 'fromisoformat', python_type)
+        return parse(value)
+
+
+class SparseFieldsetComponent(Component):
+    """JSON:API sparse fieldsets, selected from the database.
+
+    "fields[<type>]" names the fields of a type's resources the client
+    wants, e.g. "fields[users]=username".  They narrow the fields the
+    chain dumps (the "id" is always dumped) and the query loads only
+    the columns those fields are read from, so unwanted columns are
+    never selected.  A query is not restricted if a dumped field is not
+    read from a column of the type's model.
+    """
+
+    @memoize
+    def sparse_fields(self):
+        """Return the requested fields of the type, or None."""
+        fields = request.args.get('fields[{}]'.format(self.jsonapi_type))
+        if fields is None:
+            return None
+        return frozenset(
+            name.strip() for name in fields.split(',') if name.strip())
+
+    @memoize
+    def schema_dump_options(self, **schema_options):
+        schema_options = self.parent.schema_dump_options(**schema_options)
+        fields = self.sparse_fields()
+        if fields is None:
+            return schema_options
+        only = schema_options.get('only') or self.schema._declared_fields
+        return dict(schema_options, only=tuple(
+            name for name in only if name == 'id' or name in fields))
+
+    def make_query(self, query, **uri_args):
+        """Return a query loading only the columns which are dumped."""
+        query = self.parent.make_query(query, **uri_args)
+        columns = self.dumped_columns()
+        if columns is None:
+            return query
+        return query.options(sqlalchemy.orm.load_only(*columns))
+
+    def dumped_columns(self):
+        """Return the columns the dumped fields are read from, or None."""
+        only = (
+            self.schema_dump_options().get('only') or
+            self.schema._declared_fields)
+        names = {
+            self.schema._declared_fields[name].attribute or name
+            for name in only}
+        if self.page_key is not None:
+            names.add(self.page_key)
+        columns = sqlalchemy.inspect(self.model).column_attrs.keys()
+        if not names <= set(columns):
+            return None
+        return [getattr(self.model, name) for name in sorted(names)]
+
+
+# Count strategies.
+#
+# "JSONAPIComponent" asks the "make_count" hook for a function
+# returning a collection's "meta.total" before it fetches the page.
+# "PlatformHandler" counts exactly once the page has been serialized.
+# Mount one of the components below on a route to choose another
+# strategy; "CachedCountComponent" caches whichever strategy it sits
+# above.
+count_executor = ThreadPoolExecutor(max_workers=4)
+count_cache = MemoryCache(maxsize=1024)
+
+
+@sqlalchemy.event.listens_for(sqlalchemy.orm.Session, 'after_flush')
+def record_writes(session, flush_context):
+    """Record the tables a transaction writes."""
+    session.info.setdefault('written', set()).update(
+        instance.__table__.name
+        for instance in (*session.new, *session.dirty, *session.deleted))
+
+
+@sqlalchemy.event.listens_for(sqlalchemy.orm.Session, 'do_orm_execute')
+def record_bulk_writes(state):
+    """Record the tables a bulk update or delete writes."""
+    if state.is_update or state.is_delete:
+        state.session.info.setdefault('written', set()).update(
+            table.name for table in find_tables(state.statement))
+
+
+@sqlalchemy.event.listens_for(sqlalchemy.orm.Session, 'after_commit')
+def invalidate_counts(session):
+    """Invalidate the cached counts of every table written."""
+    count_cache.invalidate(tuple(session.info.pop('written', ())))
+
+
+@sqlalchemy.event.listens_for(sqlalchemy.orm.Session, 'after_rollback')
+def forget_writes(session):
+    session.info.pop('written', None)
+
+
+class ConcurrentCountComponent(Component):
+    """Count on a connection of its own while the page is fetched."""
+
+    def make_count(self, query):
+        engine = db.engine
+        # A single connection can not be shared between threads.
+        if isinstance(engine.pool, sqlalchemy.pool.StaticPool):
+            return self.parent.make_count(query)
+
+        statement = count_statement(query)
+
+        def count():
+            with engine.connect() as connection:
+                return connection.execute(statement).scalar()
+        return count_executor.submit(count).result
+
+
+class CachedCountComponent(Component):
+    """Cache counts for "count_ttl" seconds or until a table is written."""
+    count_ttl = 30
+
+    def make_count(self, query):
+        statement = count_statement(query)
+        compiled = statement.compile()
+        key = '{}|{!r}'.format(compiled, sorted(compiled.params.items()))
+        tags = tuple(sorted({table.name for table in find_tables(statement)}))
+        versions = count_cache.versions(tags)
+        total = count_cache.get(key, versions)
+        if total is not None:
+            return lambda: total
+
+        count = self.parent.make_count(query)
+
+        def store():
+            total = count()
+            if total is not None:
+                count_cache.set(key, versions, total, self.count_ttl)
+            return total
+        return store
+
+
+class EstimatedCountComponent(Component):
+    """Estimate counts from the database's statistics.
+
+    PostgreSQL's planner estimates the rows of the query.  SQLite's
+    "sqlite_stat1" table, kept by "ANALYZE", counts the rows of the
+    query's table and ignores its criteria.  Other queries are counted
+    by the parent.
+    """
+
+    def make_count(self, query):
+        session = query.session
+        dialect = session.get_bind().dialect
+        if dialect.name == 'postgresql':
+            # Values are bound by the driver rather than parsed from the
+            # SQL, so text within them is never taken for a parameter.
+            compiled = query.order_by(None).statement.compile(dialect=dialect)
+            explain = 'EXPLAIN (FORMAT JSON) {}'.format(compiled)
+            params = compiled.params
+            if compiled.positional:
+                params = tuple(params[name] for name in compiled.positiontup)
+
+            def estimate():
+                plan = session.connection().exec_driver_sql(
+                    explain, params).scalar()
+                return int(plan[0]['Plan']['Plan Rows'])
+            return estimate
+
+        tables = {table.name for table in find_tables(query.statement)}
+        if dialect.name == 'sqlite' and len(tables) == 1 and session.execute(
+                sqlalchemy.text(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+                ).scalar():
+            stat = session.execute(sqlalchemy.text(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = :table LIMIT 1'),
+                {'table': tables.pop()}).scalar()
+            if stat:
+                total = int(stat.split()[0])
+                return lambda: total
+        return self.parent.make_count(query)
+
+
+class OmittedCountComponent(Component):
+    """Omit "meta.total"."""
+
+    def make_count(self, query):
+        return lambda: None
+
+
+def count_meta(count):
+    total = count()
+    return {} if total is None else {'total': total}
+
+
 class JSONAPIComponent(Component):
     """JSONAPI 1.0 Specification component.
 
@@ -91,11 +493,16 @@ class JSONAPIComponent(Component):
     """
 
     def make_query(self, query, **uri_args):
-        """Count the number of results."""
+        """Keep the query so a collection can be counted."""
         query = self.parent.make_query(query, **uri_args)
         self.count_query = query
         return query
 
+    def fetch_all(self, query):
+        """Start counting the collection before fetching its page."""
+        self.count = self.parent.make_count(self.count_query)
+        return self.parent.fetch_all(query)
+
     def deserialize(self, schema, request, **load_options):
         """Return flatened request set."""
         def structure_errors(errors):
@@ -153,24 +560,47 @@ class JSONAPIComponent(Component):
 
     def serialize(self, schema, model, **dump_options):
         """Return a formatted response."""
+        jsonapi_type = self.parent.jsonapi_type
+
         def structure_contents(item):
             data = collections.defaultdict(dict)
             data['id'] = item.pop('id')
-            data['type'] = self.parent.jsonapi_type
+            data['type'] = jsonapi_type
             for key, value in item.items():
                 data['attributes'][key] = value
             return data
 
+        # A compiled serializer writes resource objects itself.
+        serializer = self.parent.make_serializer(
+            schema, jsonapi_type=jsonapi_type)
+        if serializer is not None:
+            schema, structure_contents = serializer, None
+
         response = self.parent.serialize(schema, model, **dump_options)
         metadata = {}
 
-        if isinstance(response, list):
-            response = [structure_contents(item) for item in response]
-            metadata['meta'] = {'total': self.count_query.count()}
-            metadata['links'] = {'self': request.base_url}
-        else:
+        if isinstance(response, JSONStream):
+            items = response.items
+            if structure_contents is not None:
+                items = (structure_contents(item) for item in items)
+            # The stream is written once the controller has returned.
+            return JSONStream(items, envelope={
+                'meta': functools.partial(count_meta, self.count),
+                'links': self.collection_links()})
+        elif isinstance(response, list):
+            if structure_contents is not None:
+                response = [structure_contents(item) for item in response]
+            metadata['meta'] = count_meta(self.count)
+            metadata['links'] = self.collection_links()
+        elif structure_contents is not None:
             response = structure_contents(response)
 
         response = {'data': response}
         response.update(metadata)
         return response
+
+    def collection_links(self):
+        """Return the links of a collection response."""
+        links = {'self': request.base_url}
+        links.update(self.parent.page_links())
+        return links
@@ -13,7 +13,8 @@ Restricting access to business logic can be important when you want to
 ensure your team obeys a certain standard.
 """
 from flask import abort, request
-from flask_compose import Handler, Route
+from flask_compose import Handler, Route, memoize
+from sqlalchemy import func
 
 from app.common import db
 
@@ -21,6 +22,13 @@ import functools
 import json
 
 
+def count_statement(query):
+    """Return a statement counting the rows of a query."""
+    # Keep the query's FROM clause, which "count(*)" alone would drop.
+    return query.order_by(None).statement.with_only_columns(
+        func.count(), maintain_column_froms=True)
+
+
 class PlatformHandler(Handler):
 
     @property
@@ -31,18 +39,36 @@ class PlatformHandler(Handler):
     def schema(self):
         raise NotImplementedError
 
+    @memoize
     def schema_dump_options(self, **schema_options):
         """Return schema dump options."""
         return schema_options
 
+    @memoize
     def schema_load_options(self, **schema_options):
         """Return schema load options."""
         return schema_options
 
+    def make_schema(self, schema, **schema_options):
+        """Return a schema instance."""
+        return schema(**schema_options)
+
+    def make_serializer(self, schema, **envelope):
+        """Return a compiled stand-in for a schema, or None."""
+        return None
+
     def fetch_all(self, query):
         """Return a collection of resources."""
         return query.all()
 
+    def make_count(self, query):
+        """Return a function counting the rows of a query."""
+        return functools.partial(query.session.scalar, count_statement(query))
+
+    def page_links(self):
+        """Return the links to a collection's adjacent pages."""
+        return {}
+
     def fetch_one(self, query):
         """Return a resource."""
         return query.first()
@@ -70,7 +96,7 @@ def browse_type(handler, **uri_args):
     query = handler.make_query(query, **uri_args)
 
     schema = handler.schema
-    schema = schema(**handler.schema_dump_options())
+    schema = handler.make_schema(schema, **handler.schema_dump_options())
 
     models = handler.fetch_all(query)
     result = handler.serialize(schema, models, many=True)
@@ -94,7 +120,7 @@ def get_type(handler, **uri_args):
         abort(404)
 
     schema = handler.schema
-    schema = schema(**handler.schema_dump_options())
+    schema = handler.make_schema(schema, **handler.schema_dump_options())
 
     result = handler.serialize(schema, model)
     return result, 200
@@ -113,7 +139,7 @@ def create_type(handler, **uri_args):
     form = json.loads(form)
 
     schema = handler.schema
-    schema = schema(**handler.schema_load_options())
+    schema = handler.make_schema(schema, **handler.schema_load_options())
     result, errors = handler.deserialize(schema, form)
     if errors:
         return errors, 401
@@ -123,7 +149,7 @@ def create_type(handler, **uri_args):
     db.session.commit()
 
     schema = handler.schema
-    schema = schema(**handler.schema_dump_options())
+    schema = handler.make_schema(schema, **handler.schema_dump_options())
 
     result = handler.serialize(schema, model)
     return result, 201
@@ -151,7 +177,7 @@ def update_type(handler, **uri_args):
     form = json.loads(form)
 
     schema = handler.schema
-    schema = schema(**handler.schema_load_options())
+    schema = handler.make_schema(schema, **handler.schema_load_options())
     result, errors = handler.deserialize(schema, form, partial=True)
     if errors:
         return errors, 401
@@ -162,7 +188,7 @@ def update_type(handler, **uri_args):
     db.session.commit()
 
     schema = handler.schema
-    schema = schema(**handler.schema_dump_options())
+    schema = handler.make_schema(schema, **handler.schema_dump_options())
 
     result = handler.serialize(schema, model)
     return result, 202
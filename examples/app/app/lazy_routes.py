@@ -0,0 +1,70 @@
+"""Lazily imported application routes definition.
+
+The same routes as "app.routes" with every controller, handler,
+component and middleware named by import string.  Nothing beyond
+"flask_compose" is imported until a route serves its first request (or
+"Router.warmup" is called), so a worker only pays for the parts of the
+application it serves.
+"""
+from flask_compose import Include, Route
+
+import functools
+import os
+
+
+# Helper routes.
+#
+# Mirrors the helpers in "app.controllers" without importing it.
+Route = functools.partial(Route, handler='app.controllers:PlatformHandler')
+BrowseRoute = functools.partial(Route, controller='app.controllers:browse_type', method='GET', path='')
+CreateRoute = functools.partial(Route, controller='app.controllers:create_type', method='POST', path='')
+GetRoute = functools.partial(Route, controller='app.controllers:get_type', method='GET', path='/<id>')
+UpdateRoute = functools.partial(Route, controller='app.controllers:update_type', method='PATCH', path='/<id>')
+DeleteRoute = functools.partial(Route, controller='app.controllers:delete_type', method='DELETE', path='/<id>')
+
+
+# User routes.
+user_browse = BrowseRoute(components=[
+    'app.components:CachedCountComponent',
+    'app.components:ConcurrentCountComponent'])
+user_update = UpdateRoute(
+    components=['app.components:UserUpdateComponent'],
+    ignored_components=['app.components:ActiveUserComponent'])
+user = Include('', routes=[
+    user_browse, GetRoute(), CreateRoute(), user_update, DeleteRoute()],
+    components=['app.components:UserComponent'])
+
+
+# User children routes.
+user_email = Include('/emails', routes=[
+    BrowseRoute(), GetRoute(), CreateRoute(), UpdateRoute(), DeleteRoute()],
+    components=['app.components:UserEmailComponent'])
+user_phone = Include('/phones', routes=[
+    BrowseRoute(), GetRoute(), CreateRoute(), UpdateRoute(), DeleteRoute()],
+    components=['app.components:UserPhoneComponent'])
+
+
+# General "/<user_id>" and "/users" path routes.
+user_child = Include('/<user_id>', routes=[user_email, user_phone])
+user_types = Include(
+    '/users', routes=[user, user_child],
+    components=[
+        'app.components:ActiveUserComponent',
+        'app.components:SchemaCacheComponent',
+        'app.components:CompiledSerializerComponent',
+        'app.components:StreamComponent'])
+
+
+# Application routes.
+middleware = ['app.middleware:render_response']
+if os.environ.get('CACHE_RESPONSES'):
+    middleware.insert(0, 'app.middleware:cache_response')
+
+routes = []
+routes.append(Include('/v1', routes=[user_types], middleware=middleware))
+routes.append(Include(
+    '/v2', routes=[user_types], components=[
+        'app.components:JSONAPIComponent',
+        'app.components:SparseFieldsetComponent',
+        'app.components:PaginationComponent'],
+    middleware=middleware))
@@ -1,9 +1,38 @@
-from flask import jsonify, make_response
+from flask import Response, jsonify, make_response, stream_with_context
+from flask_compose.cache import MemoryCache, ResponseCache
+
+from app.common import db
+from app.streaming import JSONStream
 
 
 def render_response(fn):
     """Response renderer middleware."""
     def decorator(*args, **kwargs):
         response, code = fn(*args, **kwargs)
+        if isinstance(response, JSONStream):
+            return Response(
+                stream_with_context(write_stream(response, db.session())),
+                code, mimetype='application/json')
         return make_response(jsonify(response), code)
     return decorator
+
+
+def write_stream(stream, session):
+    """Write a stream and close the session its queries are bound to.
+
+    A stream is written after the request's session has been removed,
+    so the session would otherwise keep its connection until collected.
+    """
+    try:
+        yield from stream
+    finally:
+        session.close()
+
+
+# Response cache middleware.
+#
+# Caches the rendered responses of read requests for thirty seconds or
+# until a write request beneath "/users" succeeds.  It must wrap the
+# renderer.
+cache_response = ResponseCache(
+    MemoryCache(maxsize=1024), ttl=30, tags=['users'])
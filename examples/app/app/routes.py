@@ -6,21 +6,29 @@ composition of the routes.
 from flask_compose import Include
 
 from app.components import (
-    ActiveUserComponent, UserComponent, UserEmailComponent, UserPhoneComponent,
-    UserUpdateComponent, JSONAPIComponent)
+    ActiveUserComponent, CachedCountComponent, CompiledSerializerComponent,
+    ConcurrentCountComponent, PaginationComponent, SchemaCacheComponent,
+    SparseFieldsetComponent, StreamComponent, UserComponent,
+    UserEmailComponent, UserPhoneComponent, UserUpdateComponent,
+    JSONAPIComponent)
 from app.controllers import (
     BrowseRoute, CreateRoute, GetRoute, UpdateRoute, DeleteRoute)
-from app.middleware import render_response
+from app.middleware import cache_response, render_response
+
+import os
 
 
 # User routes.
 #
 # Notice that we do not define a "/users" prefix to the URL.  We'll do
-# this later on in our route definition scheme.
+# this later on in our route definition scheme.  Users are counted often
+# and written rarely so their count is cached.
+user_browse = BrowseRoute(
+    components=[CachedCountComponent, ConcurrentCountComponent])
 user_update = UpdateRoute(
     components=[UserUpdateComponent], ignored_components=[ActiveUserComponent])
 user = Include('', routes=[
-    BrowseRoute(), GetRoute(), CreateRoute(), user_update, DeleteRoute()],
+    user_browse, GetRoute(), CreateRoute(), user_update, DeleteRoute()],
     components=[UserComponent])
 
 
@@ -45,9 +53,15 @@ user_child = Include('/<user_id>', routes=[user_email, user_phone])
 #
 # We combine our children and our subtypes into a single include. Thanks
 # to our component composition scheme, all of our routes on the
-# "/users" path will require the user to be active.
+# "/users" path will require the user to be active.  Their unpaginated
+# collections are streamed to the client rather than built in memory,
+# their schemas are reused between requests and dumped by compiled
+# functions.
 user_types = Include(
-    '/users', routes=[user, user_child], components=[ActiveUserComponent])
+    '/users', routes=[user, user_child],
+    components=[
+        ActiveUserComponent, SchemaCacheComponent,
+        CompiledSerializerComponent, StreamComponent])
 
 
 # Application routes.
@@ -55,9 +69,18 @@ user_types = Include(
 # Finally, we reach the lowest level of our routing scheme. Here we
 # specify some highly generalized components and middleware.  For
 # demonstration purposes we'll create an unstructured endpoint and a
-# JSONAPI formatted endpoint.
+# JSONAPI formatted endpoint whose collections are paginated and whose
+# sparse fieldsets select only the columns they need.
+#
+# Set "CACHE_RESPONSES" to cache the responses of read requests.
+middleware = [render_response]
+if os.environ.get('CACHE_RESPONSES'):
+    middleware.insert(0, cache_response)
+
 routes = []
-routes.append(Include('/v1', routes=[user_types], middleware=[render_response]))
+routes.append(Include('/v1', routes=[user_types], middleware=middleware))
 routes.append(Include(
-    '/v2', routes=[user_types], components=[JSONAPIComponent],
-    middleware=[render_response]))
+    '/v2', routes=[user_types],
+    components=[
+        JSONAPIComponent, SparseFieldsetComponent, PaginationComponent],
+    middleware=middleware))
@@ -0,0 +1,206 @@
+"""Compiled serializers.
+
+"compile_serializer" generates a dump function for a schema's class and
+options: its fields, after "only" and "exclude" are applied, are read
+from the object and formatted by straight-line Python rather than by
+marshmallow's per-field dispatch.  Given a JSON:API type, the function
+writes the resource object itself so items need not be restructured.
+
+Integer, string and boolean values of their exact type are formatted
+inline.  Any other value is formatted by its field.  An object read by
+key rather than by attribute, or one which is missing a field or fails
+to format, is dumped by the schema, so the output is always that of
+"schema.dump".
+
+Marshmallow schemas keep state while they dump, so the function is
+bound, once per thread, to the fields of a schema instance constructed
+for that thread, which also dumps the objects the function can not.
+"""
+from marshmallow import Schema, ValidationError, fields
+from marshmallow.schema import MarshalResult
+
+import collections
+import keyword
+import threading
+
+
+# Inline formatting of a value held by "value", by field class.  Values
+# which do not pass the check are formatted by the field.
+INLINE_CHECKS = {
+    fields.Integer: '{value} is None or {value}.__class__ is int',
+    fields.String: '{value} is None or {value}.__class__ is str',
+    fields.Boolean: '{value} is None or {value} is True or {value} is False',
+}
+
+
+class Serializer:
+    """A compiled stand-in for a schema when dumping.
+
+    "bind" returns the dump function of a schema instance, which
+    "make_schema" constructs for each thread.
+    """
+
+    def __init__(self, bind, make_schema, source, many=False):
+        self.bind = bind
+        self.make_schema = make_schema
+        self.source = source
+        self.many = many
+        self.local = threading.local()
+
+    def bound(self):
+        """Return the current thread's schema and dump function."""
+        local = self.local
+        try:
+            return local.schema, local.function
+        except AttributeError:
+            local.schema = self.make_schema()
+            local.function = self.bind(local.schema)
+            return local.schema, local.function
+
+    def dump(self, obj, many=None):
+        many = self.many if many is None else many
+        _, function = self.bound()
+        if many:
+            return MarshalResult([function(item) for item in obj], {})
+        return MarshalResult(function(obj), {})
+
+
+# Serializers by schema class and dump options, the
+# "serializer_cache_size" most recently used.
+serializer_cache_size = 256
+serializers = collections.OrderedDict()
+serializers_lock = threading.Lock()
+
+
+def compile_serializer(schema, jsonapi_type=None):
+    """Return a "Serializer" for a schema instance, or None.
+
+    Schemas with processors, a custom "get_attribute", "extra" data,
+    ordered output or a "context" are not compiled, nor are JSON:API
+    schemas without an "id" field.  Serializers are kept by schema
+    class and options; nothing of the instance given is kept.
+    """
+    if (schema._has_processors or schema.extra or schema.context or
+            schema.dict_class is not dict or
+            type(schema).get_attribute is not Schema.get_attribute):
+        return None
+
+    only = None if schema.only is None else frozenset(schema.only)
+    key = (
+        type(schema), only, frozenset(schema.exclude),
+        frozenset(schema.load_only), schema.prefix, schema.strict,
+        schema.many, jsonapi_type)
+    with serializers_lock:
+        try:
+            serializers.move_to_end(key)
+            return serializers[key]
+        except KeyError:
+            pass
+
+    serializer = generate(schema, *key)
+    with serializers_lock:
+        serializer = serializers.setdefault(key, serializer)
+        while len(serializers) > serializer_cache_size:
+            serializers.popitem(last=False)
+    return serializer
+
+
+def generate(
+        schema, cls, only, exclude, load_only, prefix, strict, many,
+        jsonapi_type):
+    """Return the "Serializer" of a schema's class and options.
+
+    The schema is read for its fields' names and formats only.
+    """
+    attribute_types = set()
+    namespace = {
+        'MISSING': fields.missing_, 'ValidationError': ValidationError}
+    lines = []
+    bindings = []
+    members = []
+    for index, (name, field) in enumerate(schema.fields.items()):
+        if field.load_only:
+            continue
+        key = (prefix or '') + (field.dump_to or name)
+        value = 'value_{}'.format(index)
+        bindings.append('field_{} = fields[{!r}]'.format(index, name))
+
+        source = name if field.attribute is None else field.attribute
+        check = INLINE_CHECKS.get(type(field))
+        if type(field) is fields.Integer and field.as_string:
+            check = None
+        # Formatted by the field, which may leave the key out.
+        serialize = [
+            '{value} = field_{index}.serialize({name!r}, obj)'
+            .format(value=value, index=index, name=name),
+            'if {} is MISSING:'.format(value),
+            '    return fallback(obj)']
+        if check is None or not source.isidentifier() or keyword.iskeyword(
+                source):
+            lines.extend(serialize)
+        else:
+            lines.append('{} = obj.{}'.format(value, source))
+            lines.append('if not ({}):'.format(check.format(value=value)))
+            lines.extend('    ' + line for line in serialize)
+        members.append((key, value))
+
+    if jsonapi_type is None:
+        result = '{{{}}}'.format(', '.join(
+            '{!r}: {}'.format(key, value) for key, value in members))
+    else:
+        identifiers = [value for key, value in members if key == 'id']
+        if not identifiers:
+            return None
+        attributes = ', '.join(
+            '{!r}: {}'.format(key, value)
+            for key, value in members if key != 'id')
+        result = "{{'id': {}, 'type': {!r}".format(
+            identifiers[0], jsonapi_type)
+        if attributes:
+            result += ", 'attributes': {{{}}}".format(attributes)
+        result += '}'
+
+    source = '\n'.join([
+        'def bind(fields, attribute_types, fallback):',
+        *('    ' + line for line in bindings),
+        '    def dump(obj):',
+        '        if obj.__class__ not in attribute_types:',
+        '            return fallback(obj)',
+        '        try:',
+        *('            ' + line for line in lines),
+        '        except (AttributeError, ValidationError):',
+        '            return fallback(obj)',
+        '        return ' + result,
+        '    return dump',
+    ])
+    exec(compile(source, '<serializer {}>'.format(cls.__name__), 'exec'),
+         namespace)
+
+    def bind(schema):
+        """Return the dump function of a schema instance."""
+        def fallback(obj):
+            """Dump objects of an unseen type, or which the compiled
+            function can not."""
+            cls = obj.__class__
+            if cls not in attribute_types and not hasattr(
+                    cls, '__getitem__'):
+                # Read by attribute, as the compiled function reads them.
+                attribute_types.add(cls)
+                return dump(obj)
+            item = schema.dump(obj, many=False).data
+            if jsonapi_type is None:
+                return item
+            resource = {'id': item.pop('id'), 'type': jsonapi_type}
+            if item:
+                resource['attributes'] = item
+            return resource
+
+        dump = namespace['bind'](schema.fields, attribute_types, fallback)
+        return dump
+
+    def make_schema():
+        return cls(
+            only=only, exclude=exclude, load_only=load_only, prefix=prefix,
+            strict=strict, many=many)
+
+    return Serializer(bind, make_schema, source, many=many)
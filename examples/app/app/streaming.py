@@ -0,0 +1,52 @@
+"""Streamed JSON responses.
+
+A "JSONStream" is returned by a controller in place of a collection.
+Its items are serialized and written to the response one chunk at a
+time so a collection never has to fit in memory, and the client
+receives the first rows while the last are still being fetched.
+"""
+from flask import current_app
+
+
+class JSONStream:
+    """A lazily serialized JSON array, optionally within an envelope.
+
+    Without an envelope the stream is written as an array.  With one
+    it is written as an object whose "data" member is the array and
+    whose other members are written after it.  Callable members are
+    called once the array has been written, e.g. to count the rows.
+    """
+
+    chunk_size = 500
+
+    def __init__(self, items, envelope=None):
+        self.items = items
+        self.envelope = envelope
+
+    def __iter__(self):
+        def dumps(value):
+            return current_app.json.dumps(value, separators=(',', ':'))
+
+        yield '[' if self.envelope is None else '{"data":['
+
+        separator = ''
+        chunk = []
+        for item in self.items:
+            chunk.append(dumps(item))
+            if len(chunk) == self.chunk_size:
+                yield separator + ','.join(chunk)
+                separator = ','
+                chunk = []
+        if chunk:
+            yield separator + ','.join(chunk)
+
+        if self.envelope is None:
+            yield ']'
+            return
+        members = [']']
+        for key, value in self.envelope.items():
+            if callable(value):
+                value = value()
+            members.append(',{}:{}'.format(dumps(key), dumps(value)))
+        members.append('}')
+        yield ''.join(members)
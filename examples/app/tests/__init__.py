@@ -0,0 +1,17 @@
+from app.common import app, db
+from app.models import UserModel, UserEmailModel, UserPhoneModel
+
+
+def seed():
+    """Create three users with an email and a phone each, once."""
+    with app.app_context():
+        db.create_all()
+        if UserModel.query.count():
+            return
+        for index in range(3):
+            user = UserModel(username='user{}'.format(index))
+            db.session.add(user)
+            db.session.add(UserEmailModel(
+                user=user, email_address='user{}@example.com'.format(index)))
+            db.session.add(UserPhoneModel(user=user))
+        db.session.commit()
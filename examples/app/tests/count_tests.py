@@ -0,0 +1,81 @@
+from unittest import TestCase, mock
+
+from tests import seed
+
+from app.common import app, db
+from app.components import ConcurrentCountComponent
+from app.models import UserModel
+from app.routes import routes  # noqa: F401
+
+import os
+import sqlalchemy
+import tempfile
+import threading
+
+
+class CountTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        seed()
+        cls.client = app.test_client()
+
+    def total(self, path):
+        return self.client.get(path).json['meta']['total']
+
+    def test_exact(self):
+        self.assertTrue(self.total('/v2/users/1/emails') == 1)
+        self.assertTrue(self.total('/v2/users/1/emails?page[size]=1') == 1)
+
+    def test_cached(self):
+        """Counts are cached until a session writes the table."""
+        self.assertTrue(self.total('/v2/users') == 3)
+
+        # Rows written outside of a session are not seen.
+        with app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(UserModel.__table__.insert().values(
+                    username='unseen', is_active=True))
+        self.assertTrue(self.total('/v2/users') == 3)
+
+        with app.app_context():
+            db.session.add(UserModel(username='seen'))
+            db.session.commit()
+        self.assertTrue(self.total('/v2/users') == 5)
+
+        with app.app_context():
+            UserModel.query.filter(
+                UserModel.username.in_(('seen', 'unseen'))).delete()
+            db.session.commit()
+        self.assertTrue(self.total('/v2/users') == 3)
+
+    def test_concurrent(self):
+        """Counts run on a connection of their own on another thread."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        engine = sqlalchemy.create_engine(
+            'sqlite:///' + os.path.join(directory.name, 'users.db'))
+        self.addCleanup(engine.dispose)
+        UserModel.__table__.create(engine)
+        with engine.begin() as connection:
+            connection.execute(UserModel.__table__.insert(), [
+                {'username': 'user{}'.format(index), 'is_active': True}
+                for index in range(4)])
+
+        threads = []
+
+        @sqlalchemy.event.listens_for(engine, 'before_cursor_execute')
+        def record(*args):
+            threads.append(threading.current_thread())
+
+        class Parent:
+            def make_count(self, query):
+                raise AssertionError('Counted by the parent.')
+
+        with sqlalchemy.orm.Session(engine) as session:
+            query = session.query(UserModel).filter(UserModel.id > 1)
+            with mock.patch('app.components.db', mock.Mock(engine=engine)):
+                count = ConcurrentCountComponent(Parent()).make_count(query)
+            self.assertTrue(count() == 3)
+        self.assertTrue(threads)
+        self.assertTrue(threading.current_thread() not in threads)
@@ -0,0 +1,59 @@
+from unittest import TestCase
+
+from tests import seed
+
+from app.common import app, db
+from app.routes import routes  # noqa: F401
+
+import re
+import sqlalchemy
+
+
+class SparseFieldsetTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        seed()
+        with app.app_context():
+            cls.engine = db.engine
+        cls.client = app.test_client()
+
+    def get(self, path):
+        """Return a response's JSON and the columns it selected."""
+        statements = []
+
+        def record(connection, cursor, statement, *args):
+            if ' count(' not in statement:
+                statements.append(statement)
+        sqlalchemy.event.listen(self.engine, 'before_cursor_execute', record)
+        try:
+            data = self.client.get(path).json['data']
+        finally:
+            sqlalchemy.event.remove(
+                self.engine, 'before_cursor_execute', record)
+        self.assertTrue(len(statements) == 1)
+        return data, re.split(r'\sFROM\s', statements[0])[0]
+
+    def test_fields(self):
+        data, select = self.get('/v2/users?fields[users]=username')
+        self.assertTrue(data[0]['attributes'] == {'username': 'user0'})
+        self.assertTrue('username' in select)
+        self.assertTrue('is_active' not in select)
+
+        # The chain does not dump "is_active": it is not selected.
+        data, select = self.get('/v2/users/1?fields[users]=is_active')
+        self.assertTrue(data == {'id': 1, 'type': 'users'})
+        self.assertTrue('username' not in select)
+        self.assertTrue('is_active' not in select)
+
+        # Without sparse fields the chain's fields are selected.
+        data, select = self.get('/v2/users/1')
+        self.assertTrue(data['attributes'] == {'username': 'user0'})
+        self.assertTrue('username' in select)
+        self.assertTrue('is_active' not in select)
+
+    def test_other_types(self):
+        data, select = self.get(
+            '/v2/users/1/emails?fields[users]=&fields[users-emails]=user_id')
+        self.assertTrue(data[0]['attributes'] == {'user_id': 1})
+        self.assertTrue('email_address' not in select)
@@ -0,0 +1,76 @@
+from unittest import TestCase, mock
+
+from tests import seed
+
+from app.common import app
+from app.components import PaginationComponent, UserComponent
+from app.routes import routes  # noqa: F401
+
+import base64
+import json
+
+
+def cursor(*values):
+    data = json.dumps(list(values)).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii')
+
+
+class PaginationTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        seed()
+        cls.client = app.test_client()
+
+    def page(self, path):
+        """Return the ids of a page and its links."""
+        response = self.client.get(path)
+        self.assertTrue(response.status_code == 200)
+        data = response.json
+        return [int(item['id']) for item in data['data']], data['links']
+
+    def test_traversal(self):
+        ids, links = self.page('/v2/users?page[size]=2')
+        self.assertTrue(ids == [1, 2])
+        self.assertTrue('prev' not in links)
+
+        ids, links = self.page(links['next'])
+        self.assertTrue(ids == [3])
+        self.assertTrue('next' not in links)
+
+        ids, links = self.page(links['prev'])
+        self.assertTrue(ids == [1, 2])
+        self.assertTrue('prev' not in links)
+        self.assertTrue('next' in links)
+
+        ids, _ = self.page('/v2/users?page[size]=1&page[after]=' + cursor(1))
+        self.assertTrue(ids == [2])
+        ids, _ = self.page('/v2/users?page[size]=2&page[before]=' + cursor(3))
+        self.assertTrue(ids == [1, 2])
+
+    def test_page_key(self):
+        """Rows are ordered by the page key, then the primary key."""
+        with mock.patch.object(UserComponent, 'page_key', 'username'):
+            ids, links = self.page('/v2/users?page[size]=2')
+            self.assertTrue(ids == [1, 2])
+            ids, _ = self.page(links['next'])
+            self.assertTrue(ids == [3])
+            ids, _ = self.page(
+                '/v2/users?page[after]=' + cursor('user0', '1'))
+            self.assertTrue(ids == [2, 3])
+
+    def test_malformed(self):
+        paths = (
+            '/v2/users?page[size]=abc', '/v2/users?page[size]=0',
+            '/v2/users?page[size]=-1', '/v2/users?page[after]=abc',
+            '/v2/users?page[after]=' + cursor(1, 2),
+            '/v2/users?page[after]=' + cursor('abc'),
+            '/v2/users?page[before]=' + cursor([1]))
+        for path in paths:
+            self.assertTrue(self.client.get(path).status_code == 400)
+
+    def test_size_clamped(self):
+        with mock.patch.object(PaginationComponent, 'max_page_size', 2):
+            ids, links = self.page('/v2/users?page[size]=100')
+            self.assertTrue(ids == [1, 2])
+            self.assertTrue('page%5Bsize%5D=2' in links['next'])
@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+from app.components import SchemaCacheComponent, schema_caches
+from app.schemas import UserSchema, UserEmailSchema
+
+import threading
+
+
+class Parent:
+
+    def make_schema(self, schema, **schema_options):
+        return schema(**schema_options)
+
+
+class SchemaCacheTestCase(TestCase):
+
+    def setUp(self):
+        schema_caches.__dict__.pop('schemas', None)
+
+    def test_cached(self):
+        component = SchemaCacheComponent(Parent())
+        schema = component.make_schema(UserSchema, only=('id',))
+        self.assertTrue(
+            component.make_schema(UserSchema, only=('id',)) is schema)
+        self.assertTrue(
+            component.make_schema(UserSchema, only=['id']) is schema)
+        self.assertTrue(
+            component.make_schema(UserSchema, only=('username',)) is not
+            schema)
+        self.assertTrue(
+            component.make_schema(UserEmailSchema, only=('id',)) is not
+            schema)
+
+    def test_bounded(self):
+        """The least recently used schemas are dropped."""
+        class Component(SchemaCacheComponent):
+            schema_cache_size = 2
+
+        component = Component(Parent())
+        first = component.make_schema(UserSchema, only=('id',))
+        second = component.make_schema(UserSchema, only=('username',))
+        self.assertTrue(
+            component.make_schema(UserSchema, only=('id',)) is first)
+        component.make_schema(UserSchema, only=('is_active',))
+        self.assertTrue(len(schema_caches.schemas) == 2)
+        self.assertTrue(
+            component.make_schema(UserSchema, only=('id',)) is first)
+        self.assertTrue(
+            component.make_schema(UserSchema, only=('username',)) is not
+            second)
+
+    def test_per_thread(self):
+        component = SchemaCacheComponent(Parent())
+        schema = component.make_schema(UserSchema)
+        schemas = []
+
+        def make():
+            schemas.append(component.make_schema(UserSchema))
+            schemas.append(component.make_schema(UserSchema))
+        thread = threading.Thread(target=make)
+        thread.start()
+        thread.join()
+        self.assertTrue(schemas[0] is schemas[1])
+        self.assertTrue(schemas[0] is not schema)
+        self.assertTrue(component.make_schema(UserSchema) is schema)
+
+    def test_unhashable(self):
+        """Schemas of unhashable options are not cached."""
+        component = SchemaCacheComponent(Parent())
+        context = {'buffer': bytearray()}
+        schema = component.make_schema(UserSchema, context=context)
+        self.assertTrue(schema.context == context)
+        self.assertTrue(
+            component.make_schema(UserSchema, context=context) is not schema)
+        self.assertTrue(getattr(schema_caches, 'schemas', None) is None)
@@ -0,0 +1,187 @@
+from unittest import TestCase
+
+from tests import seed
+
+from app import serializers
+from app.schemas import UserSchema, UserEmailSchema, UserPhoneSchema
+from app.serializers import compile_serializer
+from flask_compose import Include
+from unittest import mock
+
+import collections
+import marshmallow as ma
+import threading
+
+
+def structure(item, jsonapi_type):
+    """"JSONAPIComponent.serialize" as it restructures dumped items."""
+    data = collections.defaultdict(dict)
+    data['id'] = item.pop('id')
+    data['type'] = jsonapi_type
+    for key, value in item.items():
+        data['attributes'][key] = value
+    return data
+
+
+class Row:
+
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+class RenamedSchema(ma.Schema):
+    id = ma.fields.Integer(as_string=True)
+    name = ma.fields.String(attribute='username', dump_to='login')
+    secret = ma.fields.String(load_only=True)
+    created = ma.fields.DateTime()
+    count = ma.fields.Method('get_count')
+
+    def get_count(self, obj):
+        return 2
+
+
+class ProcessedSchema(ma.Schema):
+    id = ma.fields.Integer()
+
+    @ma.post_dump
+    def wrap(self, data):
+        return {'item': data}
+
+
+class SerializerTestCase(TestCase):
+
+    def assertEquivalent(self, schema, rows, jsonapi_type=None):
+        serializer = compile_serializer(schema, jsonapi_type=jsonapi_type)
+        self.assertTrue(serializer is not None)
+        for row in rows:
+            expected = schema.dump(row).data
+            if jsonapi_type is not None:
+                expected = structure(expected, jsonapi_type)
+            self.assertTrue(serializer.dump(row).data == expected)
+
+        expected = schema.dump(rows, many=True).data
+        if jsonapi_type is not None:
+            expected = [structure(item, jsonapi_type) for item in expected]
+        self.assertTrue(serializer.dump(rows, many=True).data == expected)
+
+    def test_schemas(self):
+        users = [
+            Row(id=1, username='user', is_active=True),
+            Row(id=2, username=None, is_active=None),
+            Row(id='3', username=b'user', is_active='false'),
+            Row(id=4.0, username=5, is_active=0)]
+        emails = [Row(
+            id=1, email_address='user@example.com', is_confirmed=False,
+            user_id=1)]
+        phones = [Row(id=1, phone_number='5555555555', user_id=1)]
+        for jsonapi_type in (None, 'users'):
+            for only in (None, ('id',), ('id', 'username'), ('is_active',)):
+                if jsonapi_type and only and 'id' not in only:
+                    continue
+                self.assertEquivalent(
+                    UserSchema(only=only), users, jsonapi_type)
+            self.assertEquivalent(UserSchema(prefix='user_'), users)
+            self.assertEquivalent(
+                UserSchema(exclude=('username',)), users, jsonapi_type)
+            self.assertEquivalent(UserEmailSchema(), emails, jsonapi_type)
+            self.assertEquivalent(UserPhoneSchema(), phones, jsonapi_type)
+
+    def test_unusual_objects(self):
+        rows = [
+            {'id': 1, 'username': 'user', 'is_active': True},
+            Row(id=1, username='user'),
+            Row(id=lambda: 1, username='user', is_active=True)]
+        self.assertEquivalent(UserSchema(), rows)
+        self.assertEquivalent(UserSchema(), rows, 'users')
+
+    def test_field_options(self):
+        import datetime
+        rows = [
+            Row(id=1, username='user', secret='x',
+                created=datetime.datetime(2020, 1, 1)),
+            Row(id=None, username=None, secret=None, created=None)]
+        self.assertEquivalent(RenamedSchema(), rows)
+        self.assertEquivalent(RenamedSchema(), rows, 'users')
+
+    def test_uncompiled(self):
+        self.assertTrue(compile_serializer(ProcessedSchema()) is None)
+        self.assertTrue(compile_serializer(
+            UserSchema(context={'user': 1})) is None)
+        self.assertTrue(compile_serializer(
+            UserSchema(only=('username',)), jsonapi_type='users') is None)
+
+    def test_cached(self):
+        """Serializers are shared by schemas of the same options and
+        keep no instance."""
+        schema = UserSchema(only=('id',))
+        serializer = compile_serializer(schema)
+        self.assertTrue(serializer.bound()[0] is not schema)
+        self.assertTrue(
+            compile_serializer(UserSchema(only=('id',))) is serializer)
+        self.assertTrue(
+            compile_serializer(UserSchema(only=('username',))) is not
+            serializer)
+        self.assertTrue(compile_serializer(
+            UserSchema(only=('id',)), jsonapi_type='users') is not serializer)
+
+    def test_bounded(self):
+        """The least recently used serializers are dropped."""
+        cache = collections.OrderedDict()
+        with mock.patch.object(serializers, 'serializers', cache), \
+                mock.patch.object(serializers, 'serializer_cache_size', 2):
+            first = compile_serializer(UserSchema(only=('id',)))
+            compile_serializer(UserSchema(only=('username',)))
+            compile_serializer(UserSchema(only=('id',)))
+            compile_serializer(UserSchema(only=('is_active',)))
+            self.assertTrue(len(cache) == 2)
+            self.assertTrue(
+                compile_serializer(UserSchema(only=('id',))) is first)
+
+    def test_per_thread(self):
+        """Every thread dumps with a schema of its own."""
+        serializer = compile_serializer(RenamedSchema())
+        rows = [{'id': 1, 'username': 'user'}, Row(id=2, username='user')]
+        expected = serializer.dump(rows, many=True).data
+        results = []
+
+        def dump():
+            results.append(serializer.bound()[0])
+            results.append(serializer.dump(rows, many=True).data)
+        thread = threading.Thread(target=dump)
+        thread.start()
+        thread.join()
+        self.assertTrue(results[0] is not serializer.bound()[0])
+        self.assertTrue(results[1] == expected)
+
+
+class RouteTestCase(TestCase):
+    """Responses are those of the application without compiled
+    serializers."""
+
+    @classmethod
+    def setUpClass(cls):
+        from app.common import api, app
+        from app.components import CompiledSerializerComponent
+        from app.routes import routes
+
+        api.add_routes([Include(
+            '/interpreted', routes=routes,
+            ignored_components=[CompiledSerializerComponent])])
+        seed()
+        cls.client = app.test_client()
+
+    def test_routes(self):
+        paths = (
+            '/users', '/users/1', '/users/1/emails', '/users/1/emails/1',
+            '/users/1/phones', '/users/1/phones/1', '/users?page[size]=2')
+        for version in ('/v1', '/v2'):
+            for path in paths:
+                path = version + path
+                # Collections are streamed: read each before the next.
+                compiled = self.client.get(path).json
+                interpreted = self.client.get('/interpreted' + path).json
+                if version == '/v2':
+                    # Links name the path requested.
+                    compiled.pop('links', None)
+                    interpreted.pop('links', None)
+                self.assertTrue(compiled == interpreted)
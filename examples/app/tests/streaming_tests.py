@@ -0,0 +1,35 @@
+from unittest import TestCase
+
+from tests import seed
+
+from flask_compose import Include
+from flask_compose.cache import MemoryCache, ResponseCache
+
+
+class StreamTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        from app.common import api, app
+        from app.routes import routes
+
+        cls.cache = MemoryCache()
+        api.add_routes([Include(
+            '/cached', routes=routes, middleware=[ResponseCache(cls.cache)])])
+        seed()
+        cls.client = app.test_client()
+
+    def test_streamed(self):
+        """Collections fetched by "StreamComponent" are streamed."""
+        before = len(self.cache)
+        data = self.client.get('/cached/v1/users').json
+        self.assertTrue([user['id'] for user in data] == [1, 2, 3])
+        self.assertTrue(len(self.cache) == before)
+
+    def test_paginated(self):
+        """Pages are built in memory and can be cached."""
+        before = len(self.cache)
+        data = self.client.get('/cached/v2/users?page[size]=2').json
+        self.assertTrue([user['id'] for user in data['data']] == [1, 2])
+        self.assertTrue(data['meta'] == {'total': 3})
+        self.assertTrue(len(self.cache) == before + 1)
@@ -1,20 +1,126 @@
-from typing import Any, Callable, Generator, List, Optional, Union, Tuple
+from typing import (
+    Any, Callable, Dict, Generator, List, Optional, Sequence, Union, Tuple)
 
 import collections
 import flask  # type: ignore
 import functools
+import gc
+import inspect
+import operator
+import sys
+import threading
+import time
 
+from werkzeug.utils import import_string
 
-Components = Optional[List['Component']]
+from flask_compose.trie import TrieDispatcher, check_werkzeug
+
+
+Components = Optional[List[Union['Component', str]]]
 Middleware = Callable[[Callable[..., Any]], Callable[..., Any]]
-Middlewares = Optional[List[Middleware]]
+Middlewares = Optional[List[Union[Middleware, str]]]
 Routes = List['RouteLike']
 IterRoute = Generator[Tuple[List['Include'], 'Route'], None, None]
 
 
 Rule = collections.namedtuple('Rule', (
     'path', 'name', 'action', 'methods', 'controller', 'handler', 'components',
-    'middleware'))
+    'middleware', 'chain', 'instruments'), defaults=(None, None))
+
+
+@functools.lru_cache(maxsize=None)
+def class_attributes(cls: type) -> frozenset:
+    """Return the attribute names a class resolves without an instance.
+
+    Classes are assumed not to gain new attributes after they have been
+    dispatched.
+    """
+    return frozenset(dir(cls))
+
+
+class Stack:
+    """Interned stack of classes below a component.
+
+    Records, per attribute name, which layer of the stack owns the
+    attribute so "Component.__getattr__" can reach it with a single
+    "attrgetter" call, which still follows "parent" once per layer.  A
+    layer owns a name if its class defines it or if instances of its
+    class have ever assigned it at runtime.
+    """
+
+    lock = threading.Lock()
+    root: 'Stack'
+    # Instance attribute names assigned at runtime, by component type.
+    instance_attributes: dict = collections.defaultdict(frozenset)
+
+    def __init__(self, classes: Tuple[type, ...] = ()) -> None:
+        self.classes = classes
+        self.children: dict = {}
+        self.resolutions: dict = {}
+
+    def push(self, cls: type) -> 'Stack':
+        """Return the interned stack with the class on top."""
+        try:
+            return self.children[cls]
+        except KeyError:
+            return self.children.setdefault(cls, Stack((cls,) + self.classes))
+
+    def resolve(self, name: str) -> Callable[[Any], Any]:
+        """Return a getter which fetches the name from its owner."""
+        with self.lock:
+            depth = len(self.classes)
+            for index, cls in enumerate(self.classes, 1):
+                if (name in class_attributes(cls) or
+                        name in self.instance_attributes[cls]):
+                    depth = index
+                    break
+            getter = operator.attrgetter('.'.join(['parent'] * depth + [name]))
+            self.resolutions[name] = getter
+        return getter
+
+    def prime(self) -> None:
+        """Resolve every name the classes of the stack define."""
+        for cls in self.classes:
+            for name in class_attributes(cls):
+                if not name.startswith('__') and name not in self.resolutions:
+                    self.resolve(name)
+
+    @classmethod
+    def prime_chain(cls, handler: type, components: Any) -> None:
+        """Prime the stack of every layer.  Components are given in
+        dispatch order."""
+        stack = cls.root.push(handler)
+        for component in components:
+            stack.prime()
+            stack = stack.push(component)
+
+    @classmethod
+    def learn(cls, owner: type, name: str) -> None:
+        """Record an instance attribute and invalidate its resolutions."""
+        with cls.lock:
+            cls.instance_attributes[owner] = (
+                cls.instance_attributes[owner] | {name})
+            stacks = [cls.root]
+            while stacks:
+                stack = stacks.pop()
+                stack.resolutions.pop(name, None)
+                stacks.extend(list(stack.children.values()))
+
+    @classmethod
+    def of(cls, instance: Any) -> 'Stack':
+        """Return the stack below a component instance."""
+        stack = getattr(instance, '_compose_stack', None)
+        if not stack:
+            parent = instance.parent
+            if isinstance(parent, Component):
+                stack = cls.of(parent).push(type(parent))
+            else:
+                stack = cls.root.push(type(parent))
+            object.__setattr__(instance, '_compose_stack', stack)
+        return stack
+
+
+Stack.root = Stack()
 
 
 class Component:
@@ -25,19 +131,85 @@ class Component:
     @decorators.
 
     If a component does not implement any of the methods of the
-    concrete class it will act as a pass-through.
+    concrete class it will act as a pass-through.  The layer which
+    implements an attribute is cached per stack of component classes;
+    a single component forwards to its parent directly.
     """
 
+    __slots__ = ('parent', '_compose_stack')
+
     def __init__(self, parent: Any) -> None:
-        self.parent = parent
+        object.__setattr__(self, 'parent', parent)
+        object.__setattr__(self, '_compose_stack', None)
 
     def __getattr__(self, name: str) -> Any:
-        return getattr(self.parent, name)
+        try:
+            stack = self._compose_stack
+        except AttributeError:
+            stack = None
+        if stack is False:
+            return getattr(self.parent, name)
+        if stack is None:
+            if name in ('parent', '_compose_stack'):
+                raise AttributeError(name)
+            if not isinstance(self.parent, Component):
+                # A single layer forwards to its parent directly; the
+                # cache would only add a lookup.
+                object.__setattr__(self, '_compose_stack', False)
+                return getattr(self.parent, name)
+            stack = Stack.of(self)
+        getter = stack.resolutions.get(name)
+        if getter is None:
+            getter = stack.resolve(name)
+        return getter(self)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name not in Stack.instance_attributes[type(self)]:
+            Stack.learn(type(self), name)
+        super().__setattr__(name, value)
 
     def __repr__(self):
         return '{}({})'.format(self.__class__.__name__, self.parent.__repr__())
 
 
+def memoize(fn: Callable) -> Callable:
+    """Mark a component or handler hook as pure within a request.
+
+    The hook's result is cached on the instance, keyed by its
+    arguments, and returned to later calls with equal arguments.  A
+    component stack lives for one request, or is reset when it ends
+    (see "ReusableChain"), so the cache is freed with the request.
+    Calls with unhashable arguments, and instances without a
+    "__dict__", are not cached.  Cached results are shared by every
+    caller and must not be mutated.
+
+    Properties are memoized by decorating their getter.
+    """
+    @functools.wraps(fn)
+    def memoized(self: Any, *args: Any, **kwargs: Any) -> Any:
+        # Bypasses "Component.__getattr__", which would forward to the
+        # parent's namespace.
+        try:
+            namespace = object.__getattribute__(self, '__dict__')
+        except AttributeError:
+            return fn(self, *args, **kwargs)
+        memo = namespace.get('_compose_memo')
+        if memo is None:
+            memo = namespace['_compose_memo'] = {}
+
+        try:
+            key = (
+                memoized, args, frozenset(kwargs.items()) if kwargs else None)
+            return memo[key]
+        except KeyError:
+            pass
+        except TypeError:
+            return fn(self, *args, **kwargs)
+        result = memo[key] = fn(self, *args, **kwargs)
+        return result
+    return memoized
+
+
 class Handler:
     """Handler type.
 
@@ -51,7 +223,7 @@ class Handler:
 
 
 def dispatch_request(
-        fn: Callable, handler: Handler, components: List[Component],
+        fn: Callable, handler: type, components: Sequence[type],
         **uri_args: str):
     handler = handler()  # type: ignore
     for component in components:
@@ -59,8 +231,620 @@ def dispatch_request(
     return fn(handler, **uri_args)
 
 
+def dispatch_compiled_request(fn: Callable, chain: 'Chain', **uri_args: str):
+    return fn(chain(), **uri_args)
+
+
+def dispatch_reused_request(
+        fn: Callable, chain: 'ReusableChain', **uri_args: str):
+    handler = chain.acquire()
+    try:
+        return fn(handler, **uri_args)
+    finally:
+        chain.release(handler)
+
+
+def run_async(fn: Callable) -> Callable:
+    """Return a sync function running a coroutine controller on an
+    event loop.
+
+    Every view is sync, whatever its controller: the stack is built on
+    the request's thread, as it is for a sync controller, and only the
+    controller is run on an event loop.
+    """
+    @functools.wraps(fn)
+    def controller(*args: Any, **kwargs: Any) -> Any:
+        return flask.current_app.async_to_sync(fn)(*args, **kwargs)
+    return controller
+
+
+async def maybe_await(value: Any) -> Any:
+    """Return the value, awaiting it first if it is awaitable.
+
+    Lets an async component call a parent hook which may or may not
+    be a coroutine function, e.g.
+    "await maybe_await(self.parent.fetch_all(query))".
+    """
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+def run_sync(result: Any) -> Any:
+    """Return the result of a view, running it on an event loop if it
+    is a coroutine.
+
+    Flask runs coroutine function views itself.  This is needed for
+    views reached through another callable (see "LazyAction" and
+    "MethodDispatch") when the outermost middleware is a coroutine
+    function.
+    """
+    if inspect.iscoroutine(result):
+        return flask.current_app.async_to_sync(maybe_await)(result)
+    return result
+
+
+# Deeper stacks are dispatched by "dispatch_request".
+MAX_SPECIALIZED_DEPTH = 32
+
+
+@functools.lru_cache(maxsize=None)
+def make_dispatcher(depth: int) -> Callable[..., Callable[..., Any]]:
+    """Return a factory of views for component stacks of a depth.
+
+    The views construct their stack inline, e.g.
+    "fn(c1(c0(handler())), **uri_args)" for a depth of two, so a
+    request costs one call regardless of the shape of the route.
+    """
+    parameters = ['fn', 'handler'] + ['c{}'.format(i) for i in range(depth)]
+    expression = 'handler()'
+    for parameter in parameters[2:]:
+        expression = '{}({})'.format(parameter, expression)
+    source = (
+        'def factory({}):\n'
+        '    def view(**uri_args):\n'
+        '        return fn({}, **uri_args)\n'
+        '    return view\n').format(', '.join(parameters), expression)
+    namespace: dict = {}
+    exec(compile(source, '<dispatch {}>'.format(depth), 'exec'), namespace)
+    return namespace['factory']
+
+
+def specialize(
+        fn: Callable, handler: type, components: Sequence[type]) -> Callable:
+    """Return the thinnest view dispatching to the controller through a
+    stack.  Components are given in dispatch order."""
+    if len(components) > MAX_SPECIALIZED_DEPTH:
+        return functools.partial(dispatch_request, fn, handler, components)
+    return make_dispatcher(len(components))(fn, handler, *components)
+
+
+def make_chain(handler: type, components: Sequence[type]) -> Any:
+    """Return a component stack.  Components are given in dispatch order."""
+    handler = handler()  # type: ignore
+    for component in components:
+        handler = component(handler)
+    return handler
+
+
+class Forward:
+    """Forwarding descriptor.
+
+    Resolves an attribute directly on the layer of a compiled chain
+    which owns it.  This is a non-data descriptor so values set on the
+    instance continue to take precedence.
+    """
+
+    __slots__ = ('name', 'depth', 'getter')
+
+    def __init__(self, name: str, depth: int) -> None:
+        self.name = name
+        self.depth = depth
+        self.getter = operator.attrgetter('.'.join(['parent'] * depth + [name]))
+
+    def __get__(self, instance: Any, owner: type) -> Any:
+        if instance is None:
+            return self
+        return self.getter(instance)
+
+
+class Chain:
+    """Compiled component stack.
+
+    For every component in the stack a subclass is generated whose
+    missing attributes are pre-resolved to the layer which implements
+    them.  Attribute access is a single descriptor call whose
+    "attrgetter" follows "parent" once per layer it skips, in C, so its
+    cost still grows slowly with the depth of the stack.  Each layer
+    remains its own instance so "self.parent" behaves exactly as it
+    does in an uncompiled stack.
+
+    If a layer assigns an instance attribute which shadows a name an
+    outer layer was forwarding past it, the forward is removed and the
+    outer layers fall back to "Component.__getattr__" for that name.
+    """
+
+    def __init__(self, handler: type, components: List[type]) -> None:
+        """Compile the chain.  Components are given in dispatch order
+        (innermost first)."""
+        self.handler = handler
+        self.components = tuple(components)
+        self.forwards: List[dict] = []
+
+        # Layers ordered outermost first with the handler in last place.
+        layers = list(reversed(self.components)) + [handler]
+        owners = [set(dir(layer)) for layer in layers]
+
+        # Generated classes are given "_compose_crossed" below.
+        classes: List[Any] = []
+        for index, layer in enumerate(layers[:-1]):
+            forwards: dict = {}
+            for depth, names in enumerate(owners[index + 1:], 1):
+                for name in names:
+                    if name.startswith('__') or name in owners[index]:
+                        continue
+                    forwards.setdefault(name, depth)
+            self.forwards.append(forwards)
+            classes.append(self.make_class(index, layer, forwards))
+
+        # Names each layer is skipped over for by an outer layer.
+        for index, class_ in enumerate(classes):
+            class_._compose_crossed = frozenset(
+                name for outer, forwards in enumerate(self.forwards[:index])
+                for name, depth in forwards.items() if outer + depth > index)
+
+        self.classes = tuple(reversed(classes))
+
+    def __call__(self) -> Any:
+        handler = self.handler()
+        for component in self.classes:
+            handler = component(handler)
+        return handler
+
+    def make_class(self, index: int, layer: type, forwards: dict) -> type:
+        """Return a forwarding subclass of the layer."""
+        chain = self
+
+        def __setattr__(self, name: str, value: Any) -> None:
+            if name in self._compose_crossed:
+                chain.demote(name)
+            layer.__setattr__(self, name, value)  # type: ignore
+
+        namespace: Dict[str, Any] = {
+            name: Forward(name, depth) for name, depth in forwards.items()}
+        namespace.update({
+            '__slots__': (),
+            '__module__': layer.__module__,
+            '__qualname__': layer.__qualname__,
+            '__setattr__': __setattr__,
+            '_compose_crossed': frozenset(),
+        })
+        return type(layer.__name__, (layer,), namespace)
+
+    def demote(self, name: str) -> None:
+        """Stop forwarding the name past any layer."""
+        for forwards, class_ in zip(self.forwards, reversed(self.classes)):
+            if forwards.pop(name, None) is not None:
+                delattr(class_, name)
+        for class_ in self.classes:
+            class_._compose_crossed = class_._compose_crossed - {name}
+
+
+class ReusableChain:
+    """Component stack built once per thread and reused across requests.
+
+    Each thread (or greenlet, when threading is monkey patched) keeps
+    its own stack.  Instance attributes are request scoped: when a
+    request ends every layer's namespace is cleared and, if its class
+    defines "__init__", rebuilt by running "__init__" again, so nothing
+    set or mutated during a request leaks into the next one.  Layers
+    without an "__init__" of their own are restored to the namespace
+    they had after construction.  Objects shared through class
+    attributes are not reset.  Handlers must not be retained after the
+    controller returns.
+
+    A stack which is already in use by the current thread, for example
+    during a nested dispatch, is not shared; a fresh stack is built.
+    """
+
+    def __init__(self, factory: Callable[[], Any]) -> None:
+        self.factory = factory
+        self.local = threading.local()
+
+    def acquire(self) -> Any:
+        """Return the current thread's stack."""
+        local = self.local
+        handler = getattr(local, 'handler', None)
+        if handler is None:
+            handler = local.handler = self.build()
+            local.namespaces = self.namespaces(handler)
+        elif local.busy:
+            return self.factory()
+        local.busy = True
+        return handler
+
+    def release(self, handler: Any) -> None:
+        """Reset the per-request state of the stack."""
+        local = self.local
+        if handler is not local.handler:
+            return
+        for layer, namespace, snapshot in local.namespaces:
+            if snapshot is None:
+                namespace.clear()
+                self.initialize(layer)
+                continue
+            if namespace.keys() != snapshot.keys():
+                namespace.clear()
+            namespace.update(snapshot)
+        local.busy = False
+
+    def build(self) -> Any:
+        handler = self.factory()
+        # Resolve the class stacks before snapshotting so the cached
+        # stacks survive a reset.
+        if isinstance(handler, Component):
+            Stack.of(handler)
+        return handler
+
+    @staticmethod
+    def initialize(layer: Any) -> None:
+        """Run a layer's "__init__" again, keeping its cached stack."""
+        if isinstance(layer, Component):
+            stack = layer._compose_stack
+            type(layer).__init__(layer, layer.parent)  # type: ignore
+            object.__setattr__(layer, '_compose_stack', stack)
+        else:
+            type(layer).__init__(layer)  # type: ignore
+
+    @staticmethod
+    def namespaces(
+            handler: Any) -> List[Tuple[Any, dict, Optional[dict]]]:
+        """Return each layer, its namespace and a snapshot of it.  The
+        snapshot is None for layers rebuilt by their "__init__"."""
+        namespaces = []
+        while True:
+            namespace = getattr(handler, '__dict__', None)
+            if namespace is not None:
+                snapshot: Optional[dict] = None
+                if type(handler).__init__ in (
+                        object.__init__, Component.__init__):
+                    snapshot = dict(namespace)
+                namespaces.append((handler, namespace, snapshot))
+            if not isinstance(handler, Component):
+                return namespaces
+            handler = handler.parent
+
+
+@functools.lru_cache(maxsize=None)
+def compile_chain(handler: type, components: Tuple[type, ...]) -> Chain:
+    """Return a "Chain" shared by every identical stack."""
+    return Chain(handler, list(components))
+
+
+class Histogram:
+    """Bounded histogram of the wall and CPU time of a call.
+
+    Wall times are counted in power of two microsecond buckets.  The
+    last bucket counts everything slower.
+    """
+
+    __slots__ = ('count', 'wall', 'cpu', 'buckets', 'lock')
+
+    size = 32
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.buckets = [0] * self.size
+        self.lock = threading.Lock()
+
+    def record(self, wall: float, cpu: float) -> None:
+        bucket = min(int(wall * 1e6).bit_length(), self.size - 1)
+        with self.lock:
+            self.count += 1
+            self.wall += wall
+            self.cpu += cpu
+            self.buckets[bucket] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Return the upper bound, in seconds, of the bucket holding the
+        percentile."""
+        rank = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return (1 << bucket) / 1e6
+        return 0.0
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'wall': self.wall,
+            'cpu': self.cpu,
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+            'buckets': list(self.buckets),
+        }
+
+
+# The timed calls in progress, and the instruments of the rule being
+# dispatched, on each thread.
+timing = threading.local()
+
+
+def time_calls(
+        fn: Callable, label: str,
+        histogram: Optional['Histogram'] = None) -> Callable:
+    """Return a function which records the calls of fn.
+
+    Calls are recorded in the histogram or, without one, in the
+    histogram of the label in the instruments of the rule being
+    dispatched (see "Instruments.activate").
+    """
+    perf_counter, thread_time = time.perf_counter, time.thread_time
+
+    @functools.wraps(fn)
+    def timed(*args: Any, **kwargs: Any) -> Any:
+        frames = getattr(timing, 'frames', None)
+        if frames is None:
+            frames = timing.frames = []
+        # Wall and CPU time spent in timed calls made by fn.
+        frame = [0.0, 0.0]
+        frames.append(frame)
+        wall, cpu = perf_counter(), thread_time()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            wall, cpu = perf_counter() - wall, thread_time() - cpu
+            frames.pop()
+            if frames:
+                frames[-1][0] += wall
+                frames[-1][1] += cpu
+            target = histogram
+            if target is None:
+                instruments = getattr(timing, 'instruments', None)
+                if instruments is not None:
+                    target = instruments.histogram(label)
+            if target is not None:
+                target.record(wall - frame[0], cpu - frame[1])
+    return timed
+
+
+@functools.lru_cache(maxsize=None)
+def instrument_class(cls: type) -> type:
+    """Return a subclass whose methods are timed.
+
+    Methods the class defines or inherits, other than from "Component"
+    and "Handler", are labelled with the class name.  The subclass is
+    shared by every rule so compiled chains of instrumented stacks are
+    shared as well.
+    """
+    namespace: dict = {
+        '__slots__': (),
+        '__module__': cls.__module__,
+        '__qualname__': cls.__qualname__,
+    }
+    labels = []
+    for base in cls.__mro__:
+        if base in (Component, Handler, object):
+            continue
+        for name, value in vars(base).items():
+            if (name.startswith('__') or name in namespace or
+                    not inspect.isfunction(value)):
+                continue
+            label = '{}.{}'.format(cls.__name__, name)
+            namespace[name] = time_calls(value, label)
+            labels.append(label)
+    namespace['_compose_labels'] = tuple(labels)
+    return type(cls.__name__, (cls,), namespace)
+
+
+class Instruments:
+    """Timing histograms of the layers of one rule.
+
+    Each timed layer records its own time, excluding the time spent in
+    the timed layers it calls, so a slow request is attributed to the
+    middleware, component hook or controller which spent it.
+    """
+
+    __slots__ = ('histograms',)
+
+    def __init__(self) -> None:
+        self.histograms: dict = {}
+
+    def histogram(self, label: str) -> Histogram:
+        histogram = self.histograms.get(label)
+        if histogram is None:
+            histogram = self.histograms.setdefault(label, Histogram())
+        return histogram
+
+    def timed(self, label: str, fn: Callable) -> Callable:
+        """Return a function which records the calls of fn."""
+        return time_calls(fn, label, self.histogram(label))
+
+    def activate(self, fn: Callable) -> Callable:
+        """Return a function during whose calls instrumented classes
+        record into these instruments."""
+        @functools.wraps(fn)
+        def activated(*args: Any, **kwargs: Any) -> Any:
+            previous = getattr(timing, 'instruments', None)
+            timing.instruments = self
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timing.instruments = previous
+        return activated
+
+    def instrument(self, cls: type) -> type:
+        """Return the timed subclass of a class (see
+        "instrument_class") and add its methods' histograms."""
+        instrumented = instrument_class(cls)
+        for label in instrumented._compose_labels:  # type: ignore
+            self.histogram(label)
+        return instrumented
+
+    def summary(self) -> dict:
+        return {
+            label: histogram.summary()
+            for label, histogram in self.histograms.items()}
+
+
+shared: dict = {}
+
+
+def share(items: tuple) -> tuple:
+    """Return a tuple shared by every rule with an equal tuple."""
+    try:
+        return shared.setdefault(items, items)
+    except TypeError:
+        return items
+
+
+def resolve(item: Any) -> Any:
+    """Return the object named by an import string.
+
+    Import strings are dotted paths, optionally separated from the
+    attribute by a colon (e.g. "app.controllers:browse_type").  Other
+    items are returned unchanged.
+    """
+    if isinstance(item, str):
+        return import_string(item)
+    return item
+
+
+def has_strings(*groups: Any) -> bool:
+    """Return True if any of the groups contains an import string."""
+    return any(isinstance(item, str) for items in groups for item in items)
+
+
+def union(ignored: Any, items: Any) -> Any:
+    """Return the ignored items extended by the given items.
+
+    Hashable items are kept in a frozenset.  Unhashable items fall back
+    to a tuple.
+    """
+    if not items:
+        return ignored
+    try:
+        return ignored | frozenset(items)
+    except TypeError:
+        return tuple(ignored) + tuple(items)
+
+
+class Scope:
+    """Scope type.
+
+    The accumulated path, name, components and middleware of a chain of
+    "Include" instances.  Scopes are immutable so every route beneath
+    an "Include" extends the scope of its parent rather than recomputing
+    the state of its ancestors.
+    """
+
+    __slots__ = (
+        'path', 'name', 'components', 'middleware', 'ignored_components',
+        'ignored_middleware', 'lazy')
+
+    def __init__(
+            self,
+            path: str = '',
+            name: str = '',
+            components: Tuple[Union[Component, str], ...] = (),
+            middleware: Tuple[Union[Middleware, str], ...] = (),
+            ignored_components: Any = frozenset(),
+            ignored_middleware: Any = frozenset(),
+            lazy: bool = False) -> None:
+        self.path = path
+        self.name = name
+        self.components = components
+        self.middleware = middleware
+        self.ignored_components = ignored_components
+        self.ignored_middleware = ignored_middleware
+        # Set if any of the items is an import string.
+        self.lazy = lazy
+
+    @classmethod
+    def of(cls, includes: List['Include']) -> 'Scope':
+        """Return the scope of a list of includes."""
+        scope = cls()
+        for include in includes:
+            scope = scope.extend(include)
+        return scope
+
+    def extend(self, item: 'RouteLike') -> 'Scope':
+        """Return a new scope with the route or include appended."""
+        components = self.components
+        if item.components:
+            components = components + tuple(item.components)
+
+        middleware = self.middleware
+        if item.middleware:
+            middleware = middleware + tuple(item.middleware)
+
+        return Scope(
+            path=self.path + item.path,  # type: ignore
+            name=self.name + item.name,
+            components=components,
+            middleware=middleware,
+            ignored_components=union(
+                self.ignored_components, item.ignored_components),
+            ignored_middleware=union(
+                self.ignored_middleware, item.ignored_middleware),
+            lazy=self.lazy or has_strings(
+                item.components, item.middleware, item.ignored_components,
+                item.ignored_middleware))
+
+    def concat(self, other: 'Scope') -> 'Scope':
+        """Return a new scope with another scope appended."""
+        if not (self.path or self.name or self.components or self.middleware
+                or self.ignored_components or self.ignored_middleware):
+            return other
+
+        return Scope(
+            path=self.path + other.path,
+            name=self.name + other.name,
+            components=(
+                self.components + other.components if self.components
+                else other.components),
+            middleware=(
+                self.middleware + other.middleware if self.middleware
+                else other.middleware),
+            ignored_components=union(
+                self.ignored_components, other.ignored_components),
+            ignored_middleware=union(
+                self.ignored_middleware, other.ignored_middleware),
+            lazy=self.lazy or other.lazy)
+
+    def resolve(self) -> 'Scope':
+        """Return the scope with every import string imported."""
+        if not self.lazy:
+            return self
+
+        return Scope(
+            path=self.path,
+            name=self.name,
+            components=tuple(resolve(item) for item in self.components),
+            middleware=tuple(resolve(item) for item in self.middleware),
+            ignored_components=union(frozenset(), [
+                resolve(item) for item in self.ignored_components]),
+            ignored_middleware=union(frozenset(), [
+                resolve(item) for item in self.ignored_middleware]))
+
+    @staticmethod
+    def filter(items: tuple, ignored: Any) -> tuple:
+        """Return the items which are not ignored."""
+        if ignored:
+            items = tuple(item for item in items if item not in ignored)
+        return share(items)
+
+
 class RouteLike:
 
+    __slots__ = (
+        'name', 'middleware', 'components', 'ignored_middleware',
+        'ignored_components')
+
     def __init__(
             self,
             name: str = '',
@@ -69,88 +853,199 @@ class RouteLike:
             ignored_middleware: Middlewares = None,
             ignored_components: Components = None) -> None:
         self.name = name
-        self.middleware = middleware or []
-        self.components = components or []
-        self.ignored_middleware = ignored_middleware or []
-        self.ignored_components = ignored_components or []
+        self.middleware = middleware or ()
+        self.components = components or ()
+        self.ignored_middleware = ignored_middleware or ()
+        self.ignored_components = ignored_components or ()
 
 
 class Route(RouteLike):
 
+    __slots__ = ('path', 'controller', 'handler', 'method')
+
     def __init__(
-            self, path: str, controller: Callable, handler: Handler,
-            method: str = 'GET', **route_opts) -> None:
+            self, path: str, controller: Union[Callable, str],
+            handler: Union[type, str], method: str = 'GET',
+            **route_opts) -> None:
         self.path = path
         self.controller = controller
         self.handler = handler
         self.method = method
         super().__init__(**route_opts)
 
-    def make_url_rule(self, includes: List['Include']) -> Rule:
-        """Return a "Rule" instance."""
-        components: List[Component] = []
-        middleware: List[Middleware] = []
-        ignored_components: List[Component] = []
-        ignored_middleware: List[Middleware] = []
-        name = ''
-        path = ''
-
-        for include in includes:
-            # Concatenate the components and middleware lists being
-            # careful not to mutate the list.
-            components = components + include.components
-            middleware = middleware + include.middleware
-
-            ignored_components = ignored_components + include.ignored_components
-            ignored_middleware = ignored_middleware + include.ignored_middleware
+    def make_url_rule(
+            self, includes: Union[List['Include'], 'Scope'],
+            compiled: bool = False, reused: bool = False,
+            instrumented: bool = False) -> Rule:
+        """Return a "Rule" instance.
 
-            # Concatenate the names.
-            name = '{}{}'.format(name, include.name)
+        The includes may be given as a list or as the "Scope" they
+        produce.
+        """
+        if not isinstance(includes, Scope):
+            includes = Scope.of(includes)
+        return self.make_rule(
+            includes.extend(self), compiled=compiled, reused=reused,
+            instrumented=instrumented)
 
-            # Concatenate the paths.
-            path = '{}{}'.format(path, include.path)
+    def make_name(self, scope: 'Scope') -> str:
+        """Return the name of the rule made from a scope."""
+        return scope.name or scope.path + self.method
 
-        # Concatenate components with the concrete class in last
-        # place. Remove ignored items.
-        ignored_components = ignored_components + self.ignored_components
-        components = components + self.components
-        components = [c for c in components if c not in ignored_components]
+    def make_rule(
+            self, scope: 'Scope', compiled: bool = False,
+            reused: bool = False, instrumented: bool = False) -> Rule:
+        """Return a "Rule" instance from a scope ending in this route.
 
-        # Concatenate middleware and remove ingnored items.
-        ignored_middleware = ignored_middleware + self.ignored_middleware
-        middleware = middleware + self.middleware
-        middleware = [m for m in middleware if m not in ignored_middleware]
+        If "compiled" is set the component stack is compiled into a
+        "Chain" once instead of being resolved on every request.  If
+        "reused" is set the stack is built once per thread rather than
+        once per request (see "ReusableChain").  If "instrumented" is
+        set every layer of the rule is timed (see "Instruments").
 
-        # Set handler value.
-        handler = self.handler
+        If the route or its scope contains import strings the rule is
+        compiled lazily (see "LazyAction").
+        """
+        if (scope.lazy or isinstance(self.controller, str) or
+                isinstance(self.handler, str)):
+            return LazyAction(
+                self, scope, compiled, reused, instrumented).make_rule()
+        return self.compile_rule(
+            scope, self.controller, self.handler, compiled, reused,
+            instrumented)
 
-        # Construct the URI path.
-        path = '{}{}'.format(path, self.path)
+    def compile_rule(
+            self, scope: 'Scope', controller: Callable, handler: type,
+            compiled: bool, reused: bool,
+            instrumented: bool = False) -> Rule:
+        """Return a "Rule" instance serving the controller."""
+        # Remove ignored items.  Components are ordered with the
+        # concrete class in last place.
+        components = scope.filter(scope.components, scope.ignored_components)
+        middleware = scope.filter(scope.middleware, scope.ignored_middleware)
 
         # Construct a name for the route or default to the path.
-        name = '{}{}'.format(name, self.name)
-        if not name:
-            name = path + self.method
+        path = scope.path
+        name = self.make_name(scope)
 
         # Construct a function with the components pre-specified.
-        view = dispatch_request
-        view = functools.partial(
-            view, fn=self.controller, handler=handler,
-            components=list(reversed(components)))
+        # Coroutine controllers are run on an event loop by a sync
+        # function so every view is dispatched alike.
+        asynchronous = inspect.iscoroutinefunction(controller)
+        stack = share(tuple(reversed(components)))
+
+        # Instrumented rules dispatch to timed copies of every layer.
+        # Coroutine controllers are not instrumented.
+        instruments = None
+        layers = (
+            run_async(controller) if asynchronous else controller, handler,
+            stack)
+        if instrumented and not asynchronous:
+            instruments = Instruments()
+            layers = (
+                instruments.timed('controller', controller),
+                instruments.instrument(handler),
+                tuple(instruments.instrument(cls) for cls in stack))
+        fn, handler_, stack_ = layers
+
+        chain: Any = None
+        factory: Callable[[], Any]
+        view: Callable[..., Any]
+        if reused:
+            if compiled:
+                factory = compile_chain(handler_, stack_)
+            else:
+                factory = functools.partial(make_chain, handler_, stack_)
+            chain = ReusableChain(factory)
+            view = functools.partial(dispatch_reused_request, fn, chain)
+        elif compiled:
+            chain = compile_chain(handler_, stack_)
+            view = specialize(fn, chain.handler, chain.classes)
+        else:
+            view = specialize(fn, handler_, stack_)
 
         # Wrap the view with middleware. The first middleware in the
         # list is the last middleware applied.
+        if instruments is not None:
+            view = instruments.activate(instruments.timed('dispatch', view))
         for middleware_ in reversed(middleware):
             view = middleware_(view)
+            if instruments is not None:
+                view = instruments.timed(
+                    'middleware:' + getattr(
+                        middleware_, '__qualname__', repr(middleware_)),
+                    view)
 
         return Rule(
             path=path, name=name, action=view, methods=[self.method],
-            controller=self.controller, handler=handler,
-            components=components, middleware=middleware)
+            controller=controller, handler=handler,
+            components=components, middleware=middleware, chain=chain,
+            instruments=instruments)
+
+
+class LazyAction:
+    """View of a rule whose route names its objects by import string.
+
+    The URL rule is registered immediately but nothing is imported
+    until the first request (or "Router.warmup") resolves the import
+    strings and compiles the rule.  Requests are then forwarded to the
+    compiled rule's view.
+
+    The router keeps the lazy rule, whose controller, handler,
+    components and middleware are the items as given.  The compiled
+    rule is available as "LazyAction.rule".
+    """
+
+    __slots__ = (
+        'route', 'scope', 'compiled', 'reused', 'instrumented', 'rule')
+
+    # Shared by every rule; each rule is resolved once.
+    lock = threading.RLock()
+
+    def __init__(
+            self, route: 'Route', scope: 'Scope', compiled: bool,
+            reused: bool, instrumented: bool = False) -> None:
+        self.route = route
+        self.scope = scope
+        self.compiled = compiled
+        self.reused = reused
+        self.instrumented = instrumented
+        self.rule: Optional[Rule] = None
+
+    def __call__(self, **uri_args: str) -> Any:
+        rule = self.rule
+        if rule is None:
+            rule = self.resolve()
+        return run_sync(rule.action(**uri_args))
+
+    def make_rule(self) -> Rule:
+        """Return the uncompiled rule."""
+        route, scope = self.route, self.scope
+        return Rule(
+            path=scope.path, name=route.make_name(scope), action=self,
+            methods=[route.method], controller=route.controller,
+            handler=route.handler,
+            components=scope.filter(
+                scope.components, scope.ignored_components),
+            middleware=scope.filter(
+                scope.middleware, scope.ignored_middleware))
+
+    def resolve(self) -> Rule:
+        """Import the route's objects and return the compiled rule."""
+        with self.lock:
+            if self.rule is None:
+                route = self.route
+                self.rule = route.compile_rule(
+                    self.scope.resolve(), resolve(route.controller),
+                    resolve(route.handler), self.compiled, self.reused,
+                    self.instrumented)
+        return self.rule
 
 
 class Include(RouteLike):
 
+    __slots__ = ('path', 'routes')
+
     def __init__(self, path: str, routes: Routes, **route_opts) -> None:
         self.path = path
         self.routes = routes
@@ -168,11 +1063,256 @@ class Include(RouteLike):
                 yield from route.iter_route_set(path + [route])
 
 
+class MethodDispatch:
+    """Method dispatch table.
+
+    The view of a URL rule shared by every rule with the same path.
+    Requests are dispatched to the action registered for their method.
+    HEAD requests fall back to the GET action.
+    """
+
+    __slots__ = ('actions', 'url_rule')
+
+    def __init__(self) -> None:
+        self.actions: dict = {}
+        self.url_rule: Any = None
+
+    def __call__(self, **uri_args: str) -> Any:
+        try:
+            action = self.actions[flask.request.method]
+        except KeyError:
+            action = self.actions['GET']
+        return run_sync(action(**uri_args))
+
+    def add(self, rule: Rule) -> None:
+        for method in rule.methods:
+            self.actions[method.upper()] = rule.action
+
+    def remove(self, rule: Rule) -> None:
+        for method in rule.methods:
+            method = method.upper()
+            if self.actions.get(method) is rule.action:
+                del self.actions[method]
+                self.url_rule.methods.discard(method)
+        if 'GET' not in self.actions and 'HEAD' not in self.actions:
+            self.url_rule.methods.discard('HEAD')
+
+
+class PathNode:
+    """Node of a path prefix trie, keyed by path segment."""
+
+    __slots__ = ('children', 'names')
+
+    def __init__(self) -> None:
+        self.children: dict = {}
+        self.names: dict = {}
+
+
+class RuleIndex:
+    """Secondary indexes of a router's rules.
+
+    Rules are indexed by every component, middleware, controller and
+    handler they use and by the segments of their path.  Names are
+    kept in insertion ordered dicts so lookups cost the size of their
+    result rather than the size of the route table.  Unhashable
+    objects are not indexed.
+
+    Objects importable by module and qualified name, and import
+    strings, are keyed by "module:qualname" so the rules of lazy routes
+    are found by the objects their strings name and vice versa.
+    """
+
+    fields = ('components', 'middleware', 'controller', 'handler')
+
+    def __init__(self) -> None:
+        self.objects: dict = {
+            field: collections.defaultdict(dict) for field in self.fields}
+        self.root = PathNode()
+
+    @staticmethod
+    def segments(path: str) -> List[str]:
+        return [segment for segment in path.split('/') if segment]
+
+    @staticmethod
+    def key(item: Any) -> Any:
+        """Return the key an object, or import string, is indexed by."""
+        if isinstance(item, str):
+            separator = ':' if ':' in item else '.'
+            path, _, name = item.rpartition(separator)
+            return '{}:{}'.format(path, name)
+
+        module = getattr(item, '__module__', None)
+        qualname = getattr(item, '__qualname__', None)
+        if isinstance(module, str) and isinstance(qualname, str):
+            # Only objects their name resolves to, e.g. not closures.
+            target: Any = sys.modules.get(module)
+            for part in qualname.split('.'):
+                target = getattr(target, part, None)
+            if target is item:
+                return '{}:{}'.format(module, qualname)
+        return item
+
+    def keys(self, rule: Rule, field: str) -> Any:
+        value = getattr(rule, field)
+        values = value if field in ('components', 'middleware') else (value,)
+        return [self.key(item) for item in values]
+
+    def add(self, rule: Rule) -> None:
+        for field in self.fields:
+            index = self.objects[field]
+            for key in self.keys(rule, field):
+                try:
+                    index[key][rule.name] = None
+                except TypeError:
+                    pass
+
+        node = self.root
+        for segment in self.segments(rule.path):
+            node = node.children.setdefault(segment, PathNode())
+        node.names[rule.name] = None
+
+    def remove(self, rule: Rule) -> None:
+        for field in self.fields:
+            index = self.objects[field]
+            for key in self.keys(rule, field):
+                try:
+                    names = index.get(key)
+                except TypeError:
+                    continue
+                if names is not None:
+                    names.pop(rule.name, None)
+                    if not names:
+                        del index[key]
+
+        # Prune the nodes left empty.
+        nodes = [self.root]
+        segments = self.segments(rule.path)
+        for segment in segments:
+            node = nodes[-1].children.get(segment)
+            if node is None:
+                return
+            nodes.append(node)
+        nodes[-1].names.pop(rule.name, None)
+        for depth in range(len(segments), 0, -1):
+            node = nodes[depth]
+            if node.names or node.children:
+                break
+            del nodes[depth - 1].children[segments[depth - 1]]
+
+    def find(self, field: str, key: Any) -> List[str]:
+        """Return the names of the rules whose field holds the key."""
+        try:
+            return list(self.objects[field].get(self.key(key), ()))
+        except TypeError:
+            return []
+
+    def under(self, prefix: str) -> List[str]:
+        """Return the names of the rules whose path starts with the
+        prefix's segments."""
+        node = self.root
+        for segment in self.segments(prefix):
+            child = node.children.get(segment)
+            if child is None:
+                return []
+            node = child
+        names: List[str] = []
+        nodes = [node]
+        while nodes:
+            node = nodes.pop()
+            names.extend(node.names)
+            nodes.extend(reversed(list(node.children.values())))
+        return names
+
+
+def mounted_includes(items: Routes) -> set:
+    """Return the ids of includes which appear more than once."""
+    seen: set = set()
+    mounted: set = set()
+    items = list(items)
+    while items:
+        item = items.pop()
+        if isinstance(item, Include):
+            if id(item) in seen:
+                mounted.add(id(item))
+                continue
+            seen.add(id(item))
+            items.extend(item.routes)
+    return mounted
+
+
+def source_key(item: 'RouteLike', scope: Scope) -> Tuple[str, str, Any]:
+    """Return the key identifying a route or include within a scope."""
+    return (
+        scope.path + item.path,  # type: ignore
+        scope.name + item.name, getattr(item, 'method', None))
+
+
+def same_rule(rule: Rule, other: Optional[Rule]) -> bool:
+    """Return True if two rules are made from the same definition."""
+    return other is not None and (
+        rule.path == other.path and rule.methods == other.methods and
+        rule.controller == other.controller and
+        rule.handler == other.handler and
+        rule.components == other.components and
+        rule.middleware == other.middleware)
+
+
+def check_url_map(url_map: Any) -> None:
+    """Raise RuntimeError unless a URL map is laid out as
+    "remove_url_rules" expects.
+
+    The layout is werkzeug's, which is private, from 2.2.3 before 4.
+    """
+    check_werkzeug()
+    if not hasattr(url_map, '_rules_by_endpoint') or not hasattr(
+            getattr(url_map, '_matcher', None), '_root'):
+        raise RuntimeError(
+            'flask_compose requires werkzeug>=2.2.3,<4: the URL map has no '
+            'rules by endpoint or state machine matcher.')
+
+
+def remove_url_rules(app: flask.Flask, endpoint: str) -> None:
+    """Remove an endpoint's URL rules and view function from flask.
+
+    Werkzeug can not remove rules from a URL map.  The rules are
+    unlinked from the states of werkzeug's matcher they were added to,
+    leaving every other rule, and the compiled matcher, untouched.
+    """
+    url_map = app.url_map
+    check_url_map(url_map)
+    for url_rule in url_map._rules_by_endpoint.pop(endpoint, ()):
+        if url_rule.build_only:
+            continue
+        state = url_map._matcher._root
+        for part in url_rule._parts:
+            if part.static:
+                state = state.static[part.content]
+            else:
+                state = next(s for p, s in state.dynamic if p == part)
+        # Replaced rather than mutated so concurrent matches are safe.
+        state.rules = [r for r in state.rules if r is not url_rule]
+    app.view_functions.pop(endpoint, None)
+
+
 class Router:
 
-    def __init__(self, app: flask.Flask) -> None:
+    def __init__(
+            self, app: flask.Flask, compiled: bool = False,
+            reused: bool = False, consolidated: bool = False,
+            trie: bool = False, instrumented: bool = False) -> None:
         self.app = app
+        self.compiled = compiled
+        self.reused = reused
+        self.instrumented = instrumented
+        self.consolidated = consolidated
+        self.dispatcher = (
+            TrieDispatcher(app) if trie and app is not None else None)
+        self.frozen = False
         self.rules: dict = {}
+        self.paths: dict = {}
+        self.sources: dict = {}
+        self.index = RuleIndex()
+        self.lock = threading.RLock()
 
     def __iter__(self) -> Generator[str, None, None]:
         yield from self.rules
@@ -186,24 +1326,375 @@ class Router:
     def __len__(self) -> int:
         return len(self.rules)
 
-    def add_routes(self, items: Routes) -> None:
-        """For each item add a URL rule to the application."""
+    def add_routes(self, items: Routes, scope: Optional[Scope] = None) -> None:
+        """For each item add a URL rule to the application.
+
+        Includes are walked depth first.  Each include's scope is
+        computed once and shared by everything beneath it.  An include
+        mounted more than once is compiled once relative to itself and
+        only its prefix is applied per mount.
+        """
+        self.check_frozen()
+        scope = scope or Scope()
+        mounted = mounted_includes(items)
+        templates: dict = {}
+        for item in items:
+            for route, route_scope in self.iter_scopes(
+                    [item], scope, mounted, templates):
+                self.add_rule(route.make_rule(
+                    route_scope, compiled=self.compiled, reused=self.reused,
+                    instrumented=self.instrumented))
+            self.sources[source_key(item, scope)] = item, scope
+
+    def replace_routes(
+            self, include: 'RouteLike', scope: Optional[Scope] = None) -> None:
+        """Replace the rules of an include with the include's new rules.
+
+        The include replaced is the one added with the same path and
+        name beneath "scope", at any depth.  Only its rules are
+        recompiled and only rules whose definition changed are removed
+        from, and added to, the application.  An include which was not
+        added before is added.  Every change is planned before the route
+        table is modified.
+        """
+        self.check_frozen()
+        scope = scope or Scope()
+        key = source_key(include, scope)
+        with self.lock:
+            rules = [
+                route.make_rule(
+                    route_scope, compiled=self.compiled, reused=self.reused,
+                    instrumented=self.instrumented)
+                for route, route_scope in self.iter_scopes(
+                    [include], scope, mounted_includes([include]), {})]
+
+            names: list = []
+            overrides: set = set()
+            source = self.sources.get(key) or self.find_source(key)
+            if source is not None:
+                names = [
+                    route.make_name(route_scope)
+                    for route, route_scope in self.iter_source(
+                        source[0], source[1], overrides)]
+
+            new = {rule.name: rule for rule in rules}
+            removed = [
+                self.rules[name] for name in names if name in self.rules and
+                not same_rule(self.rules[name], new.get(name))]
+            added = [
+                rule for rule in rules
+                if not same_rule(rule, self.rules.get(rule.name))]
+
+            for rule in removed:
+                self.remove_rule(rule)
+            for rule in added:
+                self.add_rule(rule)
+            for override in overrides:
+                del self.sources[override]
+            self.sources[key] = include, scope
+
+    def sync(self, items: Routes, scope: Optional[Scope] = None) -> None:
+        """Make the items added beneath "scope" match "items".
+
+        Items are compared with the ones added before by path and name.
+        New items are added, missing items are removed and items which
+        are not the same object as before are replaced (see
+        "replace_routes").  Unchanged items are not recompiled.
+        """
+        self.check_frozen()
+        scope = scope or Scope()
+        keys = {source_key(item, scope): item for item in items}
+        with self.lock:
+            removed = [
+                key for key, (_, item_scope) in self.sources.items()
+                if key not in keys and item_scope.path == scope.path and
+                item_scope.name == scope.name]
+            replaced = [
+                item for key, item in keys.items()
+                if self.sources.get(key, (None,))[0] is not item]
+
+            for key in removed:
+                if key in self.sources:
+                    self.remove_source(key)
+            for item in replaced:
+                self.replace_routes(item, scope)
+
+    def remove_route(self, name: str) -> None:
+        """Remove a rule from the router and the application."""
+        self.check_frozen()
+        with self.lock:
+            self.remove_rule(self.rules[name])
+
+    def remove_source(self, key: Tuple[str, str, Any]) -> None:
+        """Remove an item added to the router and all of its rules."""
+        self.check_frozen()
+        with self.lock:
+            overrides: set = set()
+            item, scope = self.sources[key]
+            names = [
+                route.make_name(route_scope)
+                for route, route_scope in self.iter_source(
+                    item, scope, overrides)]
+
+            for name in names:
+                rule = self.rules.get(name)
+                if rule is not None:
+                    self.remove_rule(rule)
+            del self.sources[key]
+            for override in overrides:
+                del self.sources[override]
+
+    def check_frozen(self) -> None:
+        """Raise RuntimeError if the route table can not be changed."""
+        if self.frozen:
+            raise RuntimeError('Can not change the routes of a frozen router.')
+
+    def iter_source(
+            self, item: 'RouteLike', scope: Scope,
+            overrides: set) -> Generator[Tuple[Route, Scope], None, None]:
+        """Generate each route beneath an item as currently added.
+
+        Includes replaced by "replace_routes" are walked in place of
+        the includes they replaced; their keys are added to
+        "overrides".
+        """
+        if isinstance(item, Route):
+            yield item, scope.extend(item)
+        elif isinstance(item, Include):
+            inner = scope.extend(item)
+            for child in item.routes:
+                key = source_key(child, inner)
+                source = self.sources.get(key)
+                if source is not None:
+                    overrides.add(key)
+                    child = source[0]
+                yield from self.iter_source(child, inner, overrides)
+
+    def find_source(
+            self, key: Tuple[str, str, Any]) -> Optional[Tuple[Any, Scope]]:
+        """Return the item, and its scope, added beneath another item."""
+        def search(item: 'RouteLike', scope: Scope) -> Any:
+            if source_key(item, scope) == key:
+                return item, scope
+            if not isinstance(item, Include):
+                return None
+            inner = scope.extend(item)
+            if not key[0].startswith(inner.path):
+                return None
+            for child in item.routes:
+                source = self.sources.get(source_key(child, inner))
+                result = search(source[0] if source else child, inner)
+                if result is not None:
+                    return result
+            return None
+
+        for item, scope in list(self.sources.values()):
+            result = search(item, scope)
+            if result is not None:
+                return result
+        return None
+
+    def iter_scopes(
+            self, items: Routes, scope: Scope, mounted: set,
+            templates: dict) -> Generator[Tuple[Route, Scope], None, None]:
+        """Generate each route with the scope which ends in it."""
         for item in items:
             if isinstance(item, Include):
-                for includes, route in item:
-                    self.add_route(includes, route)
+                if id(item) not in mounted:
+                    yield from self.iter_scopes(
+                        item.routes, scope.extend(item), mounted, templates)
+                    continue
+
+                template = templates.get(id(item))
+                if template is None:
+                    template = templates[id(item)] = list(self.iter_scopes(
+                        item.routes, Scope().extend(item), mounted,
+                        templates))
+                for route, route_scope in template:
+                    yield route, scope.concat(route_scope)
             elif isinstance(item, Route):
-                self.add_route([], item)
+                yield item, scope.extend(item)
 
-    def add_route(self, includes: List[Include], route: Route) -> None:
+    def add_route(
+            self, includes: Union[List[Include], Scope], route: Route) -> None:
         """Create and add a URL rule to the application."""
-        self.add_rule(route.make_url_rule(includes))
+        self.add_rule(route.make_url_rule(
+            includes, compiled=self.compiled, reused=self.reused,
+            instrumented=self.instrumented))
 
     def add_rule(self, rule: Rule) -> None:
         """Add a URL rule to the application."""
+        if self.frozen:
+            raise RuntimeError('Can not add rules to a frozen router.')
+        previous = self.rules.get(rule.name)
+        if previous is not None:
+            self.index.remove(previous)
         self.rules[rule.name] = rule
-        self.app.add_url_rule(
-            rule.path, rule.name, rule.action, methods=rule.methods)
+        self.index.add(rule)
+        if self.consolidated:
+            self.add_consolidated_rule(rule)
+        else:
+            self.add_url_rule(
+                rule.path, rule.name, rule.action, methods=rule.methods)
+
+    def add_consolidated_rule(self, rule: Rule) -> None:
+        """Add a rule to the URL rule of its path.
+
+        Every path is matched by a single URL rule, whose endpoint is
+        the path, dispatching through a "MethodDispatch" table.  Each
+        rule's name is registered as a build only rule so "url_for"
+        continues to work.
+        """
+        dispatch = self.paths.get(rule.path)
+        if dispatch is None:
+            dispatch = self.paths[rule.path] = MethodDispatch()
+            dispatch.add(rule)
+            check_url_map(self.app.url_map)
+            self.add_url_rule(
+                rule.path, rule.path, dispatch, methods=rule.methods)
+            dispatch.url_rule = self.app.url_map._rules_by_endpoint[rule.path][-1]
+        else:
+            dispatch.add(rule)
+            methods = {method.upper() for method in rule.methods}
+            if 'GET' in methods:
+                methods.add('HEAD')
+            dispatch.url_rule.methods.update(methods)
+        self.add_url_rule(
+            rule.path, rule.name, methods=rule.methods, build_only=True)
+
+    def add_url_rule(self, *args: Any, **kwargs: Any) -> None:
+        """Add a URL rule to the application.
+
+        Flask only allows rules to be added before the first request.
+        Once the application has served a request the check is skipped,
+        calling the method "flask.Flask.add_url_rule" wraps, so routes
+        can be replaced while serving (see "Updating Routes" in the
+        README).  RuntimeError is raised if the method is not wrapped.
+        """
+        add_url_rule: Any = type(self.app).add_url_rule
+        if getattr(self.app, '_got_first_request', False):
+            add_url_rule = getattr(add_url_rule, '__wrapped__', None)
+            if add_url_rule is None:
+                raise RuntimeError(
+                    'Flask\'s "add_url_rule" can not be called after the '
+                    'first request.')
+        add_url_rule(self.app, *args, **kwargs)
+
+    def remove_rule(self, rule: Rule) -> None:
+        """Remove a rule from the router and the application."""
+        if self.frozen:
+            raise RuntimeError('Can not remove rules from a frozen router.')
+        if self.app is not None:
+            check_url_map(self.app.url_map)
+        del self.rules[rule.name]
+        self.index.remove(rule)
+        if self.consolidated:
+            self.remove_consolidated_rule(rule)
+        else:
+            remove_url_rules(self.app, rule.name)
+        if self.dispatcher is not None:
+            self.dispatcher.trie = None
+
+    def remove_consolidated_rule(self, rule: Rule) -> None:
+        """Remove a rule from the URL rule of its path.
+
+        The path's URL rule is removed with its last rule.
+        """
+        remove_url_rules(self.app, rule.name)
+        dispatch = self.paths[rule.path]
+        dispatch.remove(rule)
+        if not dispatch.actions:
+            del self.paths[rule.path]
+            remove_url_rules(self.app, rule.path)
+
+    def warmup(self, freeze: bool = True, gc_freeze: bool = False) -> None:
+        """Build everything a rule needs to serve its first request.
+
+        Intended to be called before forking workers (e.g. gunicorn
+        "--preload") so the work is shared copy-on-write rather than
+        repeated, and dirtied, in every worker.  Import strings are
+        resolved, attribute resolutions of every component stack are
+        primed, reusable stacks are built for the calling thread and
+        flask's URL map, and the router's trie if it has one, is
+        compiled.
+
+        If "freeze" is set the route table can no longer be modified.
+        If "gc_freeze" is set every object allocated so far is moved to
+        the garbage collector's permanent generation so collections in
+        the workers do not touch, and copy, their pages.
+        """
+        for rule in self.rules.values():
+            if isinstance(rule.action, LazyAction):
+                rule = rule.action.resolve()
+            chain = rule.chain
+            if isinstance(chain, ReusableChain):
+                chain.release(chain.acquire())
+                chain = chain.factory
+            if isinstance(chain, Chain):
+                Stack.prime_chain(chain.handler, chain.classes)
+            else:
+                Stack.prime_chain(rule.handler, reversed(rule.components))
+
+        if self.app is not None:
+            self.app.url_map.update()
+        if self.dispatcher is not None:
+            self.dispatcher.current()
+
+        self.frozen = self.frozen or freeze
+        if gc_freeze:
+            gc.collect()
+            gc.freeze()
+
+    def with_component(self, component: Any) -> List[Rule]:
+        """Return the rules whose component stack holds the component.
+
+        Like every lookup below this costs the size of its result, not
+        of the route table.  Components may be given as objects or
+        import strings, whichever the rules were built from.
+        """
+        return [self.rules[name] for name in self.index.find(
+            'components', component)]
+
+    def with_middleware(self, middleware: Any) -> List[Rule]:
+        """Return the rules wrapped by the middleware."""
+        return [self.rules[name] for name in self.index.find(
+            'middleware', middleware)]
+
+    def with_controller(self, controller: Any) -> List[Rule]:
+        """Return the rules served by the controller."""
+        return [self.rules[name] for name in self.index.find(
+            'controller', controller)]
+
+    def with_handler(self, handler: Any) -> List[Rule]:
+        """Return the rules whose stack is built on the handler."""
+        return [self.rules[name] for name in self.index.find(
+            'handler', handler)]
+
+    def under(self, prefix: str) -> List[Rule]:
+        """Return the rules whose path is, or is beneath, the prefix.
+
+        Paths are compared by whole segments so "/v2/users" matches
+        "/v2/users/<id>" but not "/v2/users-emails".
+        """
+        return [self.rules[name] for name in self.index.under(prefix)]
+
+    def stats(self) -> dict:
+        """Return the timings of every instrumented rule.
+
+        Timings are keyed by rule name and then by layer: "dispatch"
+        (building the component stack), "controller", each middleware
+        as "middleware:<name>" and each component or handler method as
+        "<class>.<method>".  Every layer reports its own time, excluding
+        the layers it calls.  Rules which have not been compiled yet,
+        e.g. lazy rules, are omitted.
+        """
+        stats = {}
+        for name, rule in list(self.rules.items()):
+            if isinstance(rule.action, LazyAction):
+                rule = rule.action.rule
+            if rule is not None and rule.instruments is not None:
+                stats[name] = rule.instruments.summary()
+        return stats
 
     def items(self) -> Generator[Tuple[str, Rule], None, None]:
         """Generate a tuple of key, value pairs."""
@@ -0,0 +1,239 @@
+"""Response cache middleware.
+
+Caches the rendered responses of read requests (GET and HEAD) and
+invalidates them by tag when a write request (any other method)
+succeeds beneath the same middleware.
+
+    cache = ResponseCache(MemoryCache(maxsize=1024), ttl=30, tags=['users'])
+    Include('/v1', routes=[...], middleware=[cache, render_response])
+
+Responses are keyed by the request's endpoint (the rule's name, or its
+path when the router is consolidated), its uri args, its sorted query
+string and the request headers named by "vary".  Place the middleware before the middleware rendering the
+controller's result; it returns a response object.
+
+Invalidation is versioned: every tag has a version, entries are stored
+with the versions of their tags read before the view ran, and an entry
+whose versions are no longer current is a miss.  A read racing a write
+can therefore never store a response which outlives the write.
+
+Backends store entries by key.  "MemoryCache" is a bounded LRU within
+the process.  "SharedCache" stores pickled entries through a redis-like
+client so that every worker shares them; "LocalClient" is an in-process
+stand-in for that client.
+"""
+from typing import Any, Hashable, Optional, Sequence, Tuple
+
+import collections
+import flask  # type: ignore
+import functools
+import hashlib
+import json
+import math
+import pickle
+import threading
+import time
+import urllib.parse
+
+
+READ_METHODS = frozenset(('GET', 'HEAD'))
+
+
+class CacheBackend:
+    """Response cache storage interface."""
+
+    def versions(self, tags: Tuple[str, ...]) -> Hashable:
+        """Return the current versions of the tags."""
+        raise NotImplementedError
+
+    def get(self, key: str, versions: Hashable) -> Any:
+        """Return the value stored with the versions or None."""
+        raise NotImplementedError
+
+    def set(self, key: str, versions: Hashable, value: Any, ttl: float) -> None:
+        """Store the value for "ttl" seconds."""
+        raise NotImplementedError
+
+    def invalidate(self, tags: Tuple[str, ...]) -> None:
+        """Advance the versions of the tags."""
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """Bounded in-process LRU cache with per-entry expiry."""
+
+    def __init__(self, maxsize: int = 1024, clock: Any = time.monotonic) -> None:
+        self.maxsize = maxsize
+        self.clock = clock
+        self.entries: collections.OrderedDict = collections.OrderedDict()
+        self.tags: dict = {}
+        self.lock = threading.Lock()
+
+    def versions(self, tags: Tuple[str, ...]) -> Hashable:
+        tags_ = self.tags
+        return tuple(tags_.get(tag, 0) for tag in tags)
+
+    def get(self, key: str, versions: Hashable) -> Any:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != versions or entry[1] <= self.clock():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[2]
+
+    def set(self, key: str, versions: Hashable, value: Any, ttl: float) -> None:
+        with self.lock:
+            self.entries[key] = (versions, self.clock() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, tags: Tuple[str, ...]) -> None:
+        with self.lock:
+            for tag in tags:
+                self.tags[tag] = self.tags.get(tag, 0) + 1
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class LocalClient:
+    """In-process stand-in for a redis client.
+
+    Implements the "get", "mget", "set" (with "ex") and "incr" commands
+    "SharedCache" issues, storing bytes as a server would.
+    """
+
+    def __init__(self, clock: Any = time.monotonic) -> None:
+        self.clock = clock
+        self.data: dict = {}
+        self.lock = threading.Lock()
+
+    def _get(self, name: str) -> Optional[bytes]:
+        item = self.data.get(name)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= self.clock():
+            del self.data[name]
+            return None
+        return item[0]
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self.lock:
+            return self._get(name)
+
+    def mget(self, names: Sequence[str]) -> list:
+        with self.lock:
+            return [self._get(name) for name in names]
+
+    def set(self, name: str, value: bytes, ex: Optional[int] = None) -> bool:
+        with self.lock:
+            expires = None if ex is None else self.clock() + ex
+            self.data[name] = (bytes(value), expires)
+        return True
+
+    def incr(self, name: str) -> int:
+        with self.lock:
+            value = int(self._get(name) or 0) + 1
+            self.data[name] = (str(value).encode(), None)
+        return value
+
+
+class SharedCache(CacheBackend):
+    """Cache shared between processes through a redis-like client.
+
+    Keys are hashed beneath a prefix.  Entries are pickled together
+    with their versions; tag versions are counters incremented by
+    "invalidate".  Entries are evicted by the server's own policy.
+    """
+
+    def __init__(
+            self, client: Any = None, prefix: str = 'flask_compose:') -> None:
+        self.client = LocalClient() if client is None else client
+        self.prefix = prefix
+
+    def versions(self, tags: Tuple[str, ...]) -> Hashable:
+        if not tags:
+            return ()
+        return tuple(self.client.mget([
+            self.prefix + 'tag:' + tag for tag in tags]))
+
+    def name(self, key: str) -> str:
+        return self.prefix + hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def get(self, key: str, versions: Hashable) -> Any:
+        data = self.client.get(self.name(key))
+        if data is None:
+            return None
+        versions_, value = pickle.loads(data)
+        return value if versions_ == versions else None
+
+    def set(self, key: str, versions: Hashable, value: Any, ttl: float) -> None:
+        self.client.set(
+            self.name(key), pickle.dumps((versions, value)),
+            ex=max(1, math.ceil(ttl)))
+
+    def invalidate(self, tags: Tuple[str, ...]) -> None:
+        for tag in tags:
+            self.client.incr(self.prefix + 'tag:' + tag)
+
+
+class ResponseCache:
+    """Response caching middleware.
+
+    Successful (200) responses to read requests are cached for "ttl"
+    seconds unless they are streamed or set cookies.  Successful
+    responses (below 400) to write requests invalidate "tags".
+    Cached responses are shared by every client: name the request
+    headers a response depends on in "vary".
+    """
+
+    def __init__(
+            self, backend: Optional[CacheBackend] = None, ttl: float = 60.0,
+            tags: Sequence[str] = (), vary: Sequence[str] = ()) -> None:
+        self.backend = MemoryCache() if backend is None else backend
+        self.ttl = ttl
+        self.tags = tuple(tags)
+        self.vary = tuple(vary)
+
+    def key(self, uri_args: dict) -> str:
+        """Return the cache key of the current request."""
+        request = flask.request
+        parts = [
+            request.endpoint or '',
+            urllib.parse.urlencode(sorted(uri_args.items())),
+            urllib.parse.urlencode(sorted(request.args.items(multi=True)))]
+        for header in self.vary:
+            parts.append(request.headers.get(header, ''))
+        return json.dumps(parts)
+
+    def __call__(self, fn: Any) -> Any:
+        backend = self.backend
+
+        @functools.wraps(fn)
+        def decorator(*args: Any, **kwargs: Any) -> Any:
+            if flask.request.method not in READ_METHODS:
+                response = flask.current_app.make_response(fn(*args, **kwargs))
+                if response.status_code < 400:
+                    backend.invalidate(self.tags)
+                return response
+
+            key = self.key(kwargs)
+            versions = backend.versions(self.tags)
+            entry = backend.get(key, versions)
+            if entry is not None:
+                status, headers, body = entry
+                return flask.current_app.response_class(
+                    body, status=status, headers=headers)
+
+            response = flask.current_app.make_response(fn(*args, **kwargs))
+            if (response.status_code == 200 and not response.is_streamed
+                    and 'Set-Cookie' not in response.headers):
+                backend.set(key, versions, (
+                    response.status_code, list(response.headers.items()),
+                    response.get_data()), self.ttl)
+            return response
+        return decorator
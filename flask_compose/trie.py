@@ -0,0 +1,270 @@
+"""Prefix trie URL dispatcher.
+
+An alternative to matching every request through werkzeug's
+"MapAdapter.match".  The paths of an application's URL rules form a
+prefix tree, the same tree its "Include" hierarchy describes.  The trie
+stores that tree segment by segment, static segments in a dictionary
+and converter segments in werkzeug's precedence order, so resolving a
+request costs a dictionary lookup or regular expression match per
+segment of the request's path.
+
+Anything the trie does not represent is left to werkzeug: converters
+spanning several segments (e.g. "path"), rules with defaults, aliases,
+redirects, hosts, subdomains or websockets, rules without methods,
+rules competing for the same method and path, trailing slash redirects
+and values a converter rejects.  Requests which could reach such a rule
+are matched by werkzeug as usual, as are requests the trie does not
+match, so errors (404, 405, redirects) are always werkzeug's.
+"""
+from typing import Any, List, Optional, Tuple
+
+import re
+import threading
+
+from werkzeug.routing import ValidationError  # type: ignore
+
+try:
+    from werkzeug.routing.rules import RulePart  # type: ignore
+except ImportError:  # werkzeug<2.2
+    RulePart = None  # type: ignore
+
+
+# Returned by a search which reached something werkzeug must handle.
+FALLBACK = object()
+
+# The trie, and the removal of rules, read the parts werkzeug compiles
+# its rules into, which are private.  They are laid out as below from
+# werkzeug 2.2.3.
+RULE_PART_FIELDS = frozenset((
+    'content', 'final', 'static', 'suffixed', 'weight'))
+
+
+def check_werkzeug() -> None:
+    """Raise RuntimeError unless werkzeug compiles rules into the parts
+    read here."""
+    fields = getattr(RulePart, '__dataclass_fields__', {})
+    if not RULE_PART_FIELDS <= set(fields):
+        raise RuntimeError(
+            'flask_compose requires werkzeug>=2.2.3,<4: werkzeug\'s rule '
+            'parts do not have the fields {}.'.format(
+                ', '.join(sorted(RULE_PART_FIELDS))))
+
+
+class Node:
+    """Trie node.
+
+    Static children are keyed by segment.  Dynamic children are stored
+    as (part, pattern, groups, node) tuples ordered by the weight of
+    werkzeug's rule part, "groups" naming the pattern's converter groups
+    in order.  Rules ending at the node are keyed by method; methods
+    claimed by more than one rule, or by an unsupported rule, are
+    ambiguous.  Searches continuing past a "fallback" node are left to
+    werkzeug.
+    """
+
+    __slots__ = (
+        'static', 'dynamic', 'rules', 'ambiguous', 'fallback', 'trailing')
+
+    def __init__(self) -> None:
+        self.static: dict = {}
+        self.dynamic: List[tuple] = []
+        self.rules: dict = {}
+        self.ambiguous: set = set()
+        self.fallback = False
+        self.trailing = False
+
+    def child(self, part: Any) -> Optional['Node']:
+        """Return the child for a werkzeug rule part.
+
+        None is returned for parts spanning several segments.
+        """
+        if part.static:
+            return self.static.setdefault(part.content, Node())
+        if part.final or part.suffixed:
+            return None
+
+        for part_, _, _, node in self.dynamic:
+            if part_ == part:
+                return node
+
+        # A converter's regex may have groups of its own; only the
+        # groups werkzeug wraps each converter in are its values.
+        pattern = re.compile(part.content)
+        groups = tuple(sorted(
+            (name for name in pattern.groupindex
+             if name.startswith('__werkzeug_')),
+            key=lambda name: int(name[len('__werkzeug_'):])))
+        node = Node()
+        self.dynamic.append((part, pattern, groups, node))
+        self.dynamic.sort(key=lambda child: child[0].weight)
+        return node
+
+
+class Trie:
+    """Prefix trie of werkzeug URL rules."""
+
+    def __init__(self, url_rules: Any = ()) -> None:
+        url_rules = list(url_rules)
+        # Werkzeug redirects to rules providing defaults for an endpoint.
+        self.redirects = {r.endpoint for r in url_rules if r.defaults}
+        self.root = Node()
+        for url_rule in url_rules:
+            self.insert(url_rule)
+
+    def insert(self, url_rule: Any) -> bool:
+        """Insert a werkzeug rule.
+
+        Returns False if the rule is left to werkzeug.  If a part of the
+        rule can not be represented, searches continuing past the node
+        before it fall back to werkzeug.  Otherwise searches ending at
+        the rule's node fall back for the rule's methods.
+        """
+        if url_rule.build_only:
+            return True
+
+        node = self.root
+        # The first part matches the host or subdomain.
+        for part in url_rule._parts[1:]:
+            child = node.child(part)
+            if child is None:
+                node.fallback = True
+                return False
+            node = child
+
+        if url_rule.methods is None:
+            node.fallback = True
+            return False
+
+        supported = not (
+            url_rule.defaults or url_rule.redirect_to is not None or
+            url_rule.host or url_rule.subdomain or url_rule.websocket or
+            url_rule.alias or url_rule.endpoint in self.redirects)
+        for method in url_rule.methods:
+            if not supported or node.rules.setdefault(
+                    method, url_rule) is not url_rule:
+                node.ambiguous.add(method)
+        node.trailing = node.trailing or not url_rule.strict_slashes
+        return supported
+
+    def match(self, path: str, method: str) -> Any:
+        """Return a (rule, values) pair, None or "FALLBACK"."""
+        parts = ('/' + path.lstrip('/')).split('/')
+        result = self.search(self.root, parts, 0, [], method)
+        if result is None or result is FALLBACK:
+            return result
+
+        url_rule, groups = result
+        values = {}
+        for (name, converter), value in zip(
+                url_rule._converters.items(), groups):
+            try:
+                values[name] = converter.to_python(value)
+            except ValidationError:
+                return FALLBACK
+        return url_rule, values
+
+    def search(
+            self, node: Node, parts: List[str], index: int, groups: list,
+            method: str) -> Any:
+        if index == len(parts):
+            if method in node.ambiguous:
+                return FALLBACK
+            url_rule = node.rules.get(method)
+            if url_rule is not None:
+                return url_rule, groups
+            # Werkzeug redirects to, or matches, the path with a slash.
+            slash = node.static.get('')
+            if slash is not None and (
+                    method in slash.rules or method in slash.ambiguous):
+                return FALLBACK
+            return None
+
+        if node.fallback or (
+                node.trailing and index + 1 == len(parts) and not parts[index]):
+            return FALLBACK
+
+        segment = parts[index]
+        child = node.static.get(segment)
+        if child is not None:
+            result = self.search(child, parts, index + 1, groups, method)
+            if result is not None:
+                return result
+
+        for _, pattern, names, child in node.dynamic:
+            match = pattern.match(segment)
+            if match is None:
+                continue
+            result = self.search(
+                child, parts, index + 1,
+                groups + [match[name] for name in names], method)
+            if result is not None:
+                return result
+        return None
+
+
+class TrieAdapter:
+    """Werkzeug "MapAdapter" proxy which matches with a "Trie" first."""
+
+    __slots__ = ('adapter', 'trie')
+
+    def __init__(self, adapter: Any, trie: Trie) -> None:
+        self.adapter = adapter
+        self.trie = trie
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.adapter, name)
+
+    def match(
+            self, path_info: Optional[str] = None, method: Optional[str] = None,
+            return_rule: bool = False, query_args: Any = None,
+            websocket: Optional[bool] = None) -> Tuple[Any, dict]:
+        adapter = self.adapter
+        path = adapter.path_info if path_info is None else path_info
+        if path[:1] == '/' and not (
+                websocket or adapter.websocket or adapter.subdomain):
+            result = self.trie.match(
+                path, (method or adapter.default_method).upper())
+            if result is not None and result is not FALLBACK:
+                url_rule, values = result
+                return (url_rule if return_rule else url_rule.endpoint), values
+        return adapter.match(
+            path_info, method, return_rule, query_args, websocket)
+
+
+class TrieDispatcher:
+    """Mounts a "Trie" on a flask application.
+
+    The trie is built from the application's URL map on the first
+    request and rebuilt on the next request whenever rules are added.
+    """
+
+    def __init__(self, app: Any) -> None:
+        check_werkzeug()
+        self.app = app
+        self.lock = threading.Lock()
+        self.trie: Optional[Trie] = None
+        self.create_url_adapter = app.create_url_adapter
+        self.add = app.url_map.add
+        app.create_url_adapter = self
+        app.url_map.add = self.add_rule
+
+    def __call__(self, request: Any) -> Any:
+        adapter = self.create_url_adapter(request)
+        if request is None or adapter is None:
+            return adapter
+        return TrieAdapter(adapter, self.current())
+
+    def add_rule(self, rulefactory: Any) -> None:
+        self.add(rulefactory)
+        self.trie = None
+
+    def current(self) -> Trie:
+        """Return the trie, building it if the URL map changed."""
+        trie = self.trie
+        if trie is None:
+            with self.lock:
+                trie = self.trie
+                if trie is None:
+                    trie = Trie(self.app.url_map.iter_rules())
+                    self.trie = trie
+        return trie
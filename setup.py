@@ -15,6 +15,8 @@ setuptools.setup(
     url='https://github.com/cmanallen/flask_router',
     packages=setuptools.find_packages(),
     install_requires=['flask'],
+    extras_require={'async': ['asgiref>=3.2']},
+    python_requires='>=3.7',
     classifiers=[
         'Programming Language :: Python :: 3',
         'License :: OSI Approved :: MIT License',
@@ -0,0 +1,110 @@
+from unittest import TestCase
+
+from flask import Flask, jsonify, make_response, request
+from flask_compose import Include, Route, Router
+from flask_compose.cache import (
+    LocalClient, MemoryCache, ResponseCache, SharedCache)
+
+
+class Handler: pass
+
+
+def render(fn):
+    def decorator(*args, **kwargs):
+        response, code = fn(*args, **kwargs)
+        return make_response(jsonify(response), code)
+    return decorator
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CacheTestCase(TestCase):
+
+    def make_app(self, backend):
+        calls = []
+
+        def read(handler, **uri_args):
+            calls.append(uri_args)
+            return {'calls': len(calls)}, 200
+
+        def write(handler, **uri_args):
+            return {}, 201
+
+        app = Flask('test')
+        cache = ResponseCache(backend, tags=['users'])
+        Router(app).add_routes([Include('/users', routes=[
+            Route('/<id>', read, Handler, 'GET', name='get'),
+            Route('', write, Handler, 'POST', name='add'),
+        ], middleware=[cache, render])])
+        return app.test_client(), calls
+
+    def test_memory_cache(self):
+        """Test the LRU evicts by size, expiry and tag version."""
+        clock = Clock()
+        cache = MemoryCache(maxsize=2, clock=clock)
+        versions = cache.versions(('a',))
+        cache.set('x', versions, 1, ttl=10)
+        cache.set('y', versions, 2, ttl=10)
+        self.assertTrue(cache.get('x', versions) == 1)
+
+        # "y" is the least recently used.
+        cache.set('z', versions, 3, ttl=10)
+        self.assertTrue(cache.get('y', versions) is None)
+        self.assertTrue(len(cache) == 2)
+
+        clock.now = 10
+        self.assertTrue(cache.get('x', versions) is None)
+
+        cache.set('x', versions, 1, ttl=10)
+        cache.invalidate(('a',))
+        self.assertTrue(cache.get('x', cache.versions(('a',))) is None)
+
+    def test_response_cache(self):
+        """Test read responses are cached until a write invalidates them."""
+        client, calls = self.make_app(MemoryCache())
+        first = client.get('/users/1?b=2&a=1')
+        self.assertTrue(first.json == {'calls': 1})
+        # The query string is normalized.
+        self.assertTrue(client.get('/users/1?a=1&b=2').json == {'calls': 1})
+        self.assertTrue(client.get('/users/1').json == {'calls': 2})
+        self.assertTrue(client.get('/users/2').json == {'calls': 3})
+        self.assertTrue(client.get('/users/2').json == {'calls': 3})
+
+        self.assertTrue(client.post('/users').status_code == 201)
+        self.assertTrue(client.get('/users/2').json == {'calls': 4})
+
+    def test_response_cache_vary(self):
+        """Test varied headers containing separators do not collide."""
+        app = Flask('test')
+        cache = ResponseCache(MemoryCache(), vary=['X-A', 'X-B'])
+        Router(app).add_routes([Route(
+            '/<id>', lambda handler, **uri_args: (
+                {'headers': [request.headers.get('X-A'),
+                             request.headers.get('X-B')]}, 200),
+            Handler, 'GET', name='get', middleware=[cache, render])])
+        client = app.test_client()
+
+        first = client.get('/1', headers={'X-A': 'a|b', 'X-B': 'c'})
+        second = client.get('/1', headers={'X-A': 'a', 'X-B': 'b|c'})
+        self.assertTrue(first.json == {'headers': ['a|b', 'c']})
+        self.assertTrue(second.json == {'headers': ['a', 'b|c']})
+
+    def test_shared_cache(self):
+        """Test workers sharing a client share their responses."""
+        shared = LocalClient()
+        client, calls = self.make_app(SharedCache(shared))
+        other, other_calls = self.make_app(SharedCache(shared))
+
+        self.assertTrue(client.get('/users/1').json == {'calls': 1})
+        self.assertTrue(other.get('/users/1').json == {'calls': 1})
+        self.assertTrue(other_calls == [])
+
+        other.post('/users')
+        self.assertTrue(client.get('/users/1').json == {'calls': 2})
@@ -1,10 +1,12 @@
 from functools import partial
 from unittest import TestCase
 
-from flask_compose import Component, Include, Route, dispatch_request
+from flask_compose import (
+    MAX_SPECIALIZED_DEPTH, Component, Include, Route, Scope, dispatch_request)
 
 
-class Handler: pass
+class Handler:
+    def __repr__(self): return 'Handler()'
 class A(Component): pass
 class B(Component): pass
 class C(Component): pass
@@ -35,11 +37,18 @@ class RouteTestCase(TestCase):
         self.assertTrue(rule.methods == ['GET'])
         self.assertTrue(rule.path == '/users/emails/<id>')
         self.assertTrue(rule.name == 'users_emails_route')
-        self.assertTrue(rule.components == [B, C])
-        self.assertTrue(rule.middleware == [a_middleware, c_middleware])
+        self.assertTrue(rule.components == (B, C))
+        self.assertTrue(rule.middleware == (a_middleware, c_middleware))
         self.assertTrue(rule.controller == controller)
         self.assertTrue(rule.handler == Handler)
 
+    def test_route_defaults(self):
+        """Assert unset lists default to shared empty tuples."""
+        route = Route('/<id>', controller, Handler)
+        self.assertTrue(route.components == ())
+        self.assertTrue(route.middleware is Include('', []).middleware)
+        self.assertTrue(not hasattr(route, '__dict__'))
+
     def test_unnamed_make_url_rule(self):
         """Test "make_url_rule" method."""
         outer_group = Include('/users', routes=[])
@@ -50,3 +59,45 @@ class RouteTestCase(TestCase):
         self.assertTrue(rule.methods == ['GET'])
         self.assertTrue(rule.path == '/users/emails/<id>')
         self.assertTrue(rule.name == '/users/emails/<id>GET')
+
+    def test_make_url_rule_scope(self):
+        """Test "make_url_rule" method with a precomputed "Scope"."""
+        outer_group = Include(
+            '/users', routes=[], name='users_', components=[A],
+            ignored_middleware=[a_middleware])
+        inner_group = Include(
+            '/emails', routes=[], name='emails_', components=[B],
+            middleware=[a_middleware, b_middleware])
+        route = Route(
+            '/<id>', controller, Handler, 'GET', name='route',
+            ignored_components=[B])
+
+        scope = Scope().extend(outer_group).extend(inner_group)
+        rule = route.make_url_rule(scope)
+        self.assertTrue(rule.path == '/users/emails/<id>')
+        self.assertTrue(rule.name == 'users_emails_route')
+        self.assertTrue(rule.components == (A,))
+        self.assertTrue(rule.middleware == (b_middleware,))
+
+        rule = route.make_url_rule([outer_group, inner_group])
+        self.assertTrue(rule.components == (A,))
+        self.assertTrue(rule.middleware == (b_middleware,))
+
+    def test_make_url_rule_specialized(self):
+        """Assert views of every shape build the stack in order."""
+        def stack_controller(handler, **uri_args):
+            return repr(handler), uri_args
+
+        classes = [A, B, C]
+        depths = [0, 1, 2, 3, MAX_SPECIALIZED_DEPTH + 1]
+        for depth in depths:
+            components = [classes[i % 3] for i in range(depth)]
+            expected = 'Handler()'
+            for component in reversed(components):
+                expected = '{}({})'.format(component.__name__, expected)
+
+            route = Route('/<id>', stack_controller, Handler,
+                          components=components)
+            for compiled in (False, True):
+                view = route.make_url_rule([], compiled=compiled).action
+                self.assertTrue(view(id='1') == (expected, {'id': '1'}))
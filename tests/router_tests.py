@@ -1,15 +1,91 @@
+from asgiref.sync import sync_to_async
+from concurrent.futures import ThreadPoolExecutor
 from unittest import TestCase
+from urllib.request import urlopen
+from werkzeug.serving import make_server
 
-from flask import Flask
-from flask_compose import Include, Route, Router, Rule
+import threading
+import time
+import tracemalloc
+
+from flask import Flask, request, url_for
+from flask_compose import (
+    Component, Include, Route, Router, Rule, Scope, maybe_await)
+
+import flask_compose
 
 
 class Handler: pass
 
 
+class StateComponent(Component):
+
+    def store(self, value):
+        if hasattr(self, 'value'):
+            raise Exception('State leaked between requests.')
+        self.value = value
+        time.sleep(0.001)
+        return self.value
+
+
+class SeenHandler:
+    def __init__(self): self.seen = []
+
+
+class SeenComponent(Component):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.counts = {}
+
+
+class HookHandler:
+    def hook(self): return ''
+
+
+class HookComponent(Component):
+    def hook(self): return self.parent.hook()
+
+
+class AsyncHookComponent(Component):
+    async def hook(self): return await maybe_await(self.parent.hook()) + 'a'
+
+
 def controller(handler, **uri_args): return '', 200
 
 
+async def async_controller(handler, **uri_args):
+    return await maybe_await(handler.hook()), 200
+
+
+def hook_controller(handler, **uri_args): return handler.hook(), 200
+
+
+def sync_middleware(fn):
+    def view(**uri_args):
+        body, status = fn(**uri_args)
+        return body + 's', status
+    return view
+
+
+def async_middleware(fn):
+    async def view(**uri_args):
+        body, status = await sync_to_async(fn)(**uri_args)
+        return body + 'a', status
+    return view
+
+
+def method_controller(handler, **uri_args): return request.method, 200
+
+
+def store_controller(handler, id): return handler.store(id), 200
+
+
+def seen_controller(handler, id):
+    handler.seen.append(id)
+    handler.counts[id] = handler.counts.get(id, 0) + 1
+    return ','.join(handler.seen) + str(handler.counts[id]), 200
+
+
 class RouterTestCase(TestCase):
 
     def test_router_add_routes(self):
@@ -37,6 +113,526 @@ class RouterTestCase(TestCase):
             get = client.get('/1')
             self.assertTrue(get.status_code == 200)
 
+    def test_router_mounted_include(self):
+        """Test "add_routes" method with an include mounted twice."""
+        class A(Component): pass
+        class B(Component): pass
+
+        app = Flask('test')
+        router = Router(app)
+
+        shared = Include('/users', name='users_', routes=[
+            Route('', controller, Handler, 'GET', name='browse'),
+            Route('/<id>', controller, Handler, 'GET', name='get',
+                  ignored_components=[B]),
+        ], components=[A])
+        router.add_routes([
+            Include('/v1', name='v1_', routes=[shared]),
+            Include('/v2', name='v2_', routes=[shared], components=[B]),
+        ])
+
+        self.assertTrue(router['v1_users_browse'].path == '/v1/users')
+        self.assertTrue(router['v2_users_get'].path == '/v2/users/<id>')
+        self.assertTrue(router['v1_users_browse'].components == (A,))
+        self.assertTrue(router['v2_users_browse'].components == (B, A))
+        self.assertTrue(router['v2_users_get'].components == (A,))
+
+        # Equal component stacks are shared between rules.
+        self.assertTrue(
+            router['v2_users_get'].components is
+            router['v1_users_get'].components)
+
+        with app.app_context():
+            client = app.test_client()
+            self.assertTrue(client.get('/v1/users/1').status_code == 200)
+            self.assertTrue(client.get('/v2/users').status_code == 200)
+
+    def test_router_consolidated(self):
+        """Test rules sharing a path are matched by one URL rule."""
+        app = Flask('test')
+        router = Router(app, consolidated=True)
+        router.add_routes([Include('/users', name='user_', routes=[
+            Route('', method_controller, Handler, 'GET', name='browse'),
+            Route('/<id>', method_controller, Handler, 'GET', name='get'),
+            Route('/<id>', method_controller, Handler, 'PATCH', name='update'),
+        ])])
+
+        url_rules = [r for r in app.url_map.iter_rules() if not r.build_only]
+        self.assertTrue(len(router) == 3)
+        self.assertTrue(len(url_rules) == 3)  # Includes flask's static rule.
+
+        with app.test_request_context():
+            self.assertTrue(url_for('user_update', id=1) == '/users/1')
+            self.assertTrue(url_for('user_browse') == '/users')
+
+        client = app.test_client()
+        self.assertTrue(client.get('/users/1').data == b'GET')
+        self.assertTrue(client.patch('/users/1').data == b'PATCH')
+        self.assertTrue(client.head('/users/1').status_code == 200)
+        self.assertTrue(client.delete('/users/1').status_code == 405)
+
+    def test_router_compiled(self):
+        """Test "add_routes" method with compiled component stacks."""
+        app = Flask('test')
+        router = Router(app, compiled=True)
+
+        route = Route('/<id>', controller, Handler, 'GET', name='instance')
+        router.add_routes([Include('/users', name='user_', routes=[route])])
+
+        with app.app_context():
+            client = app.test_client()
+
+            get = client.get('/users/1')
+            self.assertTrue(get.status_code == 200)
+
+    def test_router_reused_threaded(self):
+        """Assert reused stacks are isolated under a threaded server."""
+        app = Flask('test')
+        router = Router(app, reused=True)
+        router.add_routes([Route(
+            '/<id>', store_controller, Handler, components=[StateComponent])])
+
+        # Sequential requests on one thread share a stack.
+        client = app.test_client()
+        for id in range(3):
+            get = client.get('/{}'.format(id))
+            self.assertTrue(get.data.decode('utf-8') == str(id))
+
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            url = 'http://127.0.0.1:{}/'.format(server.server_port)
+
+            def get(id):
+                with urlopen(url + str(id)) as response:
+                    return response.read().decode('utf-8')
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(get, range(200)))
+        finally:
+            server.shutdown()
+            thread.join()
+
+        self.assertTrue(results == [str(id) for id in range(200)])
+
+    def test_router_reused_init(self):
+        """Assert state created by "__init__" is rebuilt per request."""
+        for options in ({}, {'compiled': True}):
+            app = Flask('test')
+            router = Router(app, reused=True, **options)
+            router.add_routes([Route(
+                '/<id>', seen_controller, SeenHandler,
+                components=[SeenComponent])])
+
+            client = app.test_client()
+            for id in ('0', '1', '2', '9'):
+                get = client.get('/' + id)
+                self.assertTrue(get.data.decode('utf-8') == id + '1')
+
+    def test_router_warmup(self):
+        """Assert the first request allocates nothing after "warmup".
+
+        Objects released to the interpreter's free lists remain traced
+        so every request is compared with a steady state request.
+        """
+        def first_request_allocations(warmup, **options):
+            app = Flask('test')
+            router = Router(app, **options)
+            router.add_routes([Include('/users', routes=[
+                Route('/<id>', hook_controller, HookHandler),
+            ], components=[type('A', (Component,), {}), HookComponent])])
+            if warmup:
+                router.warmup()
+
+            client = app.test_client()
+            sizes = []
+            for _ in range(2):
+                tracemalloc.start()
+                get = client.get('/users/1')
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+
+                self.assertTrue(get.status_code == 200)
+                snapshot = snapshot.filter_traces([
+                    tracemalloc.Filter(True, flask_compose.__file__)])
+                sizes.append(sum(
+                    stat.size for stat in snapshot.statistics('lineno')))
+            return sizes[0] - sizes[1]
+
+        self.assertTrue(first_request_allocations(False) > 0)
+        self.assertTrue(first_request_allocations(True) == 0)
+        self.assertTrue(first_request_allocations(True, compiled=True) == 0)
+        self.assertTrue(first_request_allocations(True, reused=True) == 0)
+
+    def test_router_import_strings(self):
+        """Test routes given import strings are compiled lazily."""
+        def named(name):
+            return '{}:{}'.format(__name__, name)
+
+        app = Flask('test')
+        router = Router(app, compiled=True)
+        router.add_routes([Include('/users', name='user_', routes=[
+            Route('/<id>', named('hook_controller'), named('HookHandler'),
+                  name='get', ignored_components=[named('StateComponent')]),
+        ], components=[named('HookComponent'), named('StateComponent')])])
+
+        rule = router['user_get']
+        self.assertTrue(rule.path == '/users/<id>')
+        self.assertTrue(rule.controller == named('hook_controller'))
+        self.assertTrue(rule.action.rule is None)
+
+        client = app.test_client()
+        self.assertTrue(client.get('/users/1').status_code == 200)
+        self.assertTrue(rule.action.rule.controller is hook_controller)
+        self.assertTrue(rule.action.rule.components == (HookComponent,))
+
+        # Resolved in bulk by "warmup".
+        app = Flask('test')
+        router = Router(app)
+        router.add_routes([
+            Route('/<id>', named('controller'), named('Handler'))])
+        router.warmup()
+        self.assertTrue(router['/<id>GET'].action.rule.handler is Handler)
+
+    def test_router_async(self):
+        """Test coroutine controllers with mixed sync and async hooks."""
+        def routes():
+            return [Include('/users', name='user_', routes=[
+                Route('/<id>', async_controller, HookHandler, name='async',
+                      components=[AsyncHookComponent, HookComponent]),
+                Route('/<id>', hook_controller, HookHandler, 'PATCH',
+                      name='sync'),
+                Route('', '{}:async_controller'.format(__name__), HookHandler,
+                      name='lazy'),
+            ])]
+
+        options = [
+            {}, {'compiled': True}, {'reused': True}, {'consolidated': True}]
+        for option in options:
+            app = Flask('test')
+            Router(app, **option).add_routes(routes())
+
+            client = app.test_client()
+            self.assertTrue(client.get('/users/1').data == b'a')
+            self.assertTrue(client.patch('/users/1').status_code == 200)
+            self.assertTrue(client.get('/users').status_code == 200)
+
+    def test_router_async_middleware(self):
+        """Test middleware receives a sync view in every mode."""
+        options = [
+            {}, {'compiled': True}, {'reused': True},
+            {'compiled': True, 'reused': True}, {'consolidated': True}]
+        for option in options:
+            for middleware, suffix in (
+                    (sync_middleware, b's'), (async_middleware, b'a')):
+                app = Flask('test')
+                Router(app, **option).add_routes([Include(
+                    '/users', name='user_', middleware=[middleware], routes=[
+                        Route('/<id>', async_controller, HookHandler,
+                              name='async', components=[AsyncHookComponent]),
+                        Route('/<id>', hook_controller, HookHandler, 'PATCH',
+                              name='sync'),
+                        Route('', '{}:async_controller'.format(__name__),
+                              HookHandler, name='lazy',
+                              components=[AsyncHookComponent]),
+                    ])])
+
+                client = app.test_client()
+                self.assertTrue(client.get('/users/1').data == b'a' + suffix)
+                self.assertTrue(client.patch('/users/1').data == suffix)
+                self.assertTrue(client.get('/users').data == b'a' + suffix)
+
+    def test_router_async_reused(self):
+        """Test coroutine controllers reuse the request thread's stack."""
+        handlers = []
+
+        async def identity_controller(handler, id):
+            handlers.append(handler)
+            return await maybe_await(handler.store(id)), 200
+
+        app = Flask('test')
+        Router(app, reused=True).add_routes([Route(
+            '/<id>', identity_controller, Handler,
+            components=[StateComponent])])
+
+        client = app.test_client()
+        self.assertTrue(client.get('/1').data == b'1')
+        self.assertTrue(client.get('/2').data == b'2')
+        self.assertTrue(handlers[0] is handlers[1])
+
+    def test_router_instrumented(self):
+        """Test every layer of an instrumented rule is timed."""
+        def timed_middleware(fn):
+            def decorator(*args, **kwargs):
+                return fn(*args, **kwargs)
+            return decorator
+
+        for options in ({}, {'compiled': True}, {'reused': True}):
+            app = Flask('test')
+            router = Router(app, instrumented=True, **options)
+            router.add_routes([Include('/users', name='user_', routes=[
+                Route('/<id>', hook_controller, HookHandler, name='get'),
+            ], components=[HookComponent], middleware=[timed_middleware])])
+
+            client = app.test_client()
+            for _ in range(3):
+                self.assertTrue(client.get('/users/1').status_code == 200)
+
+            stats = router.stats()['user_get']
+            self.assertTrue(set(stats) == {
+                'controller', 'dispatch', 'HookComponent.hook',
+                'HookHandler.hook',
+                'middleware:{}'.format(timed_middleware.__qualname__)})
+            self.assertTrue(all(
+                summary['count'] == 3 for summary in stats.values()))
+            self.assertTrue(sum(stats['controller']['buckets']) == 3)
+
+            # Replacing rules does not generate new classes.
+            size = flask_compose.compile_chain.cache_info().currsize
+            for _ in range(5):
+                router.replace_routes(Include('/users', name='user_', routes=[
+                    Route('/<id>', hook_controller, HookHandler, name='get',
+                          components=[HookComponent]),
+                ], middleware=[timed_middleware]))
+                self.assertTrue(client.get('/users/1').status_code == 200)
+            self.assertTrue(
+                flask_compose.compile_chain.cache_info().currsize == size)
+
+        # Rules are not instrumented by default.
+        router = Router(Flask('test'))
+        router.add_routes([Route('/<id>', controller, Handler)])
+        self.assertTrue(router.stats() == {})
+
+    def test_router_indexes(self):
+        """Test rules are looked up by object and path prefix."""
+        class A(Component): pass
+        class B(Component): pass
+
+        def a_middleware(fn): return fn
+
+        app = Flask('test')
+        router = Router(app)
+        router.add_routes([Include('/v2', name='v2_', routes=[
+            Include('/users', name='user_', routes=[
+                Route('', controller, Handler, name='browse'),
+                Route('/<id>', hook_controller, HookHandler, name='get',
+                      components=[B]),
+            ], components=[A]),
+            Include('/users-emails', name='email_', routes=[
+                Route('', controller, Handler, name='browse'),
+            ], middleware=[a_middleware]),
+        ])])
+
+        def names(rules):
+            return [rule.name for rule in rules]
+
+        self.assertTrue(names(router.with_component(A)) == [
+            'v2_user_browse', 'v2_user_get'])
+        self.assertTrue(names(router.with_component(B)) == ['v2_user_get'])
+        self.assertTrue(names(router.with_middleware(a_middleware)) == [
+            'v2_email_browse'])
+        self.assertTrue(names(router.with_controller(controller)) == [
+            'v2_user_browse', 'v2_email_browse'])
+        self.assertTrue(names(router.with_handler(HookHandler)) == [
+            'v2_user_get'])
+        self.assertTrue(names(router.under('/v2/users')) == [
+            'v2_user_browse', 'v2_user_get'])
+        self.assertTrue(len(router.under('/v2')) == 3)
+        self.assertTrue(router.under('/v3') == [])
+
+        # Indexes follow removals.
+        router.remove_route('v2_user_get')
+        self.assertTrue(router.with_component(B) == [])
+        self.assertTrue(names(router.under('/v2/users/<id>')) == [])
+        self.assertTrue(names(router.under('/v2/users')) == [
+            'v2_user_browse'])
+
+    def test_router_indexes_lazy(self):
+        """Test lazy rules are found by object and by import string."""
+        def named(name):
+            return '{}.{}'.format(__name__, name)
+
+        app = Flask('test')
+        router = Router(app)
+        router.add_routes([Include('/users', name='user_', routes=[
+            Route('', named('hook_controller'), named('HookHandler'),
+                  name='lazy', components=[named('HookComponent')]),
+            Route('/<id>', hook_controller, HookHandler, name='eager',
+                  components=[HookComponent]),
+        ])])
+
+        for items in (
+                (HookComponent, hook_controller, HookHandler),
+                (named('HookComponent'), named('hook_controller'),
+                 '{}:HookHandler'.format(__name__))):
+            component, controller_, handler = items
+            for rules in (
+                    router.with_component(component),
+                    router.with_controller(controller_),
+                    router.with_handler(handler)):
+                self.assertTrue(
+                    [rule.name for rule in rules] == ['user_lazy', 'user_eager'])
+
+        # Objects their name does not resolve to are keyed by identity.
+        class HookComponent_(Component): pass
+        HookComponent_.__qualname__ = 'HookComponent'
+        self.assertTrue(router.with_component(HookComponent_) == [])
+
+    def test_router_frozen(self):
+        """Assert a frozen router rejects changes before making any."""
+        app = Flask('test')
+        router = Router(app)
+        users = Include('/users', name='user_', routes=[
+            Route('/<id>', controller, Handler, 'GET', name='get')])
+        teams = Include('/teams', name='team_', routes=[
+            Route('/<id>', controller, Handler, 'GET', name='get')])
+        router.add_routes([users, teams])
+        router.replace_routes(
+            Route('/<id>', controller, Handler, 'GET', name='get'),
+            Scope.of([users]))
+        router.warmup()
+        sources = dict(router.sources)
+
+        changes = (
+            lambda: router.add_routes([Route('/<id>', controller, Handler)]),
+            lambda: router.replace_routes(
+                Include('/users', name='user_', routes=[])),
+            lambda: router.sync([users]),
+            lambda: router.remove_route('user_get'),
+            lambda: router.remove_source(list(sources)[0]))
+        for change in changes:
+            with self.assertRaises(RuntimeError):
+                change()
+            self.assertTrue(router.sources == sources)
+            self.assertTrue(sorted(router) == ['team_get', 'user_get'])
+        self.assertTrue(app.test_client().get('/teams/1').status_code == 200)
+
+    def test_router_remove_route(self):
+        """Test removing rules while the application serves requests."""
+        app = Flask('test')
+        router = Router(app)
+        router.add_routes([Include('/users', name='user_', routes=[
+            Route('/<id>', method_controller, Handler, 'GET', name='get'),
+            Route('/<id>', method_controller, Handler, 'PATCH', name='update'),
+        ])])
+        client = app.test_client()
+        self.assertTrue(client.patch('/users/1').status_code == 200)
+
+        router.remove_route('user_update')
+        self.assertTrue('user_update' not in router)
+        self.assertTrue('user_update' not in app.view_functions)
+        self.assertTrue(client.patch('/users/1').status_code == 405)
+        self.assertTrue(client.get('/users/1').status_code == 200)
+
+        router.remove_route('user_get')
+        self.assertTrue(client.get('/users/1').status_code == 404)
+
+    def test_router_remove_route_werkzeug(self):
+        """Test rules are not removed from an unexpected URL map."""
+        app = Flask('test')
+        router = Router(app)
+        router.add_routes([
+            Route('/<id>', method_controller, Handler, 'GET', name='get')])
+        del app.url_map._matcher
+        with self.assertRaises(RuntimeError):
+            router.remove_route('get')
+        self.assertTrue('get' in app.view_functions)
+
+    def test_router_add_url_rule_unwrapped(self):
+        """Test rules are not added after the first request unless
+        Flask's check can be skipped."""
+        class App(Flask):
+            def add_url_rule(self, *args, **kwargs):
+                self._check_setup_finished('add_url_rule')
+                return super().add_url_rule(*args, **kwargs)
+
+        app = App('test')
+        router = Router(app)
+        router.add_routes([Route('/a', method_controller, Handler, 'GET')])
+        self.assertTrue(app.test_client().get('/a').status_code == 200)
+        with self.assertRaises(RuntimeError):
+            router.add_routes([
+                Route('/b', method_controller, Handler, 'GET')])
+
+    def test_router_remove_route_consolidated(self):
+        """Test removing consolidated rules."""
+        app = Flask('test')
+        router = Router(app, consolidated=True)
+        router.add_routes([Include('/users', name='user_', routes=[
+            Route('/<id>', method_controller, Handler, 'GET', name='get'),
+            Route('/<id>', method_controller, Handler, 'PATCH', name='update'),
+        ])])
+        client = app.test_client()
+
+        router.remove_route('user_get')
+        self.assertTrue(client.get('/users/1').status_code == 405)
+        self.assertTrue(client.head('/users/1').status_code == 405)
+        self.assertTrue(client.patch('/users/1').data == b'PATCH')
+
+        router.remove_route('user_update')
+        self.assertTrue(client.patch('/users/1').status_code == 404)
+        self.assertTrue('/users/<id>' not in app.view_functions)
+        with app.test_request_context():
+            with self.assertRaises(Exception):
+                url_for('user_update', id=1)
+
+    def test_router_replace_routes(self):
+        """Test replacing a nested include recompiles only its rules."""
+        def resource(name, *methods):
+            return Include('/' + name, name=name + '_', routes=[
+                Route('', method_controller, Handler, method, name=method)
+                for method in methods])
+
+        app = Flask('test')
+        router = Router(app)
+        users = resource('users', 'GET', 'POST')
+        router.add_routes([Include('/api', name='api_', routes=[
+            users, resource('teams', 'GET')])])
+        client = app.test_client()
+        self.assertTrue(client.post('/api/users').status_code == 200)
+
+        teams = router['api_teams_GET']
+        scope = Scope().extend(Include('/api', name='api_', routes=[]))
+        router.replace_routes(resource('users', 'GET', 'DELETE'), scope)
+
+        self.assertTrue(client.post('/api/users').status_code == 405)
+        self.assertTrue(client.delete('/api/users').data == b'DELETE')
+        self.assertTrue(client.get('/api/users').data == b'GET')
+        self.assertTrue(router['api_teams_GET'] is teams)
+        self.assertTrue('api_users_POST' not in router)
+
+        # The replacement is itself replaced.
+        router.replace_routes(resource('users', 'GET'), scope)
+        self.assertTrue(client.delete('/api/users').status_code == 405)
+        self.assertTrue(len(router) == 2)
+
+    def test_router_sync(self):
+        """Test synchronizing the router with a new list of routes."""
+        app = Flask('test')
+        router = Router(app, trie=True)
+        users = Include('/users', name='user_', routes=[
+            Route('', method_controller, Handler, 'GET', name='browse')])
+        teams = Include('/teams', name='team_', routes=[
+            Route('', method_controller, Handler, 'GET', name='browse')])
+        router.add_routes([users, teams])
+        client = app.test_client()
+        self.assertTrue(client.get('/teams').status_code == 200)
+
+        browse = router['user_browse']
+        flags = Include('/flags', name='flag_', routes=[
+            Route('', method_controller, Handler, 'GET', name='browse')])
+        router.sync([users, flags])
+
+        self.assertTrue(router['user_browse'] is browse)
+        self.assertTrue(client.get('/teams').status_code == 404)
+        self.assertTrue(client.get('/flags').status_code == 200)
+        self.assertTrue(set(router) == {'user_browse', 'flag_browse'})
+
+        router.warmup()
+        with self.assertRaises(RuntimeError):
+            router.sync([users])
+
     def test_router_dict(self):
         """Test iterate "Include" type."""
         router = Router(None)
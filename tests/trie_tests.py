@@ -0,0 +1,133 @@
+from unittest import TestCase
+
+from flask import Flask, request
+from flask_compose import Include, Route, Router
+from flask_compose.trie import FALLBACK, Trie, TrieAdapter
+from unittest import mock
+from werkzeug.routing import BaseConverter
+
+import dataclasses
+
+
+class Handler: pass
+
+
+def endpoint_controller(handler, **uri_args):
+    return '{} {}'.format(request.endpoint, sorted(uri_args.items())), 200
+
+
+class TrieTestCase(TestCase):
+
+    def make_app(self, **kwargs):
+        app = Flask('test')
+        router = Router(app, trie=True, **kwargs)
+        router.add_routes([Include('/users', name='user_', routes=[
+            Route('', endpoint_controller, Handler, 'GET', name='browse'),
+            Route('', endpoint_controller, Handler, 'POST', name='add'),
+            Route('/me', endpoint_controller, Handler, 'GET', name='me'),
+            Route('/<int:id>', endpoint_controller, Handler, 'GET', name='get'),
+            Route('/<name>', endpoint_controller, Handler, 'GET', name='named'),
+        ]), Include('/files', name='file_', routes=[
+            Route('/<path:rest>', endpoint_controller, Handler, 'GET',
+                  name='get'),
+        ])])
+        return app, router
+
+    def test_trie_match(self):
+        """Test the trie matches what werkzeug matches."""
+        app, _ = self.make_app()
+        app.url_map.update()
+        adapter = app.url_map.bind('localhost')
+        trie = Trie(app.url_map.iter_rules())
+
+        self.assertTrue(trie.match('/users', 'GET')[0].endpoint == 'user_browse')
+        self.assertTrue(trie.match('/users', 'POST')[0].endpoint == 'user_add')
+        self.assertTrue(trie.match('/users/me', 'GET')[0].endpoint == 'user_me')
+
+        url_rule, values = trie.match('/users/1', 'GET')
+        self.assertTrue(url_rule.endpoint == 'user_get')
+        self.assertTrue(values == {'id': 1})
+
+        url_rule, values = trie.match('/users/bob', 'GET')
+        self.assertTrue(url_rule.endpoint == 'user_named')
+        self.assertTrue(values == {'name': 'bob'})
+
+        self.assertTrue(trie.match('/users/1', 'DELETE') is None)
+        self.assertTrue(trie.match('/missing', 'GET') is None)
+        self.assertTrue(trie.match('/users/', 'GET') is None)
+        self.assertTrue(trie.match('/files/a/b', 'GET') is FALLBACK)
+
+        matcher = TrieAdapter(adapter, trie)
+        for path in ('/users', '/users/1', '/users/bob', '/files/a/b'):
+            self.assertTrue(matcher.match(path) == adapter.match(path))
+
+    def test_router_trie(self):
+        """Test requests are dispatched through the router's trie."""
+        app, router = self.make_app()
+        client = app.test_client()
+
+        self.assertTrue(client.get('/users/1').data == b"user_get [('id', 1)]")
+        self.assertTrue(client.get('/users/me').data == b'user_me []')
+        self.assertTrue(client.post('/users').data == b'user_add []')
+        self.assertTrue(client.head('/users/bob').status_code == 200)
+        self.assertTrue(client.delete('/users/1').status_code == 405)
+        self.assertTrue(client.get('/missing').status_code == 404)
+        self.assertTrue(client.get('/users/').status_code == 404)
+        self.assertTrue(
+            client.get('/files/a/b').data == b"file_get [('rest', 'a/b')]")
+        self.assertTrue(client.get('/static/missing.css').status_code == 404)
+        self.assertTrue(router.dispatcher.trie is not None)
+
+    def test_router_trie_rebuilt(self):
+        """Test rules added after the trie was built are matched."""
+        app, router = self.make_app()
+        client = app.test_client()
+        router.warmup(freeze=False)
+        self.assertTrue(router.dispatcher.trie is not None)
+
+        router.add_routes([Route(
+            '/teams', endpoint_controller, Handler, 'GET', name='teams')])
+        self.assertTrue(router.dispatcher.trie is None)
+        self.assertTrue(client.get('/teams').data == b'teams []')
+
+    def test_router_trie_consolidated(self):
+        """Test consolidated rules are dispatched through the trie."""
+        app, _ = self.make_app(consolidated=True)
+        client = app.test_client()
+
+        self.assertTrue(client.get('/users/1').data == b"/users/<int:id> [('id', 1)]")
+        self.assertTrue(client.post('/users').data == b'/users []')
+        self.assertTrue(client.patch('/users').status_code == 405)
+
+    def test_trie_converter_groups(self):
+        """Test groups of a converter's regex do not shift arguments."""
+        class GroupConverter(BaseConverter):
+            regex = '(a|b)x'
+
+        app = Flask('test')
+        app.url_map.converters['ab'] = GroupConverter
+        router = Router(app, trie=True)
+        router.add_routes([Route(
+            '/p/<ab:k>/<s>', endpoint_controller, Handler, 'GET', name='p')])
+        app.url_map.update()
+        trie = Trie(app.url_map.iter_rules())
+
+        _, values = trie.match('/p/ax/hello', 'GET')
+        self.assertTrue(values == {'k': 'ax', 's': 'hello'})
+        self.assertTrue(
+            app.test_client().get('/p/bx/hello').data ==
+            b"p [('k', 'bx'), ('s', 'hello')]")
+
+    def test_router_trie_werkzeug(self):
+        """Test the trie refuses werkzeug rule parts it can not read."""
+        @dataclasses.dataclass
+        class RulePart:
+            content: str
+            final: bool
+            static: bool
+            weight: tuple
+
+        with mock.patch('flask_compose.trie.RulePart', RulePart):
+            with self.assertRaises(RuntimeError):
+                Router(Flask('test'), trie=True)
+        Router(Flask('test'), trie=True)
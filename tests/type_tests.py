@@ -1,6 +1,8 @@
 from unittest import TestCase
 
-from flask_compose import Component, dispatch_request
+from flask_compose import (
+    Component, ReusableChain, compile_chain, dispatch_compiled_request,
+    dispatch_request, make_chain, memoize)
 
 
 class Handler:
@@ -33,6 +35,11 @@ class B(Component):
             raise Exception('I leaked.')
 
 
+class C(Component):
+
+    def shadow(self):
+        self.type = 'C'
+
 
 class TypeTestCase(TestCase):
 
@@ -71,3 +78,126 @@ class TypeTestCase(TestCase):
             self.assertTrue(uri_args['b'] == 2)
 
         dispatch_request(controller, Handler, [B, A], a=1, b=2)
+
+    def test_component_resolution_cache(self):
+        """Assert cached resolutions honor runtime instance attributes."""
+        class Shadow(Component):
+            def set_type(self):
+                self.type = 'shadow'
+
+        class Outer(Component):
+            pass
+
+        handler = Outer(Shadow(Handler()))
+        self.assertTrue(handler.type == 'handler')
+        self.assertTrue(handler.type == 'handler')
+
+        handler.parent.set_type()
+        self.assertTrue(handler.type == 'shadow')
+        self.assertTrue(Outer(Shadow(Handler())).type == 'handler')
+
+        with self.assertRaises(AttributeError):
+            handler.missing
+
+    def test_component_single_layer(self):
+        """Assert a single component forwards to its parent directly."""
+        handler = A(Handler())
+        self.assertTrue(handler.test() == '')
+        self.assertTrue(handler.parent.type == 'handler')
+
+        handler.parent.name = 'handler'
+        self.assertTrue(handler.name == 'handler')
+        self.assertTrue(B(handler).name == 'handler')
+
+    def test_compiled_chain(self):
+        """Test "Chain" resolves attributes like an uncompiled stack."""
+        handler = compile_chain(Handler, (B, A))()
+        self.assertTrue(repr(handler).startswith('A(B('))
+        self.assertTrue(isinstance(handler, A))
+        self.assertTrue(isinstance(handler.parent, B))
+        self.assertTrue(handler.test() == '')
+        self.assertTrue(handler.type == 'A')
+        self.assertTrue(handler.parent.type == 'B')
+
+        # Assert instance attributes do not leak between layers.
+        handler.leak()
+        self.assertTrue(not hasattr(handler.parent, 'am_i_leaking'))
+        self.assertTrue(handler.check_val())
+
+    def test_compiled_chain_shadowing(self):
+        """Assert a shadowing instance attribute stops forwarding."""
+        chain = compile_chain(Handler, (B, C, A))
+        handler = chain()
+        self.assertTrue(handler.parent.parent.type == 'B')
+
+        handler.parent.shadow()
+        self.assertTrue(handler.parent.type == 'C')
+        self.assertTrue(handler.parent.parent.type == 'B')
+        self.assertTrue(chain().parent.type == 'B')
+
+    def test_dispatch_compiled_request(self):
+        """Test "dispatch_compiled_request" function."""
+        def controller(handler, **uri_args):
+            self.assertTrue(handler.type == 'A')
+            self.assertTrue(handler.parent.type == 'B')
+            self.assertTrue(handler.parent.parent.type == 'handler')
+            self.assertTrue(uri_args == {'a': 1})
+
+        dispatch_compiled_request(controller, compile_chain(Handler, (B, A)), a=1)
+
+    def test_reusable_chain(self):
+        """Assert "ReusableChain" reuses the stack without leaking state."""
+        chain = ReusableChain(lambda: make_chain(Handler, (B, A)))
+
+        handler = chain.acquire()
+        handler.leak()
+        self.assertTrue(hasattr(handler, 'am_i_leaking'))
+
+        # Nested acquisitions receive their own stack.
+        nested = chain.acquire()
+        self.assertTrue(nested is not handler)
+        chain.release(nested)
+
+        chain.release(handler)
+        self.assertTrue(not hasattr(handler, 'am_i_leaking'))
+        self.assertTrue(chain.acquire() is handler)
+
+    def test_memoize(self):
+        """Assert "memoize" caches hooks per arguments until release."""
+        calls = []
+
+        class C(Component):
+
+            @memoize
+            def options(self, **options):
+                calls.append(options)
+                return self.parent.options(**options)
+
+            @property
+            @memoize
+            def query(self):
+                calls.append('query')
+                return []
+
+        class OptionsHandler:
+
+            def options(self, **options):
+                return options
+
+        chain = ReusableChain(lambda: make_chain(OptionsHandler, (C,)))
+        handler = chain.acquire()
+        self.assertTrue(handler.options(a=1) is handler.options(a=1))
+        self.assertTrue(handler.options(a=2) == {'a': 2})
+        self.assertTrue(handler.query is handler.query)
+        self.assertTrue(calls == [{'a': 1}, {'a': 2}, 'query'])
+
+        # Unhashable arguments are not cached.
+        handler.options(a=[])
+        handler.options(a=[])
+        self.assertTrue(len(calls) == 5)
+
+        # The cache is freed with the request.
+        chain.release(handler)
+        self.assertTrue(chain.acquire() is handler)
+        handler.options(a=1)
+        self.assertTrue(len(calls) == 6)